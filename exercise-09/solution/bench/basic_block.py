@@ -0,0 +1,103 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import ast_6_alloc as src
+from identifier import Id
+from label import Label
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from pass_9_10_assign_homes import assign_homes
+from pass_10_10_optimize import optimize
+from pass_10_11_patch_instructions import patch_instructions
+from pass_11_12_add_prelude import add_prelude_and_conclusion
+from register_allocation import allocate_registers
+from util.immutable_list import IList, IListBuilder, ilist
+
+arg_parser = ArgumentParser(
+    prog="basic_block",
+    description="Measures the time of the passes which build basic blocks for a function "
+    "with a single basic block of N instructions. The time per instruction should "
+    "stay roughly constant as N grows.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--instrs",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[1_000, 10_000, 100_000],
+    help="number of statements of the generated blocks (default: 1000 10000 100000)",
+)
+arg_parser.add_argument(
+    "--concat",
+    action="store_true",
+    help="also measure building the lists with `xs += ilist(x)` for comparison, which is quadratic",
+)
+args = arg_parser.parse_args()
+
+def program(n: int) -> src.Program:
+    # `x = x + 1` on a single variable, so register allocation stays cheap
+    # and the time is spent building the blocks.
+    x = Id("x")
+    body: list[src.Stmt] = [src.SAssign(src.LId(x), src.EConst(0, "63bit"))]
+    body += [
+        src.SAssign(src.LId(x), src.EOp2(src.EVar(x), "+", src.EConst(1, "63bit")))
+        for _ in range(n)
+    ]
+    body.append(src.SPrint(src.EVar(x)))
+    body.append(src.SReturn(src.EConst(0, "63bit")))
+    return ilist(src.DFun(Label("main"), ilist(), IList(body)))
+
+def measure_passes(n: int) -> dict[str, float]:
+    times: dict[str, float] = {}
+    def run(name, f, *args):
+        start = perf_counter()
+        out = f(*args)
+        times[name] = perf_counter() - start
+        return out
+    ast = run("monadic", monadic, program(n))
+    ast = run("explicate", explicate, ast)
+    blocks = run("select", select, ast)
+    reg_allocs = run("allocate_registers", allocate_registers, blocks, False, True)
+    ast = run("assign_homes", assign_homes, blocks, reg_allocs)
+    ast = run("optimize", optimize, ast)
+    ast = run("patch_instructions", patch_instructions, ast)
+    run("add_prelude_and_conclusion", add_prelude_and_conclusion, ast, reg_allocs)
+    return times
+
+def measure_concat(n: int) -> float:
+    start = perf_counter()
+    xs: IList[int] = ilist()
+    for i in range(n):
+        xs += ilist(i)
+    return perf_counter() - start
+
+def measure_builder(n: int) -> float:
+    start = perf_counter()
+    xs = IListBuilder[int]()
+    for i in range(n):
+        xs += ilist(i)
+    xs.build()
+    return perf_counter() - start
+
+results = {n: measure_passes(n) for n in args.instrs}
+names = list(results[args.instrs[0]])
+width = max(len(name) for name in names)
+print("µs per statement:")
+print(f"{'pass':<{width}}" + "".join(f" {n:>9}" for n in args.instrs))
+for name in names:
+    print(f"{name:<{width}}" + "".join(f" {1e6 * results[n][name] / n:>9.2f}" for n in args.instrs))
+
+print()
+print("µs per appended element:")
+print(f"{'list':<{width}}" + "".join(f" {n:>9}" for n in args.instrs))
+print(f"{'IListBuilder':<{width}}" + "".join(f" {1e6 * measure_builder(n) / n:>9.2f}" for n in args.instrs))
+if args.concat:
+    print(f"{'IList +=':<{width}}" + "".join(f" {1e6 * measure_concat(n) / n:>9.2f}" for n in args.instrs))
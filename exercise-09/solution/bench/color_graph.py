@@ -0,0 +1,73 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from time import perf_counter
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from identifier import Id
+from register_allocation import REG_ORDER, Node, color_graph
+from util.undirected_graph import UndirectedGraph
+
+arg_parser = ArgumentParser(
+    prog="color_graph",
+    description="Colors synthetic interference graphs and reports how long it takes.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--nodes",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[1000, 10000, 50000],
+    help="number of variables in the generated graphs (default: 1000 10000 50000)",
+)
+arg_parser.add_argument(
+    "-d",
+    "--degree",
+    metavar="D",
+    type=int,
+    default=16,
+    help="average number of variable neighbors per variable (default: 16)",
+)
+arg_parser.add_argument(
+    "--seed",
+    metavar="SEED",
+    type=int,
+    default=0,
+    help="seed for the random graph generator (default: 0)",
+)
+args = arg_parser.parse_args()
+
+def random_interference_graph(rng: Random, num_nodes: int, degree: int) -> UndirectedGraph[Node]:
+    graph: UndirectedGraph[Node] = UndirectedGraph()
+    xs = [Id(f"x:{i}") for i in range(num_nodes)]
+    for x in xs:
+        graph.add_node(x)
+    # Connect each variable mostly to variables created shortly before it,
+    # which resembles the live ranges of monadic temporaries.
+    for i, x in enumerate(xs):
+        for _ in range(degree // 2):
+            j = max(0, i - 1 - int(rng.expovariate(1 / (4 * degree))))
+            if j != i:
+                graph.add_edge(x, xs[j])
+    # Some variables are live across calls and interfere with registers.
+    for x in rng.sample(xs, num_nodes // 10):
+        for r in REG_ORDER:
+            graph.add_edge(x, r)
+    return graph
+
+print(f"{'nodes':>8} {'edges':>10} {'colors':>7} {'time (s)':>10}")
+for num_nodes in args.nodes:
+    graph = random_interference_graph(Random(args.seed), num_nodes, args.degree)
+    num_edges = sum(len(graph.neighbors(n)) for n in graph.nodes()) // 2
+
+    start = perf_counter()
+    coloring = color_graph(graph)
+    elapsed = perf_counter() - start
+
+    num_colors = len(set(coloring.values()))
+    print(f"{num_nodes:>8} {num_edges:>10} {num_colors:>7} {elapsed:>10.3f}")
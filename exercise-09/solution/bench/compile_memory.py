@@ -0,0 +1,84 @@
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from compiler import Options, compile_source
+
+arg_parser = ArgumentParser(
+    prog="compile_memory",
+    description="Measures the compile time and the peak memory of compiling the largest "
+    "programs of the test suite and a generated program with many functions.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--programs",
+    metavar="N",
+    type=int,
+    default=5,
+    help="number of the largest test programs to compile (default: 5)",
+)
+arg_parser.add_argument(
+    "-f",
+    "--functions",
+    metavar="N",
+    type=int,
+    default=200,
+    help="number of functions of the generated program (default: 200)",
+)
+arg_parser.add_argument(
+    "-r",
+    "--repeat",
+    metavar="N",
+    type=int,
+    default=3,
+    help="number of compilations of each program, of which the fastest is reported (default: 3)",
+)
+args = arg_parser.parse_args()
+
+def generated_program(num_funs: int) -> str:
+    lines = []
+    for i in range(num_funs):
+        lines += [
+            f"def f{i}(x: int) -> int:",
+            f"    y = (x, {i}, x + {i})",
+            "    z = y[0] + y[2]",
+            "    while z > 100:",
+            "        z = z - 7",
+            "    return z + y[1]",
+        ]
+    lines.append("z = input_int()")
+    lines += [f"print(f{i}(z))" for i in range(num_funs)]
+    return "\n".join(lines) + "\n"
+
+def measure(src_str: str) -> tuple[float, int]:
+    wall_time = min(measure_time(src_str) for _ in range(args.repeat))
+    tracemalloc.start()
+    compile_source(src_str, Options())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return wall_time, peak
+
+def measure_time(src_str: str) -> float:
+    start = perf_counter()
+    compile_source(src_str, Options())
+    return perf_counter() - start
+
+test_paths = sorted(
+    [p for p in (BASE_DIR / "tests").glob("*/*.py") if p.name != "test.py"],
+    key=lambda p: p.stat().st_size,
+    reverse=True,
+)[:args.programs]
+programs = [(str(p.relative_to(BASE_DIR)), p.read_text()) for p in test_paths]
+programs.append((f"<{args.functions} functions>", generated_program(args.functions)))
+
+width = max(len(name) for name, _ in programs)
+print(f"{'program':<{width}} {'time (ms)':>10} {'peak (KiB)':>11}")
+for name, src_str in programs:
+    wall_time, peak = measure(src_str)
+    print(f"{name:<{width}} {1000 * wall_time:>10.1f} {peak / 1024:>11.1f}")
@@ -0,0 +1,130 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import ast_1_python as src
+from compiler import Options, compile_program, reset_fresh_counters
+from identifier import Id
+from pass_1_2_shrink import shrink
+from pass_1_3_shrink_uniquify_reveal import shrink_uniquify_reveal
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from type_checker import type_check
+from util.immutable_list import ilist
+
+arg_parser = ArgumentParser(
+    prog="deep_nesting",
+    description="Compiles generated programs with deeply nested expressions and statements "
+    "to assembly, and runs the passes on syntax trees, i.e. from type checking to explicate, "
+    "and the pretty printer on them separately. None of them must raise a `RecursionError`. "
+    "The programs are built as syntax trees, as Python's parser rejects programs nested more "
+    "than a few thousand levels.",
+)
+arg_parser.add_argument(
+    "-d",
+    "--depths",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[10_000, 100_000],
+    help="nesting depths of the generated programs (default: 10000 100000)",
+)
+arg_parser.add_argument(
+    "-k",
+    "--kinds",
+    choices=["plus", "if", "ifexp"],
+    nargs="+",
+    default=["plus", "if", "ifexp"],
+    help="shapes of the generated programs: a sum `x + 1 + ... + 1`, nested `if` statements "
+    "and nested `if` expressions (default: all)",
+)
+arg_parser.add_argument(
+    "--trees-only",
+    action="store_true",
+    help="only run the passes on syntax trees and the pretty printer, e.g. for depths of "
+    "1000000, for which compiling to assembly takes too long",
+)
+args = arg_parser.parse_args()
+
+def program(kind: str, n: int) -> src.Program:
+    x = Id("x")
+    match kind:
+        case "plus":
+            e: src.Expr = src.EVar(x)
+            for _ in range(n):
+                e = src.EOp2(e, "+", src.EConst(1))
+            s: src.Stmt = src.SAssign(x, None, e)
+        case "if":
+            s = src.SAssign(x, None, src.EOp2(src.EVar(x), "+", src.EConst(1)))
+            for i in range(n):
+                s = src.SIf(src.EOp2(src.EVar(x), "<", src.EConst(i)), ilist(s), ilist())
+        case "ifexp":
+            e = src.EVar(x)
+            for i in range(n):
+                e = src.EIf(src.EOp2(src.EVar(x), "<", src.EConst(i)), src.EConst(i), e)
+            s = src.SAssign(x, None, e)
+    return src.Program(ilist(src.SAssign(x, None, src.EInput()), s, src.SPrint(src.EVar(x))))
+
+def measure(kind: str, n: int) -> dict[str, float]:
+    times: dict[str, float] = {}
+    def run(name, f, *args):
+        start = perf_counter()
+        out = f(*args)
+        times[name] = perf_counter() - start
+        return out
+    p = program(kind, n)
+    if kind != "if":
+        # The indentation of nested statements makes the output quadratic in the depth.
+        run("pretty", src.pretty, p)
+    run("type_check", type_check, p)
+    reset_fresh_counters()
+    run("shrink_uniquify_reveal", shrink_uniquify_reveal, p)
+    reset_fresh_counters()
+    ast = run("shrink", shrink, p)
+    ast = run("uniquify", uniquify, ast)
+    ast = run("reveal", reveal, ast)
+    ast = run("convert_assignments", conv_ass, ast)
+    ast = run("closure_conversion", closure_conv, ast)
+    ast = run("limit_functions", limit, ast)
+    ast = run("alloc", alloc, ast)
+    ast = run("monadic", monadic, ast)
+    run("explicate", explicate, ast)
+    if not args.trees_only:
+        run("compile", compile_program, p, Options())
+    return times
+
+failures: list[tuple[str, int]] = []
+for kind in args.kinds:
+    results: dict[int, dict[str, float]] = {}
+    for n in args.depths:
+        try:
+            results[n] = measure(kind, n)
+        except RecursionError:
+            failures.append((kind, n))
+    if not results:
+        continue
+    names = list(next(iter(results.values())))
+    width = max(len(name) for name in names)
+    print(f"{kind} (seconds):")
+    print(f"{'pass':<{width}}" + "".join(f" {n:>9}" for n in args.depths))
+    for name in names:
+        print(
+            f"{name:<{width}}"
+            + "".join(f" {results[n][name]:>9.2f}" if n in results else f" {'-':>9}" for n in args.depths)
+        )
+    print(flush=True)
+
+for kind, n in failures:
+    print(f"RecursionError for {kind} at depth {n}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,59 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from compiler import Options, compile_cached
+from compile_cache import CompileCache
+
+arg_parser = ArgumentParser(
+    prog="incremental",
+    description="Compares the time of recompiling a program after editing one of its functions "
+    "with and without incremental compilation.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--functions",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[10, 50, 200],
+    help="number of functions of the generated programs (default: 10 50 200)",
+)
+args = arg_parser.parse_args()
+
+def program(num_funs: int, edited: int) -> str:
+    lines = []
+    for i in range(num_funs):
+        lines += [
+            f"def f{i}(x: int) -> int:",
+            f"    y = x + {i if i != edited else -i}",
+            "    while y > 100:",
+            "        y = y - 7",
+            "    return y + y",
+        ]
+    lines.append("z = input_int()")
+    lines += [f"print(f{i}(z))" for i in range(num_funs)]
+    return "\n".join(lines) + "\n"
+
+def measure(src_str: str, options: Options, cache: CompileCache) -> float:
+    start = perf_counter()
+    compile_cached(src_str, options, cache)
+    return perf_counter() - start
+
+print(f"{'functions':>9} {'full (s)':>9} {'incremental (s)':>16}")
+for num_funs in args.functions:
+    with TemporaryDirectory() as cache_dir:
+        cache = CompileCache(Path(cache_dir))
+        full = Options()
+        incremental = Options(incremental=True)
+        compile_cached(program(num_funs, -1), full, cache)
+        compile_cached(program(num_funs, -1), incremental, cache)
+        full_time = measure(program(num_funs, num_funs // 2), full, cache)
+        incremental_time = measure(program(num_funs, num_funs // 2), incremental, cache)
+        print(f"{num_funs:>9} {full_time:>9.3f} {incremental_time:>16.3f}")
@@ -0,0 +1,119 @@
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from pass_0_1_parser import parse
+from type_checker import type_check
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from register_allocation import (
+    Graph, Node, build_interference_graph, color_graph, control_flow_graph
+)
+from dataflow_analysis import FunLiveness, liveness_analysis, read_set, write_set
+from util.undirected_graph import UndirectedGraph
+import ast_9_sel
+
+arg_parser = ArgumentParser(
+    prog="interference_graph",
+    description="Compares time and memory of building and coloring interference graphs "
+    "with the set based `UndirectedGraph` and the bit vector based `InterferenceGraph`.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--lines",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[1000, 5000, 20000],
+    help="number of statements of the generated programs (default: 1000 5000 20000)",
+)
+arg_parser.add_argument(
+    "-w",
+    "--window",
+    metavar="W",
+    type=int,
+    default=32,
+    help="number of variables live at once in the generated programs (default: 32)",
+)
+args = arg_parser.parse_args()
+
+def straight_line(num_lines: int, window: int) -> str:
+    lines = [f"v{i} = input_int()" for i in range(window)]
+    for i in range(window, num_lines):
+        lines.append(f"v{i} = v{i - 1} + v{i - window}")
+        if i % 100 == 0:
+            lines.append(f"print(v{i})")
+    lines.append(f"print(v{num_lines - 1})")
+    return "\n".join(lines) + "\n"
+
+def select_program(src_str: str) -> Any:
+    ast: Any = parse(src_str)
+    type_check(ast)
+    for p in [shrink, uniquify, reveal, conv_ass, closure_conv, limit, alloc, monadic, explicate, select]:
+        ast = p(ast)
+    return ast
+
+def build_set_graph(p: ast_9_sel.Blocks, liveness: FunLiveness) -> UndirectedGraph[Node]:
+    # the construction of the interference graph with `UndirectedGraph`
+    graph: UndirectedGraph[Node] = UndirectedGraph()
+    for label, block in p.items():
+        for i, instr in enumerate(block):
+            w = write_set(instr)
+            for x in read_set(instr) | w:
+                graph.add_node(x)
+            live_out = liveness[label].instr_out[i]
+            match instr:
+                case ast_9_sel.Move(d, s):
+                    for x in live_out:
+                        if x != d and x != s:
+                            for y in w:
+                                graph.add_edge(y, x)
+                case _:
+                    for d in w:
+                        for x in live_out:
+                            if x != d:
+                                graph.add_edge(d, x)
+    return graph
+
+def measure(build: Callable[[ast_9_sel.Blocks, FunLiveness], Graph], blocks: ast_9_sel.Blocks) -> tuple[float, float, float]:
+    liveness = liveness_analysis(blocks, control_flow_graph(blocks))
+    for block_liveness in liveness.values():
+        block_liveness.instr_out
+
+    start = perf_counter()
+    graph = build(blocks, liveness)
+    build_time = perf_counter() - start
+
+    # Tracing allocations slows down the construction considerably, so
+    # the memory is measured in a separate run.
+    tracemalloc.start()
+    build(blocks, liveness)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = perf_counter()
+    color_graph(graph)
+    color_time = perf_counter() - start
+    return build_time, peak / 2**20, color_time
+
+print(f"{'lines':>6} {'graph':<18} {'build (s)':>10} {'peak (MiB)':>11} {'color (s)':>10}")
+for num_lines in args.lines:
+    blocks = [f for f in select_program(straight_line(num_lines, args.window))][-1].body
+    for name, build in [("UndirectedGraph", build_set_graph), ("InterferenceGraph", build_interference_graph)]:
+        build_time, peak, color_time = measure(build, blocks)
+        print(f"{num_lines:>6} {name:<18} {build_time:>10.3f} {peak:>11.1f} {color_time:>10.3f}")
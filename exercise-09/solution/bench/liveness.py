@@ -0,0 +1,83 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from pass_0_1_parser import parse
+from type_checker import type_check
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from register_allocation import control_flow_graph
+from dataflow_analysis import liveness_analysis
+
+arg_parser = ArgumentParser(
+    prog="liveness",
+    description="Runs the liveness analysis on programs with deeply nested loops.",
+)
+arg_parser.add_argument(
+    "-d",
+    "--depth",
+    metavar="D",
+    type=int,
+    nargs="+",
+    default=[5, 10, 20, 40],
+    help="nesting depths of the generated loops (default: 5 10 20 40)",
+)
+arg_parser.add_argument(
+    "-w",
+    "--width",
+    metavar="W",
+    type=int,
+    default=10,
+    help="number of statements in the body of each loop (default: 10)",
+)
+args = arg_parser.parse_args()
+
+def nested_loops(depth: int, width: int) -> str:
+    lines = [f"v{i} = input_int()" for i in range(width)]
+    for d in range(depth):
+        ind = "    " * d
+        lines.append(f"{ind}i{d} = 0")
+        lines.append(f"{ind}while i{d} < 3:")
+        for w in range(width):
+            lines.append(f"{ind}    v{w} = v{(w + 1) % width} + i{d}")
+        lines.append(f"{ind}    i{d} = i{d} + 1")
+        lines.append(f"{ind}    if v{d % width} < 0:")
+        lines.append(f"{ind}        v{(d + 1) % width} = v{d % width} - 1")
+        lines.append(f"{ind}    else:")
+        lines.append(f"{ind}        v{(d + 1) % width} = 0")
+    lines.append(" + ".join(f"v{i}" for i in range(width)).join(["print(", ")"]))
+    return "\n".join(lines) + "\n"
+
+def select_program(src_str: str) -> Any:
+    ast: Any = parse(src_str)
+    type_check(ast)
+    for p in [shrink, uniquify, reveal, conv_ass, closure_conv, limit, alloc, monadic, explicate, select]:
+        ast = p(ast)
+    return ast
+
+print(f"{'depth':>6} {'blocks':>7} {'instrs':>7} {'time (s)':>10}")
+for depth in args.depth:
+    blocks = [f for f in select_program(nested_loops(depth, args.width))][-1].body
+    num_instrs = sum(len(b) for b in blocks.values())
+
+    start = perf_counter()
+    liveness = liveness_analysis(blocks, control_flow_graph(blocks))
+    for block_liveness in liveness.values():
+        block_liveness.instr_out
+    elapsed = perf_counter() - start
+
+    print(f"{depth:>6} {len(blocks):>7} {num_instrs:>7} {elapsed:>10.3f}")
@@ -0,0 +1,100 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from pass_0_1_parser import parse
+from type_checker import type_check
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from register_allocation import RegAllocOutput, allocate_registers
+import ast_10_mem
+
+arg_parser = ArgumentParser(
+    prog="register_allocation",
+    description="Compares compile time and spill count of the graph coloring "
+    "and the linear scan register allocator.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--lines",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[1000, 5000, 20000],
+    help="number of statements of the generated straight-line programs (default: 1000 5000 20000)",
+)
+arg_parser.add_argument(
+    "-w",
+    "--window",
+    metavar="W",
+    type=int,
+    default=32,
+    help="number of variables live at once in the generated programs (default: 32)",
+)
+arg_parser.add_argument(
+    "--no-corpus",
+    action="store_true",
+    help="skip the programs of the test corpus",
+)
+args = arg_parser.parse_args()
+
+def straight_line(num_lines: int, window: int) -> str:
+    lines = [f"v{i} = input_int()" for i in range(window)]
+    for i in range(window, num_lines):
+        lines.append(f"v{i} = v{i - 1} + v{i - window}")
+    lines.append(f"print(v{num_lines - 1})")
+    return "\n".join(lines) + "\n"
+
+def select_program(src_str: str) -> Any:
+    ast: Any = parse(src_str)
+    type_check(ast)
+    for p in [shrink, uniquify, reveal, conv_ass, closure_conv, limit, alloc, monadic, explicate, select]:
+        ast = p(ast)
+    return ast
+
+def num_spills(reg_allocs: dict[Any, RegAllocOutput]) -> int:
+    return sum(
+        1
+        for reg_alloc in reg_allocs.values()
+        for home in reg_alloc.env.values()
+        if isinstance(home, ast_10_mem.Offset)
+    )
+
+def measure(blocks: Any, linear_scan: bool) -> tuple[float, int]:
+    start = perf_counter()
+    reg_allocs = allocate_registers(blocks, linear_scan=linear_scan)
+    elapsed = perf_counter() - start
+    return elapsed, num_spills(reg_allocs)
+
+programs: list[tuple[str, Any]] = []
+if not args.no_corpus:
+    blocks = []
+    for path in sorted((BASE_DIR / "tests").glob("*/*.py")):
+        blocks += select_program(path.read_text())
+    programs.append(("test corpus", blocks))
+for num_lines in args.lines:
+    programs.append((f"straight-line {num_lines}", select_program(straight_line(num_lines, args.window))))
+
+print(f"{'program':<22} {'instrs':>7} {'graph (s)':>10} {'spills':>7} {'linear (s)':>11} {'spills':>7}")
+for name, blocks in programs:
+    num_instrs = sum(len(b) for f in blocks for b in f.body.values())
+    graph_time, graph_spills = measure(blocks, False)
+    linear_time, linear_spills = measure(blocks, True)
+    print(
+        f"{name:<22} {num_instrs:>7} {graph_time:>10.3f} {graph_spills:>7}"
+        f" {linear_time:>11.3f} {linear_spills:>7}"
+    )
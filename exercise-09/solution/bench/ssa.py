@@ -0,0 +1,116 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+BENCH_DIR = Path(__file__).parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from compiler import reset_fresh_counters
+from pass_0_1_parser import parse
+from type_checker import type_check
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from pass_9_9_ssa import check_ssa, construct_ssa, destruct_ssa
+
+arg_parser = ArgumentParser(
+    prog="ssa",
+    description="Measures the construction, checking and destruction of the SSA form "
+    "on functions with large control flow graphs.",
+)
+arg_parser.add_argument(
+    "-n",
+    "--ifs",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=[250, 500, 1000, 2000],
+    help="numbers of consecutive if statements, each of which joins all variables (default: 250 500 1000 2000)",
+)
+arg_parser.add_argument(
+    "-d",
+    "--depth",
+    metavar="D",
+    type=int,
+    nargs="+",
+    default=[10, 20, 40, 80],
+    help="nesting depths of the generated loops (default: 10 20 40 80)",
+)
+arg_parser.add_argument(
+    "-w",
+    "--width",
+    metavar="W",
+    type=int,
+    default=10,
+    help="number of variables assigned in each if statement and loop (default: 10)",
+)
+args = arg_parser.parse_args()
+
+def consecutive_ifs(n: int, width: int) -> str:
+    lines = [f"v{i} = input_int()" for i in range(width)]
+    for k in range(n):
+        lines.append(f"if v{k % width} < {k}:")
+        for w in range(width):
+            lines.append(f"    v{w} = v{(w + 1) % width} + {k}")
+        lines.append("else:")
+        lines.append(f"    v{(k + 1) % width} = v{k % width} - 1")
+    lines.append(" + ".join(f"v{i}" for i in range(width)).join(["print(", ")"]))
+    return "\n".join(lines) + "\n"
+
+def nested_loops(depth: int, width: int) -> str:
+    lines = [f"v{i} = input_int()" for i in range(width)]
+    for d in range(depth):
+        ind = "    " * d
+        lines.append(f"{ind}i{d} = 0")
+        lines.append(f"{ind}while i{d} < 3:")
+        for w in range(width):
+            lines.append(f"{ind}    v{w} = v{(w + 1) % width} + i{d}")
+        lines.append(f"{ind}    i{d} = i{d} + 1")
+    lines.append(" + ".join(f"v{i}" for i in range(width)).join(["print(", ")"]))
+    return "\n".join(lines) + "\n"
+
+def select_program(src_str: str) -> Any:
+    reset_fresh_counters()
+    ast: Any = parse(src_str)
+    type_check(ast)
+    for p in [shrink, uniquify, reveal, conv_ass, closure_conv, limit, alloc, monadic, explicate, select]:
+        ast = p(ast)
+    return ast
+
+def measure(name: str, size: int, src_str: str) -> None:
+    p = select_program(src_str)
+    blocks = sum(len(f.body) for f in p)
+    instrs = sum(len(b) for f in p for b in f.body.values())
+
+    start = perf_counter()
+    ssa = construct_ssa(p)
+    t_construct = perf_counter() - start
+    start = perf_counter()
+    check_ssa(ssa)
+    t_check = perf_counter() - start
+    start = perf_counter()
+    destruct_ssa(ssa)
+    t_destruct = perf_counter() - start
+
+    phis = sum(len(phis) for f in ssa for phis in f.phis.values())
+    print(
+        f"{name:>6} {size:>6} {blocks:>7} {instrs:>7} {phis:>7} "
+        f"{t_construct:>10.3f} {t_check:>10.3f} {t_destruct:>10.3f}"
+    )
+
+print(f"{'shape':>6} {'size':>6} {'blocks':>7} {'instrs':>7} {'phis':>7} "
+      f"{'build (s)':>10} {'check (s)':>10} {'out (s)':>10}")
+for n in args.ifs:
+    measure("ifs", n, consecutive_ifs(n, args.width))
+for depth in args.depth:
+    measure("loops", depth, nested_loops(depth, args.width))
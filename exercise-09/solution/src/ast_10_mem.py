@@ -1,14 +1,17 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, TextIO
 
 from register import Register
 from label import Label
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.writing import write_to_str
 
 # Integer and Boolean Constants
 
-@dataclass
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Const:
     value: int
     size: Literal['63bit', '64bit']
@@ -21,7 +24,7 @@ type ArgRead = ArgWrite | Label | Const
 # Instructions
 type Instr = Move | Call | Instr2 | Jump | Branch
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Offset:
     reg: 'Register | Label | Offset'
     offset: int
@@ -31,23 +34,23 @@ class Offset:
 
 # Move Instruction
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Move:
     dst: ArgWrite
     src: ArgRead
 
 # Call Instruction
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call:
     label: ArgRead
     ty: Literal['normal', 'tail call'] # whether to do a tail-call or not
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Jump:
     label: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Branch:                                  # no reason to use them
     name: Literal["beq", "bne", "blt", "bge"]  # name of the comparison
     src1: ArgRead
@@ -58,7 +61,7 @@ class Branch:                                  # no reason to use them
 
 type Instr2Name = Literal["add", "sub", "mul", "div", "xor", "sltu", "slt", "and", "sll", "srl"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Instr2:
     name: Instr2Name
     dst: ArgWrite
@@ -72,7 +75,7 @@ type Blocks = dict[Label, Block]
 
 # Functions
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Function:
     entry_label: Label
     start_label: Label
@@ -85,22 +88,26 @@ type Program = IList[Function]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_fun(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_fun(f: Function) -> str:
-    body_str = "\n".join(
-        f"{lab}:\n" + pretty_block(block)
-        for lab, block in f.body.items()
-    )
-    return f"def {f.entry_label}:\n" + indent(
-        f"START_LABEL: {f.start_label}\n" +
-        f"END_LABEL: {f.end_label}\n" +
-        body_str
-    )
+    return write_to_str(lambda out: write_fun(out, f))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, f in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_fun(out, f)
+
+def write_fun(out: TextIO, f: Function) -> None:
+    out.write(f"def {f.entry_label}:\n")
+    out.write(f"    START_LABEL: {f.start_label}\n")
+    out.write(f"    END_LABEL: {f.end_label}\n")
+    for lab, block in f.body.items():
+        out.write(f"    {lab}:\n")
+        for i in block:
+            out.write(f"    {pretty_instr(i)}\n")
 
 def pretty_block(b: Block) -> str:
     return "\n".join([pretty_instr(i) for i in b])
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
+from typing import TextIO
 
 from register import Register
 from label import Label
 from types_ import *
 from util.immutable_list import IList
+from util.writing import write_to_str
 import ast_12_riscv as riscv
 
 from ast_12_riscv import (
@@ -31,11 +33,11 @@ type Instr = riscv.Instr | TailJump | TailJumpIndirect
 
 # Invented instructions for tail calls
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TailJump:
     target: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TailJumpIndirect:
     target: Register
 
@@ -46,7 +48,7 @@ type Blocks = dict[Label, Block]
 
 # Functions
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Function:
     entry_label: Label
     start_label: Label
@@ -59,22 +61,26 @@ type Program = IList[Function]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_fun(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_fun(f: Function) -> str:
-    body_str = "\n".join(
-        f"{lab}:\n" + pretty_block(block)
-        for lab, block in f.body.items()
-    )
-    return f"def {f.entry_label}:\n" + indent(
-        f"START_LABEL: {f.start_label}\n" +
-        f"END_LABEL: {f.end_label}\n" +
-        body_str
-    )
+    return write_to_str(lambda out: write_fun(out, f))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, f in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_fun(out, f)
+
+def write_fun(out: TextIO, f: Function) -> None:
+    out.write(f"def {f.entry_label}:\n")
+    out.write(f"    START_LABEL: {f.start_label}\n")
+    out.write(f"    END_LABEL: {f.end_label}\n")
+    for lab, block in f.body.items():
+        out.write(f"    {lab}:\n")
+        for i in block:
+            out.write(f"    {pretty_instr(i)}\n")
 
 def pretty_block(b: Block) -> str:
     return "\n".join([pretty_instr(i) for i in b])
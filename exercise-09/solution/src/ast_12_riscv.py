@@ -11,7 +11,7 @@ type Const = int
 
 # Offsets
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Offset:
     reg: Register
     offset: int
@@ -27,12 +27,12 @@ type Instr = Label | Load | LoadAddress | Store | RInstr | IInstr2 | IInstr1 \
 type Directive = DGlobal | DAlign
 
 # .globl LABEL
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DGlobal:
     label: Label
 
 # .align INT
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DAlign:
     num_bits: int
 
@@ -40,7 +40,7 @@ class DAlign:
 
 type RInstrName = Literal["add", "sub", "mul", "div", "and", "xor", "sltu", "slt", "sll", "srl"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RInstr:
     name: RInstrName  # name of the instruction
     rd: Register  # destination register
@@ -51,7 +51,7 @@ class RInstr:
 
 type IInstr2Name = Literal["addi", "xori", "slti", "slli", "srli"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IInstr2:
     name: IInstr2Name  # name of the instruction
     rd: Register  # destination register
@@ -62,7 +62,7 @@ class IInstr2:
 
 type IInstr1Name = Literal["li"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IInstr1:
     name: IInstr1Name  # name of the instruction
     rd: Register  # destination register
@@ -71,19 +71,19 @@ class IInstr1:
 # Memory Instructions
 
 # ld DST,SRC
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Load:
     dst: Register
     src: Offset
 
 # sd SRC,DST
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Store:
     src: Register
     dst: Offset
 
 # la DST,SRC_LABEL
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LoadAddress:
     dst: Register
     src: Label
@@ -91,28 +91,28 @@ class LoadAddress:
 # Control Flow Instructions
 
 # call
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call:
     target: Label
 
 # jalr register
 # short for:
 # jalr ra, register, 0
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CallIndirect:
     target: Register
 
 # j label
 # short for:
 # jal zero, label, 0
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Jump:
     label: Label
 
 # jr register
 # short for:
 # jalr zero, register, 0
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class JumpIndirect:
     label: Register
     offset: int
@@ -120,7 +120,7 @@ class JumpIndirect:
 # Branch Instructions
 type BranchName =  Literal["beq", "bne", "blt", "bge"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Branch:
     cc: BranchName # name of the comparison
     rs1: Register  # source register 1
@@ -128,7 +128,7 @@ class Branch:
     target: Label  # target block
 
 # ret
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Return:
     pass
 
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
 
-from typing import Literal, cast, Optional
+from typing import Literal, TextIO, cast, Optional
 
 from identifier import Id
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.trampoline import Rec, trampoline
+from util.writing import write_to_str
 
 # Unary Operators
 
@@ -20,59 +23,60 @@ type Expr = EConst | EVar | EOp1 | EOp2 | EInput | EIf \
           | ETuple | ETupleAccess | ETupleLen \
           | ECall | ELambda | EField
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class EConst:
     value: int | bool | None
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EVar:
     name: Id
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp1:
     op: Op1
     operand: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2:
     left: Expr
     op: Op2
     right: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EInput:
     pass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EIf:
     test: Expr
     body: Expr
     orelse: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETuple:
     es: IList[Expr]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleAccess:
     e: Expr
     index: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleLen:
     e: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ECall:
     fun: Expr
     args: IList[Expr]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ELambda:
     params: IList[Id]
     body: Expr
 
-@dataclass
+@dataclass(slots=True)
 class EField:
     e: Expr
     name: Id
@@ -82,36 +86,36 @@ class EField:
 
 type Stmt = SExpr | SPrint | SAssign | SIf | SWhile | SReturn | SClass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SExpr:
     expr: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SPrint:
     expr: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SAssign:
     lhs: Id
     ty: Optional[Type]
     rhs: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SIf:
     test: Expr
     body: IList[Stmt]
     orelse: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SWhile:
     test: Expr
     body: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SReturn:
     e: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SClass:
     name: Id
     fields: IList[tuple[Id, Type]]
@@ -121,7 +125,7 @@ class SClass:
 type Decl = DFun
 
 # Function Definition
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DFun:
     name: Id
     params: IList[tuple[Id, Type]]
@@ -130,81 +134,145 @@ class DFun:
 
 # Programs
 
-@dataclass
+@dataclass(slots=True)
 class Program:
     body: IList[Decl | Stmt]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n".join(pretty_decl_or_stmt(d) for d in p.body)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_decl_or_stmt(d: Decl | Stmt) -> str:
+    return write_to_str(lambda out: trampoline(write_decl_or_stmt(out, d, 0)))
+
+# The printers of statements and expressions are generators, which are run
+# by `trampoline`, so deeply nested programs can be printed as well. The
+# statements are written line by line to a stream with the indentation of
+# their nesting level, and the expressions are written piece by piece to a
+# list and joined at the end, as concatenating the strings of nested blocks
+# or subexpressions is quadratic in the nesting depth. The other syntax
+# trees are printed the same way.
+
+def pretty_stmts(ss: IList[Stmt]) -> str:
+    return write_to_str(lambda out: trampoline(write_stmts(out, ss, 0)))
+
+def pretty_stmt(s: Stmt) -> str:
+    return write_to_str(lambda out: trampoline(write_stmt(out, s, 0)))
+
+def pretty_expr(e: Expr) -> str:
+    return trampoline(pretty_expr_rec(e))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for d in p.body:
+        trampoline(write_decl_or_stmt(out, d, 0))
+
+def write_decl_or_stmt(out: TextIO, d: Decl | Stmt, level: int) -> Rec[None]:
     match d:
         case DFun(name, params, ret_ty, body):
+            indent = "    " * level
             params_str = ", ".join(f"{x}: {pretty_type(t)}" for (x, t) in params)
-            return f"def {name}({params_str}) -> {pretty_type(ret_ty)}:\n" + \
-                   indent(pretty_stmts(body)) + "\n"
+            out.write(f"{indent}def {name}({params_str}) -> {pretty_type(ret_ty)}:\n")
+            yield write_stmts(out, body, level + 1)
+            out.write("\n")
         case stmt:
-            return pretty_stmt(stmt)
+            yield write_stmt(out, stmt, level)
 
-def pretty_stmts(ss: IList[Stmt]) -> str:
-    return "\n".join(pretty_stmt(s) for s in ss)
+def write_stmts(out: TextIO, ss: IList[Stmt], level: int) -> Rec[None]:
+    for s in ss:
+        yield write_stmt(out, s, level)
 
-def pretty_stmt(s: Stmt) -> str:
+def write_stmt(out: TextIO, s: Stmt, level: int) -> Rec[None]:
+    indent = "    " * level
     match s:
         case SExpr(e):
-            return pretty_expr(e)
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}{e_str}\n")
         case SAssign(x, t, e):
+            e_str = yield pretty_expr_rec(e)
             if t is None:
-                return f"{x} = {pretty_expr(e)}"
+                out.write(f"{indent}{x} = {e_str}\n")
             else:
-                return f"{x}: {pretty_type(t)} = {pretty_expr(e)}"
+                out.write(f"{indent}{x}: {pretty_type(t)} = {e_str}\n")
         case SPrint(e):
-            return "print(" + pretty_expr(e) + ")"
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}print({e_str})\n")
         case SIf(test, body, orelse):
-            return f"if {pretty_expr(test)}:\n" \
-                   f"{indent(pretty_stmts(body))}\n" \
-                   f"else:\n" \
-                   f"{indent(pretty_stmts(orelse))}"
+            test_str = yield pretty_expr_rec(test)
+            out.write(f"{indent}if {test_str}:\n")
+            yield write_stmts(out, body, level + 1)
+            out.write(f"{indent}else:\n")
+            yield write_stmts(out, orelse, level + 1)
         case SWhile(test, body):
-            return f"while {pretty_expr(test)}:\n{indent(pretty_stmts(body))}"
+            test_str = yield pretty_expr_rec(test)
+            out.write(f"{indent}while {test_str}:\n")
+            yield write_stmts(out, body, level + 1)
         case SReturn(e):
-            return f"return {pretty_expr(e)}"
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}return {e_str}\n")
         case SClass(name, fields):
-            field_str = "\n".join(f"{x}: {pretty_type(t)}" for (x, t) in fields)
-            return f"class {name}:\n{indent(field_str)}\n"
-
-def pretty_expr(e: Expr) -> str:
+            out.write(f"{indent}class {name}:\n")
+            for (x, t) in fields:
+                out.write(f"{indent}    {x}: {pretty_type(t)}\n")
+            out.write("\n")
+
+def pretty_expr_rec(e: Expr) -> Rec[str]:
+    out: list[str] = []
+    yield write_expr(out, e)
+    return "".join(out)
+
+def write_exprs(out: list[str], es: IList[Expr]) -> Rec[None]:
+    for i, e in enumerate(es):
+        if i > 0:
+            out.append(", ")
+        yield write_expr(out, e)
+
+def write_expr(out: list[str], e: Expr) -> Rec[None]:
     match e:
         case EConst(x) | EVar(x):
-            return str(x)
+            out.append(str(x))
         case EOp1(op, e):
-            return f"{op} {pretty_expr(e)}"
+            out.append(f"{op} ")
+            yield write_expr(out, e)
         case EOp2(e1, op, e2):
-            return f"({pretty_expr(e1)} {op} {pretty_expr(e2)})"
+            out.append("(")
+            yield write_expr(out, e1)
+            out.append(f" {op} ")
+            yield write_expr(out, e2)
+            out.append(")")
         case EInput():
-            return "input_int()"
+            out.append("input_int()")
         case EIf(test, body, orelse):
-            return f"({pretty_expr(body)} if {pretty_expr(test)} else {pretty_expr(orelse)})"
+            out.append("(")
+            yield write_expr(out, body)
+            out.append(" if ")
+            yield write_expr(out, test)
+            out.append(" else ")
+            yield write_expr(out, orelse)
+            out.append(")")
         case ETuple(entries):
-            return "(" + ", ".join(pretty_expr(e) for e in entries) + ")"
+            out.append("(")
+            yield write_exprs(out, entries)
+            out.append(")")
         case ETupleAccess(e, i):
-            return f"{pretty_expr(e)}[{i}]"
+            yield write_expr(out, e)
+            out.append(f"[{i}]")
         case ETupleLen(e):
-            return f"len({pretty_expr(e)})"
+            out.append("len(")
+            yield write_expr(out, e)
+            out.append(")")
         case ECall(func, args):
-            args_str = ", ".join(pretty_expr(e) for e in args)
-            return f"{pretty_expr(func)}({args_str})"
+            yield write_expr(out, func)
+            out.append("(")
+            yield write_exprs(out, args)
+            out.append(")")
         case ELambda(params, body):
             params_str = ", ".join(str(x) for x in params)
-            body_str = pretty_expr(body)
-            return f"lambda {params_str}: {body_str}"
+            out.append(f"lambda {params_str}: ")
+            yield write_expr(out, body)
         case EField(e, name, _):
-            return f"{pretty_expr(e)}.{name}"
+            yield write_expr(out, e)
+            out.append(f".{name}")
 
 def pretty_anything(x: Program | Decl | Stmt | Expr) -> str:
     try:
@@ -1,11 +1,15 @@
 from dataclasses import dataclass
-from typing import Literal
+from io import StringIO
+from typing import Literal, TextIO
 
 from identifier import Id
 from label import Label
 
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.trampoline import Rec, trampoline
+from util.writing import write_line, write_to_str
 
 # Unary Operators
 
@@ -25,64 +29,65 @@ type Expr = EConst | EVar | EOp1 | EOp2 | EInput | EIf \
           | ETupleAccess | ETupleLen | EBegin | EAllocate | EGlobal \
           | ECall | EFunRef
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class EConst:
     value: int | bool | None
     size: Literal['64bit', '63bit']
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EVar:
     name: Id
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp1:
     op: Op1
     operand: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2:
     left: Expr
     op: Op2
     right: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EInput:
     pass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EIf:
     test: Expr
     body: Expr
     orelse: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleAccess:
     e: Expr
     index: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleLen:
     e: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EBegin:
     body: IList['Stmt']
     tail: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EAllocate:
     num_elems: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EGlobal:
     var: Global
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ECall:
     fun: Expr
     args: IList[Expr]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EFunRef:
     fun: Label
 
@@ -90,11 +95,11 @@ class EFunRef:
 
 type Lhs = LId | LSubscript
 
-@dataclass
+@dataclass(slots=True)
 class LId:
     id: Id
 
-@dataclass
+@dataclass(slots=True)
 class LSubscript:
     e: Expr
     offset: int
@@ -103,35 +108,35 @@ class LSubscript:
 
 type Stmt = SExpr | SPrint | SAssign | SIf | SWhile | SCollect | SReturn
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SExpr:
     expr: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SPrint:
     expr: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SAssign:
     lhs: Lhs
     rhs: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SIf:
     test: Expr
     body: IList[Stmt]
     orelse: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SWhile:
     test: Expr
     body: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SCollect:
     num_words: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SReturn:
     e: Expr
 
@@ -140,7 +145,7 @@ class SReturn:
 type Decl = DFun
 
 # Function Definition
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DFun:
     name: Label
     params: IList[Id]
@@ -152,80 +157,132 @@ type Program = IList[Decl]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_decl(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_decl(d: Decl) -> str:
+    return write_to_str(lambda out: write_decl(out, d))
+
+def pretty_stmts(ss: IList[Stmt]) -> str:
+    return write_to_str(lambda out: trampoline(write_stmts(out, ss, 0)))
+
+def pretty_stmt(s: Stmt) -> str:
+    return write_to_str(lambda out: trampoline(write_stmt(out, s, 0)))
+
+def pretty_expr(e: Expr) -> str:
+    return trampoline(pretty_expr_rec(e))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, d in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_decl(out, d)
+
+def write_decl(out: TextIO, d: Decl) -> None:
     match d:
         case DFun(name, params, body):
             params_str = ", ".join(str(x) for x in params)
-            return f"def {name}({params_str}):\n" + \
-                   indent(pretty_stmts(body))
+            out.write(f"def {name}({params_str}):\n")
+            trampoline(write_stmts(out, body, 1))
 
-def pretty_stmts(ss: IList[Stmt]) -> str:
-    return "\n".join(pretty_stmt(s) for s in ss)
+def write_stmts(out: TextIO, ss: IList[Stmt], level: int) -> Rec[None]:
+    for s in ss:
+        yield write_stmt(out, s, level)
 
-def pretty_stmt(s: Stmt) -> str:
+def write_stmt(out: TextIO, s: Stmt, level: int) -> Rec[None]:
+    indent = "    " * level
     match s:
         case SExpr(e):
-            return pretty_expr(e)
+            e_str = yield pretty_expr_rec(e)
+            write_line(out, indent, e_str)
         case SAssign(lhs, e):
-            return pretty_lhs(lhs) + " = " + pretty_expr(e)
+            lhs_str = yield pretty_lhs_rec(lhs)
+            e_str = yield pretty_expr_rec(e)
+            write_line(out, indent, f"{lhs_str} = {e_str}")
         case SPrint(e):
-            return "print(" + pretty_expr(e) + ")"
+            e_str = yield pretty_expr_rec(e)
+            write_line(out, indent, f"print({e_str})")
         case SIf(test, body, orelse):
-            return f"if {pretty_expr(test)}:\n" \
-                   f"{indent(pretty_stmts(body))}\n" \
-                   f"else:\n" \
-                   f"{indent(pretty_stmts(orelse))}"
+            test_str = yield pretty_expr_rec(test)
+            write_line(out, indent, f"if {test_str}:")
+            yield write_stmts(out, body, level + 1)
+            write_line(out, indent, "else:")
+            yield write_stmts(out, orelse, level + 1)
         case SWhile(test, body):
-            return f"while {pretty_expr(test)}:\n{indent(pretty_stmts(body))}"
+            test_str = yield pretty_expr_rec(test)
+            write_line(out, indent, f"while {test_str}:")
+            yield write_stmts(out, body, level + 1)
         case SCollect(num_words):
-            return f"collect({num_words})"
+            write_line(out, indent, f"collect({num_words})")
         case SReturn(e):
-            return f"return {pretty_expr(e)}"
+            e_str = yield pretty_expr_rec(e)
+            write_line(out, indent, f"return {e_str}")
 
-def pretty_lhs(lhs: Lhs) -> str:
+def pretty_lhs_rec(lhs: Lhs) -> Rec[str]:
     match lhs:
         case LId(x):
             return str(x)
         case LSubscript(e, i):
-            return f"{pretty_expr(e)}[{i}]"
+            e_str = yield pretty_expr_rec(e)
+            return f"{e_str}[{i}]"
 
-def pretty_expr(e: Expr) -> str:
+def pretty_expr_rec(e: Expr) -> Rec[str]:
+    out: list[str] = []
+    yield write_expr(out, e)
+    return "".join(out)
+
+def write_exprs(out: list[str], es: IList[Expr]) -> Rec[None]:
+    for i, e in enumerate(es):
+        if i > 0:
+            out.append(", ")
+        yield write_expr(out, e)
+
+def write_expr(out: list[str], e: Expr) -> Rec[None]:
     match e:
         case EVar(x):
-            return str(x)
+            out.append(str(x))
         case EConst(x, size):
-            return str(x) + ("" if size == "64bit" else "°")
+            out.append(str(x) + ("" if size == "64bit" else "°"))
         case EOp1(op, e):
-            return f"{op} {pretty_expr(e)}"
+            out.append(f"{op} ")
+            yield write_expr(out, e)
         case EOp2(e1, op, e2):
-            return f"({pretty_expr(e1)} {op} {pretty_expr(e2)})"
+            out.append("(")
+            yield write_expr(out, e1)
+            out.append(f" {op} ")
+            yield write_expr(out, e2)
+            out.append(")")
         case EInput():
-            return "input_int()"
+            out.append("input_int()")
         case EIf(test, body, orelse):
-            return f"({pretty_expr(body)} if {pretty_expr(test)} else {pretty_expr(orelse)})"
+            out.append("(")
+            yield write_expr(out, body)
+            out.append(" if ")
+            yield write_expr(out, test)
+            out.append(" else ")
+            yield write_expr(out, orelse)
+            out.append(")")
         case ETupleAccess(e, i):
-            return f"{pretty_expr(e)}[{i}]"
+            yield write_expr(out, e)
+            out.append(f"[{i}]")
         case ETupleLen(e):
-            return f"len({pretty_expr(e)})"
+            out.append("len(")
+            yield write_expr(out, e)
+            out.append(")")
         case EBegin(ss, e):
-            ss_str = "\n".join(pretty_stmt(s) for s in ss)
-            return "begin {\n" + indent(f"{ss_str}\n{pretty_expr(e)}") + "\n}"
+            ss_out = StringIO()
+            yield write_stmts(ss_out, ss, 1)
+            e_str = yield pretty_expr_rec(e)
+            out.append("begin {\n" + ss_out.getvalue() +
+                       "    " + e_str.replace("\n", "\n    ") + "\n}")
         case EGlobal(g):
-            return "@" + g
+            out.append("@" + g)
         case EAllocate(n):
-            return f"allocate({n})"
-        case ETupleAccess(e, i):
-            return f"{pretty_expr(e)}[{i}]"
-        case ETupleLen(e):
-            return f"len({pretty_expr(e)})"
+            out.append(f"allocate({n})")
         case ECall(func, args):
-            args_str = ", ".join(pretty_expr(e) for e in args)
-            return f"{pretty_expr(func)}({args_str})"
+            yield write_expr(out, func)
+            out.append("(")
+            yield write_exprs(out, args)
+            out.append(")")
         case EFunRef(name):
-            return f"{name}"
+            out.append(f"{name}")
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, TextIO
 
 from identifier import Id
 from label import Label
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.trampoline import Rec, trampoline
+from util.writing import write_to_str
 
 # Unary Operators
 
@@ -19,12 +22,13 @@ type Op2Comp = Literal["==", "!=", "<=", "<", ">", ">="]
 
 type ExprAtom = EConst | EVar
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class EConst:
     value: int | bool | None
     size: Literal['64bit', '63bit']
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EVar:
     name: Id
 
@@ -34,52 +38,52 @@ type Expr = ExprAtom | EOp1 | EOp2Arith | EOp2Comp | EInput \
           | ETupleAccess | ETupleLen | EAllocate | EGlobal \
           | ECall | EFunRef
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp1:
     op: Op1
     operand: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2Arith:
     left: ExprAtom
     op: Op2Arith
     right: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EInput:
     pass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2Comp:
     left: ExprAtom
     cmp: Op2Comp
     right: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleAccess:
     e: ExprAtom
     index: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleLen:
     e: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EAllocate:
     num_elems: int
 
 type Global = Literal['gc_free_ptr', 'gc_fromspace_end']
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EGlobal:
     var: Global
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ECall:
     fun: ExprAtom
     args: IList[ExprAtom]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EFunRef:
     fun: Label
 
@@ -87,11 +91,11 @@ class EFunRef:
 
 type Lhs = LId | LSubscript
 
-@dataclass
+@dataclass(slots=True)
 class LId:
     id: Id
 
-@dataclass
+@dataclass(slots=True)
 class LSubscript:
     e: ExprAtom
     offset: int
@@ -100,32 +104,32 @@ class LSubscript:
 
 type Stmt = SPrint | SAssign | SIf | SWhile | SCollect | SReturn
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SPrint:
     expr: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SAssign:
     lhs: Lhs
     rhs: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SIf:
     test: EOp2Comp
     body: IList[Stmt]
     orelse: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SWhile:
     test_body: IList[Stmt]
     test_expr: EOp2Comp
     loop_body: IList[Stmt]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SCollect:
     num_bytes: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SReturn:
     e: Expr
 
@@ -134,7 +138,7 @@ class SReturn:
 type Decl = DFun
 
 # Function Definition
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DFun:
     name: Label
     params: IList[Id]
@@ -146,85 +150,121 @@ type Program = IList[Decl]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_decl(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_decl(d: Decl) -> str:
+    return write_to_str(lambda out: write_decl(out, d))
+
+def pretty_stmts(ss: IList[Stmt]) -> str:
+    return write_to_str(lambda out: trampoline(write_stmts(out, ss, 0)))
+
+def pretty_stmt(s: Stmt) -> str:
+    return write_to_str(lambda out: trampoline(write_stmt(out, s, 0)))
+
+def pretty_expr(e: Expr) -> str:
+    return trampoline(pretty_expr_rec(e))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, d in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_decl(out, d)
+
+def write_decl(out: TextIO, d: Decl) -> None:
     match d:
         case DFun(name, params, body):
             params_str = ", ".join(str(x) for x in params)
-            return f"def {name}({params_str}):\n" + \
-                   indent(pretty_stmts(body))
+            out.write(f"def {name}({params_str}):\n")
+            trampoline(write_stmts(out, body, 1))
 
-def pretty_stmts(ss: IList[Stmt]) -> str:
-    return "\n".join(pretty_stmt(s) for s in ss)
+def write_stmts(out: TextIO, ss: IList[Stmt], level: int) -> Rec[None]:
+    for s in ss:
+        yield write_stmt(out, s, level)
 
-def pretty_stmt(s: Stmt) -> str:
+def write_stmt(out: TextIO, s: Stmt, level: int) -> Rec[None]:
+    indent = "    " * level
     match s:
         case SAssign(lhs, e):
-            return pretty_lhs(lhs) + " = " + pretty_expr(e)
+            lhs_str = yield pretty_lhs_rec(lhs)
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}{lhs_str} = {e_str}\n")
         case SPrint(e):
-            return "print(" + pretty_expr(e) + ")"
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}print({e_str})\n")
         case SIf(test, body, orelse):
-            return f"if {pretty_expr(test)}:\n" \
-                   f"{indent(pretty_stmts(body))}\n" \
-                   f"else:\n" \
-                   f"{indent(pretty_stmts(orelse))}"
+            test_str = yield pretty_expr_rec(test)
+            out.write(f"{indent}if {test_str}:\n")
+            yield write_stmts(out, body, level + 1)
+            out.write(f"{indent}else:\n")
+            yield write_stmts(out, orelse, level + 1)
         case SWhile(test_body, test_expr, loop_body):
+            test_expr_str = yield pretty_expr_rec(test_expr)
             if len(test_body) > 0:
-                test_body_str = "".join(pretty_stmt(s) + "\n" for s in test_body)
-                return (
-                    "while {\n" +
-                    indent(test_body_str + pretty_expr(test_expr)) + "\n" +
-                    "}:\n" +
-                    indent(pretty_stmts(loop_body))
-                )
+                out.write(f"{indent}while {{\n")
+                yield write_stmts(out, test_body, level + 1)
+                out.write(f"{indent}    {test_expr_str}\n")
+                out.write(f"{indent}}}:\n")
             else:
-                return (
-                    "while { " + pretty_expr(test_expr) + " }:\n" +
-                    indent(pretty_stmts(loop_body))
-                )
+                out.write(f"{indent}while {{ {test_expr_str} }}:\n")
+            yield write_stmts(out, loop_body, level + 1)
         case SCollect(num_words):
-            return f"collect({num_words})"
+            out.write(f"{indent}collect({num_words})\n")
         case SReturn(e):
-            return f"return {pretty_expr(e)}"
+            e_str = yield pretty_expr_rec(e)
+            out.write(f"{indent}return {e_str}\n")
 
-def pretty_lhs(lhs: Lhs) -> str:
+def pretty_lhs_rec(lhs: Lhs) -> Rec[str]:
     match lhs:
         case LId(x):
             return str(x)
         case LSubscript(e, i):
-            return f"{pretty_expr(e)}[{i}]"
+            e_str = yield pretty_expr_rec(e)
+            return f"{e_str}[{i}]"
 
-def pretty_expr(e: Expr) -> str:
+def pretty_expr_rec(e: Expr) -> Rec[str]:
+    out: list[str] = []
+    yield write_expr(out, e)
+    return "".join(out)
+
+def write_exprs(out: list[str], es: IList[Expr]) -> Rec[None]:
+    for i, e in enumerate(es):
+        if i > 0:
+            out.append(", ")
+        yield write_expr(out, e)
+
+def write_expr(out: list[str], e: Expr) -> Rec[None]:
     match e:
         case EVar(x):
-            return str(x)
+            out.append(str(x))
         case EConst(x, size):
-            return str(x) + ("" if size == "64bit" else "°")
+            out.append(str(x) + ("" if size == "64bit" else "°"))
         case EOp1(op, e):
-            return f"{op} {pretty_expr(e)}"
+            out.append(f"{op} ")
+            yield write_expr(out, e)
         case EOp2Arith(e1, op, e2) | EOp2Comp(e1, op, e2):
-            return f"({pretty_expr(e1)} {op} {pretty_expr(e2)})"
+            out.append("(")
+            yield write_expr(out, e1)
+            out.append(f" {op} ")
+            yield write_expr(out, e2)
+            out.append(")")
         case EInput():
-            return "input_int()"
+            out.append("input_int()")
         case ETupleAccess(e, i):
-            return f"{pretty_expr(e)}[{i}]"
+            yield write_expr(out, e)
+            out.append(f"[{i}]")
         case ETupleLen(e):
-            return f"len({pretty_expr(e)})"
+            out.append("len(")
+            yield write_expr(out, e)
+            out.append(")")
         case EGlobal(g):
-            return "@" + g
+            out.append("@" + g)
         case EAllocate(n):
-            return f"allocate({n})"
-        case ETupleAccess(e, i):
-            return f"{pretty_expr(e)}[{i}]"
-        case ETupleLen(e):
-            return f"len({pretty_expr(e)})"
+            out.append(f"allocate({n})")
         case ECall(func, args):
-            args_str = ", ".join(pretty_expr(e) for e in args)
-            return f"{pretty_expr(func)}({args_str})"
+            yield write_expr(out, func)
+            out.append("(")
+            yield write_exprs(out, args)
+            out.append(")")
         case EFunRef(name):
-            return f"{name}"
+            out.append(f"{name}")
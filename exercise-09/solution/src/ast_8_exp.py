@@ -1,11 +1,13 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, TextIO
 
 
 from identifier import Id
 from label import Label
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.writing import write_to_str
 
 # Unary Operators
 
@@ -19,12 +21,13 @@ type Op2Arith = Literal["+", "-"]
 
 type ExprAtom = EConst | EVar
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class EConst:
     value: int | bool | None
     size: Literal['64bit', '63bit']
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EVar:
     name: Id
 
@@ -34,54 +37,54 @@ type Expr = ExprAtom | EOp1 | EOp2Arith | EInput | EOp2Comp \
           | ETupleAccess | ETupleLen | EAllocate | EGlobal \
           | ECall | EFunRef
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp1:
     op: Op1
     operand: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2Arith:
     left: ExprAtom
     op: Op2Arith
     right: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EInput:
     pass
 
 type Op2Comp = Literal["==", "!=", "<=", "<", ">", ">="]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EOp2Comp:
     left: ExprAtom
     cmp: Op2Comp
     right: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleAccess:
     e: ExprAtom
     index: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETupleLen:
     e: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EAllocate:
     num_elems: int
 
 type Global = Literal['gc_free_ptr', 'gc_fromspace_end']
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EGlobal:
     var: Global
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ECall:
     fun: ExprAtom
     args: IList[ExprAtom]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EFunRef:
     fun: Label
 
@@ -89,11 +92,11 @@ class EFunRef:
 
 type Lhs = LId | LSubscript
 
-@dataclass
+@dataclass(slots=True)
 class LId:
     id: Id
 
-@dataclass
+@dataclass(slots=True)
 class LSubscript:
     e: ExprAtom
     offset: int
@@ -102,35 +105,35 @@ class LSubscript:
 
 type Stmt = SPrint | SAssign | SIf | SGoto | SCollect | SReturn | STailCall
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 
 class SPrint:
     expr: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SAssign:
     lhs: Lhs
     rhs: Expr
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SIf:
     test: EOp2Comp
     body: Label
     orelse: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SGoto:
     target: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SCollect:
     num_bytes: int
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SReturn:
     e: ExprAtom
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class STailCall:
     func: ExprAtom
     args: IList[ExprAtom]
@@ -145,7 +148,7 @@ type Blocks = dict[Label, Block]
 type Decl = DFun
 
 # Function Definition
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DFun:
     name: Label
     params: IList[Id]
@@ -159,28 +162,32 @@ type Program = IList[Decl]
 
 # Pretty Printing
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
-
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_decl(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_decl(d: Decl) -> str:
+    return write_to_str(lambda out: write_decl(out, d))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, d in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_decl(out, d)
+
+def write_decl(out: TextIO, d: Decl) -> None:
     match d:
         case DFun(name, params, start_label, end_label, body):
             params_str = ", ".join(
                 str(x)
                 for x in params
             )
-            body_str = "\n".join(
-                f"{lab}:\n\t" + pretty_block(block)
-                for lab, block in body.items()
-            )
-            return f"def {name}({params_str}):\n" + indent(
-                f"START_LABEL: {start_label}\n" +
-                f"END_LABEL: {end_label}\n" +
-                body_str
-            )
+            out.write(f"def {name}({params_str}):\n")
+            out.write(f"    START_LABEL: {start_label}\n")
+            out.write(f"    END_LABEL: {end_label}\n")
+            for lab, block in body.items():
+                out.write(f"    {lab}:\n")
+                for s in block:
+                    out.write(f"    \t{pretty_stmt(s)}\n")
 
 def pretty_block(p: Block) -> str:
     return "\n\t".join(pretty_stmt(s) for s in p)
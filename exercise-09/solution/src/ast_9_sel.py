@@ -1,22 +1,25 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, TextIO
 
 from identifier import Id
 from register import Register
 from label import Label
 from types_ import *
 from util.immutable_list import IList
+from util.interning import interned
+from util.writing import write_to_str
 
 # Constants
 
-@dataclass
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Const:
     value: int
     size: Literal['63bit', '64bit']
 
 # Memory access
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Offset:
     reg: Register | Id | Label
     offset: int
@@ -30,22 +33,22 @@ type ArgRead = ArgWrite | Label | Const
 
 type Instr = Move | Call | Jump | Instr2 | Branch
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Move:
     dst: ArgWrite
     src: ArgRead
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call:
     target: ArgRead                    # address of the function
     arity: int                         # the arity (number of params) of the function
     ty: Literal['normal', 'tail call'] # whether to do a tail-call or not
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Jump:
     target: Label
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Branch:
     name: Literal["beq", "bne", "blt", "bge"]
     src1: ArgRead
@@ -54,7 +57,7 @@ class Branch:
 
 type Instr2Name = Literal["add", "sub", "mul", "div", "xor", "sltu", "slt", "and", "sll", "srl"]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Instr2:
     name: Instr2Name 
     dst: ArgWrite
@@ -68,7 +71,7 @@ type Blocks = dict[Label, Block]
 
 # Functions
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Function:
     entry_label: Label
     start_label: Label
@@ -79,24 +82,78 @@ class Function:
 
 type Program = IList[Function]
 
-# Pretty Printing
+# SSA Form
+#
+# In SSA form each variable is assigned only once (see `pass_9_9_ssa`).
+# Where different assignments of a variable meet, i.e. at the begin of a
+# block with several predecessors, a phi node assigns a new variable the
+# value flowing in from the predecessor the block was entered from. The
+# phi nodes of a block are executed simultaneously.
+
+@dataclass(frozen=True, slots=True)
+class Phi:
+    dst: Id
+    srcs: dict[Label, ArgRead]  # the value for each predecessor
+
+@dataclass(frozen=True, slots=True)
+class SSAFunction:
+    entry_label: Label
+    start_label: Label
+    end_label: Label
+    phis: dict[Label, IList[Phi]]  # the phi nodes of the blocks which have any
+    body: Blocks
+
+type SSAProgram = IList[SSAFunction]
 
-def indent(s: str) -> str:
-    return "\n".join(4 * " " + l for l in s.splitlines())
+# Pretty Printing
 
 def pretty(p: Program) -> str:
-    return "\n\n".join(pretty_fun(d) for d in p)
+    return write_to_str(lambda out: write_program(out, p))
 
 def pretty_fun(f: Function) -> str:
-    body_str = "\n".join(
-        f"{lab}:\n" + pretty_block(block)
-        for lab, block in f.body.items()
-    )
-    return f"def {f.entry_label}:\n" + indent(
-        f"START_LABEL: {f.start_label}\n" +
-        f"END_LABEL: {f.end_label}\n" +
-        body_str
-    )
+    return write_to_str(lambda out: write_fun(out, f))
+
+def write_program(out: TextIO, p: Program) -> None:
+    for i, f in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_fun(out, f)
+
+def write_fun(out: TextIO, f: Function) -> None:
+    out.write(f"def {f.entry_label}:\n")
+    out.write(f"    START_LABEL: {f.start_label}\n")
+    out.write(f"    END_LABEL: {f.end_label}\n")
+    for lab, block in f.body.items():
+        out.write(f"    {lab}:\n")
+        for i in block:
+            out.write(f"    {pretty_instr(i)}\n")
+
+def pretty_ssa(p: SSAProgram) -> str:
+    return write_to_str(lambda out: write_ssa_program(out, p))
+
+def pretty_ssa_fun(f: SSAFunction) -> str:
+    return write_to_str(lambda out: write_ssa_fun(out, f))
+
+def write_ssa_program(out: TextIO, p: SSAProgram) -> None:
+    for i, f in enumerate(p):
+        if i > 0:
+            out.write("\n")
+        write_ssa_fun(out, f)
+
+def write_ssa_fun(out: TextIO, f: SSAFunction) -> None:
+    out.write(f"def {f.entry_label}:\n")
+    out.write(f"    START_LABEL: {f.start_label}\n")
+    out.write(f"    END_LABEL: {f.end_label}\n")
+    for lab, block in f.body.items():
+        out.write(f"    {lab}:\n")
+        for phi in f.phis.get(lab, []):
+            out.write(f"    {pretty_phi(phi)}\n")
+        for i in block:
+            out.write(f"    {pretty_instr(i)}\n")
+
+def pretty_phi(phi: Phi) -> str:
+    srcs_str = ",".join(f"[{lab}: {pretty_arg(a)}]" for lab, a in phi.srcs.items())
+    return f"\tphi\t{pretty_arg(phi.dst)},{srcs_str}"
 
 def pretty_block(b: Block) -> str:
     return "\n".join([pretty_instr(i) for i in b])
@@ -0,0 +1,174 @@
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from sys import exit
+from time import perf_counter
+from typing import Optional
+
+from compile_server import handle_request
+
+# Batch Compilation
+#
+# Compiles many source files in parallel on a pool of worker processes.
+# Each file is compiled on its own: a file which fails to compile, or even
+# crashes the compiler, is reported as failed without aborting the batch.
+# `compile_source` resets the fresh counters of `Id` and `Label` for each
+# compilation, so the assembly does not depend on which worker compiled
+# which files before.
+#
+# A worker process which dies, e.g. by running out of memory, breaks the
+# whole pool, such that the sources which were not compiled yet fail as
+# well. These are compiled again in a fresh pool, and the ones which fail
+# this way again are compiled one by one, so only the sources which kill
+# their worker are reported as failed.
+
+@dataclass(frozen=True)
+class BatchResult:
+    src_path: Path
+    tgt_path: Path
+    exit_code: int
+    wall_time: float
+    output: str
+    # whether the assembly was taken from the compile cache
+    cached: bool = False
+
+def compile_file(src_path: Path, tgt_path: Path, compiler_args: list[str]) -> BatchResult:
+    start = perf_counter()
+    try:
+        src_str = src_path.read_text()
+    except OSError as err:
+        return BatchResult(src_path, tgt_path, 1, 0.0, f"Failed reading from source file {src_path}: {err}\n")
+    response = handle_request({"src": src_str, "args": compiler_args})
+    exit_code = response["exit_code"]
+    output = response["output"]
+    if exit_code == 0:
+        try:
+            tgt_path.parent.mkdir(parents=True, exist_ok=True)
+            tgt_path.write_text(response["asm"])
+        except OSError as err:
+            exit_code = 1
+            output += f"Failed writing to target file {tgt_path}: {err}\n"
+    return BatchResult(src_path, tgt_path, exit_code, perf_counter() - start, output, response["cached"])
+
+def collect_sources(paths: list[Path]) -> list[Path]:
+    src_paths: list[Path] = []
+    for p in paths:
+        if p.is_dir():
+            src_paths += sorted(p.glob("*.py"))
+        else:
+            src_paths.append(p)
+    # a source which is given twice is compiled once
+    return list(dict.fromkeys(src_paths))
+
+def target_paths(src_paths: list[Path], tgt_dir: Path) -> dict[Path, Path]:
+    """
+    Maps the source files to the paths of their assembly in `tgt_dir`, which
+    keep the paths of the sources relative to the common directory of the
+    directories of the sources, e.g. `tests/01/add.py` is saved as
+    `tgt_dir/01/add.S`. Sources with the same name in different
+    directories thus do not overwrite each other's assembly.
+    """
+    abs_paths = {p: Path(os.path.abspath(p)) for p in src_paths}
+    if not abs_paths:
+        return {}
+    root = os.path.commonpath([a.parent.parent for a in abs_paths.values()])
+    return {p: tgt_dir / a.relative_to(root).with_suffix(".S") for p, a in abs_paths.items()}
+
+def compile_pool(
+    src_paths: list[Path],
+    tgt_paths: dict[Path, Path],
+    compiler_args: list[str],
+    jobs: Optional[int],
+    results: dict[Path, BatchResult],
+) -> list[Path]:
+    """
+    Compiles the source files on a pool of `jobs` worker processes and adds
+    their results to `results`. Returns the sources which were not compiled,
+    as a worker process died and broke the pool.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(compile_file, p, tgt_paths[p], compiler_args): p for p in src_paths}
+        for future in as_completed(futures):
+            p = futures[future]
+            try:
+                results[p] = future.result()
+            except BrokenProcessPool:
+                pass
+            except Exception as err:
+                results[p] = BatchResult(p, tgt_paths[p], 1, 0.0, f"Compiling {p} failed: {err!r}\n")
+    return [p for p in src_paths if p not in results]
+
+def compile_batch(
+    src_paths: list[Path], tgt_dir: Path, compiler_args: list[str], jobs: Optional[int] = None
+) -> list[BatchResult]:
+    """
+    Compiles the source files in parallel and saves their assembly in `tgt_dir`,
+    see `target_paths`. Returns the results in the order of the sources.
+    """
+    tgt_paths = target_paths(src_paths, tgt_dir)
+    results: dict[Path, BatchResult] = {}
+    unfinished = compile_pool(src_paths, tgt_paths, compiler_args, jobs, results)
+    if unfinished:
+        unfinished = compile_pool(unfinished, tgt_paths, compiler_args, jobs, results)
+    for p in unfinished:
+        if compile_pool([p], tgt_paths, compiler_args, 1, results):
+            results[p] = BatchResult(p, tgt_paths[p], 1, 0.0, f"Compiling {p} failed: the worker process died\n")
+    return [results[p] for p in src_paths]
+
+def print_report(results: list[BatchResult], wall_time: float) -> None:
+    for r in results:
+        if r.exit_code != 0 and r.output:
+            print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+            print(f"Compiling '{r.src_path}' failed:")
+            print()
+            print(r.output.rstrip())
+            print()
+    print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+    width = max([len(str(r.src_path)) for r in results] + [6])
+    print(f"{'source':<{width}} {'status':<6} {'time (s)':>9}")
+    for r in results:
+        status = "FAILED" if r.exit_code != 0 else "cached" if r.cached else "ok"
+        print(f"{str(r.src_path):<{width}} {status:<6} {r.wall_time:>9.3f}")
+    print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+    failed = [r for r in results if r.exit_code != 0]
+    total = sum(r.wall_time for r in results)
+    cached = sum(1 for r in results if r.cached)
+    print(f"{len(results) - len(failed)} / {len(results)} files compiled, {cached} taken from the compile cache.")
+    print(f"Wall time: {wall_time:.3f}s, summed compile time: {total:.3f}s.")
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        prog="pycomp-batch",
+        description="Compiles many source files in parallel. Additional arguments are "
+        "passed on to the compiler, e.g. --coalesce.",
+        allow_abbrev=False,
+    )
+    arg_parser.add_argument(
+        "srcs", metavar="PATH", nargs="+", help="source files or directories of source files to compile"
+    )
+    arg_parser.add_argument(
+        "-o",
+        "--tgt-dir",
+        metavar="DIR",
+        default="tmp",
+        help="directory to save the assembly to, in the subdirectories of the sources below "
+        "the common directory of their directories (default: tmp)",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="N",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    args, compiler_args = arg_parser.parse_known_args()
+
+    src_paths = collect_sources([Path(p) for p in args.srcs])
+    start = perf_counter()
+    results = compile_batch(src_paths, Path(args.tgt_dir), compiler_args, args.jobs)
+    print_report(results, perf_counter() - start)
+    exit(0 if all(r.exit_code == 0 for r in results) else 1)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Optional
+
+# Compile Cache
+#
+# Stores the assembly of compiled programs on disk, keyed on the hash of
+# the source code, the hash of the compiler's own source code, and the
+# options. The incremental mode stores compiled functions in a subcache.
+# As the compiler produces the same assembly for every hash seed, cached
+# entries can be reused across processes and environments. Entries of an
+# old compiler version are never looked up again, and can be removed by
+# deleting the cache directory.
+
+SRC_DIR = Path(__file__).parent
+
+DEFAULT_CACHE_DIR = SRC_DIR.parent / ".cache"
+
+@cache
+def compiler_version() -> str:
+    """
+    Returns the hash of all python files of the compiler.
+    """
+    h = hashlib.sha256()
+    for path in sorted(SRC_DIR.rglob("*.py")):
+        h.update(str(path.relative_to(SRC_DIR)).encode("utf-8"))
+        h.update(b"\0")
+        h.update(path.read_bytes())
+        h.update(b"\0")
+    return h.hexdigest()
+
+@dataclass
+class CompileCache:
+    """
+    A cache of compiled programs, or of the parts of compiled programs, in
+    the directory `path`, which counts how many lookups were hits and misses.
+    Failures to read or write the cache directory, and entries which can not
+    be unpickled, are treated like misses, as the cache is only an optimization.
+    """
+
+    path: Path = DEFAULT_CACHE_DIR
+    hits: int = 0
+    misses: int = 0
+    # the name of the cache in the statistics
+    name: str = "Compile cache"
+    # the caches in subdirectories, see `subcache`
+    _subcaches: dict[str, 'CompileCache'] = field(default_factory=lambda: {})
+
+    def subcache(self, dir_name: str, name: str) -> 'CompileCache':
+        """
+        Returns the cache in the subdirectory `dir_name`, whose statistics
+        are included in the statistics of this cache.
+        """
+        if dir_name not in self._subcaches:
+            self._subcaches[dir_name] = CompileCache(self.path / dir_name, name=name)
+        return self._subcaches[dir_name]
+
+    def key(self, *parts: str) -> str:
+        """
+        Returns the key of the given parts, e.g. the source code and the
+        `repr` of the options, for the current version of the compiler.
+        """
+        h = hashlib.sha256()
+        for part in [compiler_version(), *parts]:
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _entry(self, key: str, suffix: str) -> Path:
+        return self.path / key[:2] / f"{key[2:]}{suffix}"
+
+    def _read(self, key: str, suffix: str) -> Optional[bytes]:
+        try:
+            data = self._entry(key, suffix).read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def _write(self, key: str, suffix: str, data: bytes) -> None:
+        # The entry is written to a temporary file first and then renamed,
+        # so concurrent compilations never read a partially written entry.
+        entry = self._entry(key, suffix)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile("wb", dir=entry.parent, delete=False) as f:
+                f.write(data)
+            os.replace(f.name, entry)
+        except OSError:
+            pass
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Returns the assembly stored under the key, or None.
+        """
+        data = self._read(key, ".S")
+        return None if data is None else data.decode("utf-8")
+
+    def store(self, key: str, asm: str) -> None:
+        self._write(key, ".S", asm.encode("utf-8"))
+
+    def lookup_object(self, key: str) -> Optional[Any]:
+        """
+        Returns the object pickled under the key, or None.
+        """
+        data = self._read(key, ".pickle")
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError):
+            # the entry is corrupted, e.g. truncated by a full disk
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+    def store_object(self, key: str, obj: Any) -> None:
+        self._write(key, ".pickle", pickle.dumps(obj))
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        out = f"{self.name}: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)."
+        for subcache in self._subcaches.values():
+            out += "\n" + subcache.stats()
+        return out
@@ -0,0 +1,131 @@
+import json
+import os
+import socket
+from argparse import ArgumentParser
+from pathlib import Path
+from sys import exit
+from typing import Any, Optional
+
+# Compile Client
+#
+# Takes the same command line arguments as `compiler.py` and sends the
+# compilation to a running compile server (see `compile_server.py`).
+# If no server is listening on the socket, the program is compiled in
+# this process instead, so the client can always be used in place of
+# `compiler.py`. Only `-i`, `-o` and the verbosity are interpreted here,
+# all other arguments are passed on to the compiler. The paths of the
+# compiler's arguments are made absolute, as the server runs in another
+# working directory.
+
+DEFAULT_SOCKET_PATH = Path(__file__).parent.parent / ".compile_server.sock"
+
+arg_parser = ArgumentParser(
+    prog="pycomp-client",
+    description="Compiles a subset of Python to RISC-V assembly using a compile server, if one is running.",
+    allow_abbrev=False,
+)
+arg_parser.add_argument(
+    "-i", "--src", metavar="PATH", required=True, help="source file to compile"
+)
+arg_parser.add_argument(
+    "-o",
+    "--tgt",
+    metavar="PATH",
+    help="target file to save the assembly to (default: print to stdout)",
+)
+arg_parser.add_argument("-v", "--verbose", action="store_true")
+arg_parser.add_argument("-V", "--very-verbose", action="store_true")
+arg_parser.add_argument(
+    "--socket",
+    metavar="PATH",
+    default=str(DEFAULT_SOCKET_PATH),
+    help=f"socket of the compile server (default: {DEFAULT_SOCKET_PATH.name} in the project directory)",
+)
+
+# the arguments of the compiler which are paths, with their defaults
+# relative to the working directory
+PATH_ARGS: dict[str, Optional[str]] = {
+    "--dump-dir": ".",
+    "--cache-dir": None,
+    "--time-passes-json": None,
+    "--time-passes-trace": None,
+    "--profile-output": None,
+}
+
+path_arg_parser = ArgumentParser(add_help=False, allow_abbrev=False)
+for name, default in PATH_ARGS.items():
+    path_arg_parser.add_argument(name, default=default)
+
+def absolute_path_args(compiler_args: list[str]) -> list[str]:
+    """
+    Returns the arguments of the compiler with absolute paths.
+    """
+    path_args, other_args = path_arg_parser.parse_known_args(compiler_args)
+    for name in PATH_ARGS:
+        path = getattr(path_args, name.removeprefix("--").replace("-", "_"))
+        if path is not None:
+            other_args.append(f"{name}={os.path.abspath(path)}")
+    return other_args
+
+def request_compile(socket_path: str, src_str: str, args: list[str]) -> Optional[dict[str, Any]]:
+    """
+    Sends a compile request to the server listening on the socket.
+    Returns None if no server is listening.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall((json.dumps({"src": src_str, "args": args}) + "\n").encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile("r", encoding="utf-8") as f:
+                return json.loads(f.readline())
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+def main() -> int:
+    args, compiler_args = arg_parser.parse_known_args()
+    compiler_args = absolute_path_args(compiler_args)
+    verbose: bool = args.verbose or args.very_verbose
+    if args.very_verbose:
+        compiler_args.append("-V")
+    elif args.verbose:
+        compiler_args.append("-v")
+
+    try:
+        with open(args.src, "r") as f:
+            src_str = f.read()
+    except OSError as err:
+        print(f"Failed reading from source file {args.src}: {err}")
+        return 1
+
+    response = request_compile(args.socket, src_str, compiler_args)
+    if response is None:
+        import compiler
+        tgt_args = [] if args.tgt is None else ["-o", args.tgt]
+        return compiler.main(["-i", args.src, *tgt_args, *compiler_args])
+
+    if verbose:
+        print("\n===== READING SOURCE FILE =====\n")
+        print(src_str)
+    print(response["output"], end="")
+    if response["exit_code"] != 0:
+        return response["exit_code"]
+
+    tgt_str: str = response["asm"]
+    if verbose:
+        print("\n===== WRITING OUTPUT ASSEMBLY =====\n")
+    if args.tgt is None:
+        print(tgt_str)
+    else:
+        try:
+            with open(args.tgt, "w+") as f:
+                f.write(tgt_str)
+        except OSError as err:
+            print(f"Failed writing to target file {args.tgt}: {err}")
+            return 1
+        if verbose:
+            print(f"Wrote output assembly to file {args.tgt}.")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,126 @@
+import json
+import os
+import sys
+import traceback
+from argparse import ArgumentParser
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO, TextIOWrapper
+from pathlib import Path
+from socketserver import StreamRequestHandler, UnixStreamServer
+from typing import Any, BinaryIO, IO, cast
+
+from compile_cache import CompileCache
+from compiler import (
+    Options,
+    ParseError,
+    TypeError,
+    arg_parser as compiler_arg_parser,
+    compile_cached,
+    instrumentation_from_args,
+    report_instrumentation,
+)
+
+# Compile Server
+#
+# Keeps the compiler loaded in a long running process, such that compiling
+# a small program does not pay for starting python and importing all passes.
+#
+# Requests and responses are JSON objects, one per line:
+#
+#   request:  {"src": SOURCE_TEXT, "args": [ARG, ...]}
+#   response: {"exit_code": INT, "asm": ASSEMBLY_OR_NULL, "output": TEXT, "cached": BOOL}
+#
+# The `args` are command line arguments of `compiler.py` except for `-i` and
+# `-o`, e.g. `["-v", "--coalesce"]`. The `output` contains everything the
+# compiler would have printed, i.e. the verbose output and diagnostics.
+# `cached` tells whether the assembly was taken from the compile cache.
+#
+# Requests are handled one after another, and the fresh counters of `Id`
+# and `Label` are reset for each request, such that the assembly is the
+# same as the one of a cold compile, which does not depend on the hash
+# seed either.
+
+DEFAULT_SOCKET_PATH = Path(__file__).parent.parent / ".compile_server.sock"
+
+# the caches by directory, which are kept across requests, such that
+# `--cache-stats` reports the statistics of the whole server run
+caches: dict[str, CompileCache] = {}
+
+def handle_request(request: dict[str, Any]) -> dict[str, Any]:
+    output = StringIO()
+    asm = None
+    exit_code = 0
+    cached = False
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            args = compiler_arg_parser.parse_args(["-i", "-", *request.get("args", [])])
+            cache = None
+            if not args.no_cache:
+                cache = caches.setdefault(args.cache_dir, CompileCache(Path(args.cache_dir)))
+            instrumentation = instrumentation_from_args(args)
+            hits = cache.hits if cache is not None else 0
+            asm = compile_cached(request["src"], Options.from_args(args), cache, instrumentation)
+            if cache is not None:
+                cached = cache.hits > hits
+                if args.cache_stats:
+                    print(cache.stats())
+            if instrumentation is not None:
+                report_instrumentation(instrumentation, args)
+        except (ParseError, TypeError) as err:
+            print(err)
+            exit_code = 1
+        except SystemExit as err:
+            # invalid arguments, for which argparse already printed the usage
+            exit_code = err.code if isinstance(err.code, int) else 2
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+    return {"exit_code": exit_code, "asm": asm, "output": output.getvalue(), "cached": cached}
+
+def serve_lines(lines_in: IO[str], lines_out: IO[str]) -> None:
+    for line in lines_in:
+        if not line.strip():
+            continue
+        try:
+            response = handle_request(json.loads(line))
+        except (ValueError, KeyError, AttributeError) as err:
+            response = {"exit_code": 2, "asm": None, "output": f"Invalid request: {err}\n", "cached": False}
+        lines_out.write(json.dumps(response) + "\n")
+        lines_out.flush()
+
+class Handler(StreamRequestHandler):
+    def handle(self) -> None:
+        lines_in = TextIOWrapper(cast(BinaryIO, self.rfile), encoding="utf-8")
+        lines_out = TextIOWrapper(cast(BinaryIO, self.wfile), encoding="utf-8")
+        serve_lines(lines_in, lines_out)
+
+def serve_socket(path: Path) -> None:
+    if path.exists():
+        path.unlink()
+    with UnixStreamServer(str(path), Handler) as server:
+        print(f"Compile server listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        prog="compile_server",
+        description="Serves compile requests as JSON lines on stdin/stdout or on a Unix socket.",
+    )
+    arg_parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        nargs="?",
+        const=str(DEFAULT_SOCKET_PATH),
+        help=f"listen on a Unix socket instead of stdin/stdout (default path: {DEFAULT_SOCKET_PATH.name} "
+        "in the project directory)",
+    )
+    args = arg_parser.parse_args()
+    if args.socket is None:
+        serve_lines(sys.stdin, sys.stdout)
+    else:
+        serve_socket(Path(args.socket))
@@ -1,6 +1,10 @@
-from argparse import ArgumentParser
-from sys import exit
-from typing import Any, Optional
+import json
+import sys
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from dataclasses import dataclass, replace
+from pathlib import Path
+from sys import exit, stderr
+from typing import Any, Callable, Iterable, Optional, TextIO
 
 import ast_1_python
 import ast_2_shrunk
@@ -16,21 +20,176 @@ import ast_11_patched
 import ast_12_riscv
 from pass_0_1_parser import parse, ParseError
 from pass_1_2_shrink import shrink
+from pass_1_3_shrink_uniquify_reveal import shrink_uniquify_reveal
 from pass_2_2_uniquify import uniquify
 from pass_2_3_reveal_functions import reveal
+from pass_3_3_inline import inline
 from pass_3_4_convert_assignments import conv_ass
 from pass_4_5_closure_conversion import closure_conv
 from pass_5_5_limit_functions import limit
 from pass_5_6_alloc import alloc
 from pass_6_7_monadic import monadic
 from pass_7_8_explicate import explicate
+from pass_8_8_sccp import sccp
 from pass_8_9_select import select
+from pass_9_9_dead_code import eliminate_dead_code
+from pass_9_9_gvn import gvn
+from pass_9_9_split_live_ranges import split_live_ranges
+from pass_9_9_ssa import check_ssa, construct_ssa, destruct_ssa
 from pass_9_10_assign_homes import assign_homes
 from pass_10_10_optimize import optimize
 from pass_10_11_patch_instructions import patch_instructions
 from pass_11_12_add_prelude import add_prelude_and_conclusion
 from type_checker import type_check, TypeError
-from register_allocation import allocate_registers
+from register_allocation import RegAllocOutput, allocate_registers
+from compile_cache import CompileCache, DEFAULT_CACHE_DIR
+from incremental import compile_incremental
+from instrumentation import Instrumentation, run_pass
+from label import Label
+import identifier
+import label
+
+# Options
+
+@dataclass(frozen=True)
+class Options:
+    verbose: bool = False
+    coalesce: bool = False
+    linear_scan: bool = False
+    split_live_ranges: bool = False
+    incremental: bool = False
+    fused_front_end: bool = False
+    inline: bool = False
+    inline_budget: int = 40
+    sccp: bool = False
+    ssa: bool = False
+    check_ssa: bool = False
+    gvn: bool = False
+    eliminate_dead_code: bool = False
+    dump_after: frozenset[str] = frozenset()
+    dump_dir: str = "."
+
+    @staticmethod
+    def from_args(args: Namespace) -> 'Options':
+        return Options(
+            verbose=args.verbose or args.very_verbose,
+            coalesce=args.coalesce,
+            linear_scan=args.linear_scan,
+            split_live_ranges=args.split_live_ranges,
+            incremental=args.incremental,
+            fused_front_end=args.fused_front_end,
+            inline=args.inline,
+            inline_budget=args.inline_budget,
+            sccp=args.sccp,
+            ssa=args.ssa or args.check_ssa or args.gvn,
+            check_ssa=args.check_ssa,
+            gvn=args.gvn,
+            eliminate_dead_code=args.eliminate_dead_code,
+            dump_dir=args.dump_dir,
+        ).with_dump_after(args.dump_after)
+
+    def with_dump_after(self, names: frozenset[str]) -> 'Options':
+        """
+        Returns the options with `dump_after` set to the given passes, where
+        `all` stands for all passes which run. Exits with a usage error, if
+        one of the passes does not run with the other options, as its file
+        would not be written.
+        """
+        if "all" in names:
+            options = replace(self, dump_after=frozenset(DUMP_PASSES))
+            return replace(options, dump_after=frozenset(n for n in DUMP_PASSES if options.pass_runs(n)))
+        options = replace(self, dump_after=names)
+        for name in sorted(names, key=PASS_NAMES.index):
+            if not options.pass_runs(name):
+                arg_parser.error(f"argument --dump-after: pass '{name}' does not run {PASS_CONDITIONS[name]}")
+        return options
+
+    def pass_runs(self, name: str) -> bool:
+        """
+        Returns True if the pass `name` runs with these options.
+        """
+        match name:
+            case "shrink_uniquify_reveal":
+                return self.fused_front_end and not self.verbose and not self.dump_after & STAGED_PASSES
+            case "shrink" | "uniquify" | "reveal_functions":
+                return not self.pass_runs("shrink_uniquify_reveal")
+            case "inline":
+                return self.inline
+            case "sccp":
+                return self.sccp
+            case "construct_ssa" | "destruct_ssa":
+                return self.ssa
+            case "gvn":
+                return self.gvn
+            case "eliminate_dead_code":
+                return self.eliminate_dead_code
+            case "split_live_ranges":
+                return self.split_live_ranges
+            case _:
+                return True
+
+    def output_key(self) -> str:
+        """
+        The options which affect the assembly, as a key of the compile cache.
+        """
+        return repr(replace(self, verbose=False, dump_after=frozenset(), dump_dir="."))
+
+# the names of the passes in the order they run, as recorded by `--time-passes`
+PASS_NAMES = [
+    "parse",
+    "type_check",
+    "shrink",
+    "uniquify",
+    "reveal_functions",
+    "shrink_uniquify_reveal",
+    "inline",
+    "convert_assignments",
+    "closure_conversion",
+    "limit_functions",
+    "alloc",
+    "monadic",
+    "explicate",
+    "sccp",
+    "select",
+    "construct_ssa",
+    "gvn",
+    "destruct_ssa",
+    "eliminate_dead_code",
+    "split_live_ranges",
+    "allocate_registers",
+    "assign_homes",
+    "optimize",
+    "patch_instructions",
+    "add_prelude_and_conclusion",
+]
+
+# the passes whose output can be dumped with `--dump-after`
+DUMP_PASSES = [name for name in PASS_NAMES if name != "type_check"]
+
+# the passes which the fused front end replaces, see `Options.pass_runs`
+STAGED_PASSES = frozenset({"shrink", "uniquify", "reveal_functions"})
+
+# when the passes which do not always run are skipped, for the errors of `--dump-after`
+PASS_CONDITIONS = {
+    "shrink_uniquify_reveal": "without --fused-front-end, with -v or when dumping "
+    "the output of shrink, uniquify or reveal_functions",
+    "inline": "without --inline",
+    "sccp": "without --sccp",
+    "construct_ssa": "without --ssa",
+    "gvn": "without --gvn",
+    "destruct_ssa": "without --ssa",
+    "eliminate_dead_code": "without --eliminate-dead-code",
+    "split_live_ranges": "without --split-live-ranges",
+}
+
+def dump_pass_names(arg: str) -> frozenset[str]:
+    names = arg.split(",")
+    if "all" in names:
+        return frozenset({"all"})
+    for name in names:
+        if name not in DUMP_PASSES:
+            raise ArgumentTypeError(f"unknown pass '{name}'")
+    return frozenset(names)
 
 # Read commandline arguments
 
@@ -56,154 +215,563 @@ arg_parser.add_argument(
     action="store_true",
     help="debug print also the early parsing chart",
 )
-args = arg_parser.parse_args()
+arg_parser.add_argument(
+    "--coalesce",
+    action="store_true",
+    help="coalesce move-related variables during register allocation",
+)
+arg_parser.add_argument(
+    "--linear-scan",
+    action="store_true",
+    help="allocate registers by linear scan instead of graph coloring, "
+    "which is faster for large functions but may spill more variables "
+    "(--coalesce has no effect then)",
+)
+arg_parser.add_argument(
+    "--split-live-ranges",
+    action="store_true",
+    help="split the live ranges of variables at loops and calls before register allocation, "
+    "which then prefers the same register for both sides of a copy",
+)
+arg_parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="compile each top-level function separately and reuse the compiled "
+    "functions which did not change since an earlier compilation",
+)
+arg_parser.add_argument(
+    "--fused-front-end",
+    action="store_true",
+    help="shrink, uniquify and reveal functions in a single traversal of the program "
+    "(has no effect with -v, which prints the output of each of these passes, "
+    "and when dumping the output of one of them)",
+)
+arg_parser.add_argument(
+    "--inline",
+    action="store_true",
+    help="replace the direct calls of small, non-recursive top-level functions by their bodies "
+    "(has no effect with --incremental, which compiles each function separately)",
+)
+arg_parser.add_argument(
+    "--inline-budget",
+    metavar="N",
+    type=int,
+    default=Options.inline_budget,
+    help="largest size of the functions inlined by --inline, in statements and "
+    f"expressions of their bodies (default: {Options.inline_budget})",
+)
+arg_parser.add_argument(
+    "--sccp",
+    action="store_true",
+    help="propagate constants across blocks, fold them and remove the branches "
+    "which are never taken, before instruction selection",
+)
+arg_parser.add_argument(
+    "--ssa",
+    action="store_true",
+    help="convert the functions to SSA form after instruction selection and back before register allocation",
+)
+arg_parser.add_argument(
+    "--check-ssa",
+    action="store_true",
+    help="check the invariants of the SSA form after its construction (implies --ssa)",
+)
+arg_parser.add_argument(
+    "--gvn",
+    action="store_true",
+    help="remove the instructions which compute a value that is already available "
+    "from a dominating instruction, in SSA form (implies --ssa)",
+)
+arg_parser.add_argument(
+    "--eliminate-dead-code",
+    action="store_true",
+    help="remove the instructions assigning variables which are never read afterwards, "
+    "before register allocation",
+)
+arg_parser.add_argument(
+    "--dump-after",
+    metavar="PASS[,PASS]",
+    type=dump_pass_names,
+    default=frozenset(),
+    help="write the output of the given passes to files in the --dump-dir, named after the "
+    f"number and name of the pass, e.g. {PASS_NAMES.index("select"):02}_select.txt (passes: all, {", ".join(DUMP_PASSES)}). "
+    "The passes must run with the other arguments, and all stands for the passes which run. "
+    "The compile cache and --incremental are not used then",
+)
+arg_parser.add_argument(
+    "--dump-dir",
+    metavar="PATH",
+    default=".",
+    help="directory of the files written by --dump-after (default: the current directory)",
+)
+arg_parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="always run the whole compiler instead of reusing the assembly of an earlier compilation",
+)
+arg_parser.add_argument(
+    "--cache-dir",
+    metavar="PATH",
+    default=str(DEFAULT_CACHE_DIR),
+    help=f"directory of the compile cache (default: {DEFAULT_CACHE_DIR.name} in the project directory)",
+)
+arg_parser.add_argument(
+    "--cache-stats",
+    action="store_true",
+    help="print the number of cache hits and misses",
+)
+arg_parser.add_argument(
+    "--time-passes",
+    action="store_true",
+    help="print the wall time, CPU time, peak memory and output size of each pass "
+    "(the compile cache is not used then)",
+)
+arg_parser.add_argument(
+    "--time-passes-json",
+    metavar="PATH",
+    help="save the measurements of --time-passes as JSON (implies --time-passes)",
+)
+arg_parser.add_argument(
+    "--time-passes-trace",
+    metavar="PATH",
+    help="save the measurements of --time-passes in the Chrome trace event format, "
+    "which can be viewed with chrome://tracing or https://ui.perfetto.dev (implies --time-passes)",
+)
+arg_parser.add_argument(
+    "--profile-pass",
+    metavar="NAME",
+    choices=PASS_NAMES,
+    help=f"profile the pass with cProfile and print the statistics (one of: {", ".join(PASS_NAMES)})",
+)
+arg_parser.add_argument(
+    "--profile-output",
+    metavar="PATH",
+    help="save the profile of --profile-pass to a file for pstats or snakeviz instead of printing it",
+)
 
-src_path: str = args.src
-tgt_path: Optional[str] = args.tgt
-verbose: bool = args.verbose
-very_verbose: bool = args.very_verbose
+# Compilation
 
-if very_verbose:
-    verbose = True
+def reset_fresh_counters() -> None:
+    """
+    Resets the counters of `Id.fresh` and `Label.fresh`, such that compiling
+    a program in a long running process yields the same names as a cold compile.
+    """
+    identifier.fresh_id_counter = 0
+    label.fresh_label_counter = 0
 
-# Compilation
+def compile_source(src_str: str, options: Options, instrumentation: Optional[Instrumentation] = None) -> str:
+    """
+    Compiles the source code to RISC-V assembly.
+    With `options.verbose`, the output of all passes is printed to stdout.
+    With `instrumentation`, the passes are measured and profiled.
+    Raises `ParseError` and `TypeError` for invalid programs.
+    """
+    if options.verbose:
+        print("\n===== PARSING =====\n")
+    ast = run_pass(instrumentation, "parse", parse, src_str)
+    if options.verbose:
+        print(f"{ast}\n")
+        ast_1_python.write_program(sys.stdout, ast)
+    dump_after(options, "parse", ast)
+    return compile_program(ast, options, instrumentation)
+
+def compile_program(
+    p: ast_1_python.Program, options: Options, instrumentation: Optional[Instrumentation] = None
+) -> str:
+    """
+    Compiles a parsed program to RISC-V assembly, like `compile_source`.
+    This allows to compile generated programs which are nested too
+    deeply for Python's parser.
+    Raises `TypeError` for ill-typed programs.
+    """
+    reset_fresh_counters()
+    verbose = options.verbose
+    ast: Any = p
+
+    if verbose:
+        print("\n===== TYPE CHECKING =====\n")
+    run_pass(instrumentation, "type_check", type_check, ast)
+    if verbose:
+        print("Program is well-typed.")
+
+    if options.pass_runs("shrink_uniquify_reveal"):
+        ast = run_pass(instrumentation, "shrink_uniquify_reveal", shrink_uniquify_reveal, ast)
+        dump_after(options, "shrink_uniquify_reveal", ast)
+    else:
+        if verbose:
+            print("\n===== SHRINKING =====\n")
+        ast = run_pass(instrumentation, "shrink", shrink, ast)
+        if verbose:
+            ast_2_shrunk.write_program(sys.stdout, ast)
+        dump_after(options, "shrink", ast)
+
+        if verbose:
+            print("\n===== UNIQUIFY =====\n")
+        ast = run_pass(instrumentation, "uniquify", uniquify, ast)
+        if verbose:
+            ast_2_shrunk.write_program(sys.stdout, ast)
+        dump_after(options, "uniquify", ast)
+
+        if verbose:
+            print("\n===== REVEAL FUNCTIONS =====\n")
+        ast = run_pass(instrumentation, "reveal_functions", reveal, ast)
+        if verbose:
+            ast_3_revealed.write_program(sys.stdout, ast)
+        dump_after(options, "reveal_functions", ast)
+
+    if options.inline:
+        if verbose:
+            print("\n===== INLINING =====\n")
+        ast, decisions = run_pass(instrumentation, "inline", inline, ast, options.inline_budget)
+        if verbose:
+            write_inlined(sys.stdout, ast, decisions)
+        dump_after(options, "inline", (ast, decisions))
+
+    if verbose:
+        print("\n===== CONVERT ASSIGNMENTS =====\n")
+    ast = run_pass(instrumentation, "convert_assignments", conv_ass, ast)
+    if verbose:
+        ast_4_conv_ass.write_program(sys.stdout, ast)
+    dump_after(options, "convert_assignments", ast)
+
+    if verbose:
+        print("\n===== CLOSURE CONVERSION =====\n")
+    ast = run_pass(instrumentation, "closure_conversion", closure_conv, ast)
+    if verbose:
+        ast_5_closures.write_program(sys.stdout, ast)
+    dump_after(options, "closure_conversion", ast)
+
+    if verbose:
+        print("\n===== LIMIT FUNCTIONS =====\n")
+    ast = run_pass(instrumentation, "limit_functions", limit, ast)
+    if verbose:
+        ast_5_closures.write_program(sys.stdout, ast)
+    dump_after(options, "limit_functions", ast)
+
+    if verbose:
+        print("\n===== HEAP ALLOCATION =====\n")
+    ast = run_pass(instrumentation, "alloc", alloc, ast)
+    if verbose:
+        ast_6_alloc.write_program(sys.stdout, ast)
+    dump_after(options, "alloc", ast)
+
+    if verbose:
+        print("\n===== MONADIC NORMALFORM =====\n")
+    ast = run_pass(instrumentation, "monadic", monadic, ast)
+    if verbose:
+        ast_7_mon.write_program(sys.stdout, ast)
+    dump_after(options, "monadic", ast)
+
+    if verbose:
+        print("\n===== EXPLICATE CONTROL =====\n")
+    explicated = run_pass(instrumentation, "explicate", explicate, ast)
+    if verbose:
+        ast_8_exp.write_program(sys.stdout, explicated)
+    dump_after(options, "explicate", explicated)
+
+    if options.sccp:
+        if verbose:
+            print("\n===== CONSTANT PROPAGATION =====\n")
+        explicated = run_pass(instrumentation, "sccp", sccp, explicated)
+        if verbose:
+            ast_8_exp.write_program(sys.stdout, explicated)
+        dump_after(options, "sccp", explicated)
+
+    if verbose:
+        print("\n===== INSTRUCTION SELECTION =====\n")
+    blocks = run_pass(instrumentation, "select", select, explicated)
+    if verbose:
+        ast_9_sel.write_program(sys.stdout, blocks)
+    dump_after(options, "select", blocks)
+
+    if options.ssa:
+        if verbose:
+            print("\n===== SSA CONSTRUCTION =====\n")
+        ssa = run_pass(instrumentation, "construct_ssa", construct_ssa, blocks)
+        if options.check_ssa:
+            check_ssa(ssa)
+        if verbose:
+            ast_9_sel.write_ssa_program(sys.stdout, ssa)
+        dump_after(options, "construct_ssa", ssa)
+
+        if options.gvn:
+            if verbose:
+                print("\n===== GLOBAL VALUE NUMBERING =====\n")
+            ssa, removed = run_pass(instrumentation, "gvn", gvn, ssa)
+            if options.check_ssa:
+                check_ssa(ssa)
+            if verbose:
+                write_removed(sys.stdout, ast_9_sel.write_ssa_program, ssa, removed, "redundant")
+            dump_after(options, "gvn", (ssa, removed))
+
+        if verbose:
+            print("\n===== SSA DESTRUCTION =====\n")
+        blocks = run_pass(instrumentation, "destruct_ssa", destruct_ssa, ssa)
+        if verbose:
+            ast_9_sel.write_program(sys.stdout, blocks)
+        dump_after(options, "destruct_ssa", blocks)
+
+    if options.eliminate_dead_code:
+        if verbose:
+            print("\n===== DEAD CODE ELIMINATION =====\n")
+        blocks, removed = run_pass(instrumentation, "eliminate_dead_code", eliminate_dead_code, blocks)
+        if verbose:
+            write_removed(sys.stdout, ast_9_sel.write_program, blocks, removed, "dead")
+        dump_after(options, "eliminate_dead_code", (blocks, removed))
+
+    if options.split_live_ranges:
+        if verbose:
+            print("\n===== LIVE RANGE SPLITTING =====\n")
+        blocks = run_pass(instrumentation, "split_live_ranges", split_live_ranges, blocks)
+        if verbose:
+            ast_9_sel.write_program(sys.stdout, blocks)
+        dump_after(options, "split_live_ranges", blocks)
 
-if verbose:
-    print("\n===== READING SOURCE FILE =====\n")
-try:
-    with open(src_path, "r") as f:
-        src_str = f.read()
-except OSError as err:
-    print(f"Failed reading from source file {src_path}: {err}")
-    exit(1)
-if verbose:
-    print(src_str)
-
-if verbose:
-    print("\n===== PARSING =====\n")
-try:
-    ast: Any = parse(src_str)
-except ParseError as err:
-    print(err)
-    exit(1)
-if verbose:
-    print(f"{ast}\n\n{ast_1_python.pretty(ast)}")
-
-if verbose:
-    print("\n===== TYPE CHECKING =====\n")
-try:
-    type_check(ast)
-except TypeError as err:
-    print(err)
-    exit(1)
-if verbose:
-    print("Program is well-typed.")
-
-if verbose:
-    print("\n===== SHRINKING =====\n")
-ast = shrink(ast)
-if verbose:
-    print(ast_2_shrunk.pretty(ast))
-
-if verbose:
-    print("\n===== UNIQUIFY =====\n")
-ast = uniquify(ast)
-if verbose:
-    print(ast_2_shrunk.pretty(ast))
-
-if verbose:
-    print("\n===== REVEAL FUNCTIONS =====\n")
-ast = reveal(ast)
-if verbose:
-    print(ast_3_revealed.pretty(ast))
-
-if verbose:
-    print("\n===== CONVERT ASSIGNMENTS =====\n")
-ast = conv_ass(ast)
-if verbose:
-    print(ast_4_conv_ass.pretty(ast))
-
-if verbose:
-    print("\n===== CLOSURE CONVERSION =====\n")
-ast = closure_conv(ast)
-if verbose:
-    print(ast_5_closures.pretty(ast))
-
-if verbose:
-    print("\n===== LIMIT FUNCTIONS =====\n")
-ast = limit(ast)
-if verbose:
-    print(ast_5_closures.pretty(ast))
-
-if verbose:
-    print("\n===== HEAP ALLOCATION =====\n")
-ast = alloc(ast)
-if verbose:
-    print(ast_6_alloc.pretty(ast))
-
-if verbose:
-    print("\n===== MONADIC NORMALFORM =====\n")
-ast = monadic(ast)
-if verbose:
-    print(ast_7_mon.pretty(ast))
-
-if verbose:
-    print("\n===== EXPLICATE CONTROL =====\n")
-blocks = explicate(ast)
-if verbose:
-    print(ast_8_exp.pretty(blocks))
-
-if verbose:
-    print("\n===== INSTRUCTION SELECTION =====\n")
-blocks = select(blocks)
-if verbose:
-    print(ast_9_sel.pretty(blocks))
-
-if verbose:
-    print("\n===== REGISTER ALLOCATION =====\n")
-reg_allocs = allocate_registers(blocks)
-if verbose:
+    if verbose:
+        print("\n===== REGISTER ALLOCATION =====\n")
+    reg_allocs = run_pass(
+        instrumentation,
+        "allocate_registers",
+        allocate_registers,
+        blocks,
+        options.coalesce,
+        options.linear_scan,
+        options.split_live_ranges,
+    )
+    if verbose:
+        write_reg_allocs(sys.stdout, reg_allocs, options)
+    dump_after(options, "allocate_registers", reg_allocs)
+
+    if verbose:
+        print("\n===== ASSIGN HOMES =====\n")
+    ast = run_pass(instrumentation, "assign_homes", assign_homes, blocks, reg_allocs)
+    if verbose:
+        ast_10_mem.write_program(sys.stdout, ast)
+    dump_after(options, "assign_homes", ast)
+
+    if verbose:
+        print("\n===== OPTIMIZE =====\n")
+    ast = run_pass(instrumentation, "optimize", optimize, ast)
+    if verbose:
+        ast_10_mem.write_program(sys.stdout, ast)
+    dump_after(options, "optimize", ast)
+
+    if verbose:
+        print("\n===== PATCH INSTRUCTIONS =====\n")
+    ast = run_pass(instrumentation, "patch_instructions", patch_instructions, ast)
+    if verbose:
+        ast_11_patched.write_program(sys.stdout, ast)
+    dump_after(options, "patch_instructions", ast)
+
+    if verbose:
+        print("\n===== ADD PRELUDE & CONCLUSION =====\n")
+    ast = run_pass(instrumentation, "add_prelude_and_conclusion", add_prelude_and_conclusion, ast, reg_allocs)
+    if verbose:
+        print(ast_12_riscv.pretty(ast))
+    dump_after(options, "add_prelude_and_conclusion", ast)
+
+    return ast_12_riscv.pretty(ast)
+
+# IR Dumps
+#
+# `--dump-after` writes the output of the given passes to one file per pass
+# in the same format as `-v`, but without printing the other passes. The
+# syntax trees are written line by line to the file, so the string of the
+# whole program is never built.
+
+def write_parts(out: TextIO, sep: str, parts: Iterable[str]) -> None:
+    for i, part in enumerate(parts):
+        if i > 0:
+            out.write(sep)
+        out.write(part)
+    out.write("\n")
+
+def write_reg_allocs(out: TextIO, reg_allocs: dict[Label, RegAllocOutput], options: Options) -> None:
     for l, reg_alloc in reg_allocs.items():
-        print(f"{l}:")
+        out.write(f"{l}:\n")
         for key, val in reg_alloc.env.items():
-            print(f"\t{key}: {val}")
-
-if verbose:
-    print("\n===== ASSIGN HOMES =====\n")
-ast = assign_homes(blocks, reg_allocs)
-if verbose:
-    print(ast_10_mem.pretty(ast))
-
-if verbose:
-    print("\n===== OPTIMIZE =====\n")
-ast = optimize(ast)
-if verbose:
-    print(ast_10_mem.pretty(ast))
-
-if verbose:
-    print("\n===== PATCH INSTRUCTIONS =====\n")
-ast = patch_instructions(ast)
-if verbose:
-    print(ast_11_patched.pretty(ast))
-
-if verbose:
-    print("\n===== ADD PRELUDE & CONCLUSION =====\n")
-ast = add_prelude_and_conclusion(ast, reg_allocs)
-if verbose:
-    print(ast_12_riscv.pretty(ast))
-
-tgt_str = ast_12_riscv.pretty(ast)
-
-if verbose:
-    print("\n===== WRITING OUTPUT ASSEMBLY =====\n")
-if tgt_path is None:
-    print(tgt_str)
-else:
+            out.write(f"\t{key}: {val} (spill cost {reg_alloc.spill_costs.get(key, 0)})\n")
+        spilled = [key for key, val in reg_alloc.env.items() if isinstance(val, ast_10_mem.Offset)]
+        spill_cost = sum(reg_alloc.spill_costs.get(key, 0) for key in spilled)
+        out.write(f"\tspilled variables: {len(spilled)}, total spill cost: {spill_cost}\n")
+        remat = [key for key, val in reg_alloc.env.items() if isinstance(val, ast_10_mem.Const | Label)]
+        if remat:
+            out.write(f"\trematerialized variables: {len(remat)}\n")
+        if options.coalesce and not options.linear_scan:
+            out.write(f"\tcoalesced moves: {reg_alloc.coalesced_moves}\n")
+
+def write_removed[P](
+    out: TextIO,
+    write_program: Callable[[TextIO, P], None],
+    p: P,
+    removed: dict[Label, int],
+    kind: str,
+) -> None:
+    """
+    Writes the functions of a pass which removes instructions, followed by
+    the number of `kind` instructions removed from each function.
+    """
+    write_program(out, p)
+    for l, n in removed.items():
+        out.write(f"{l}: removed {kind} instructions: {n}\n")
+
+def write_inlined(out: TextIO, p: ast_3_revealed.Program, decisions: dict[Label, str]) -> None:
+    """
+    Writes the functions after inlining, followed by the inlining decision
+    for each function.
+    """
+    ast_3_revealed.write_program(out, p)
+    for l, decision in decisions.items():
+        out.write(f"{l}: {decision}\n")
+
+# the writers of the passes' output, except for `allocate_registers`, see `write_reg_allocs`
+DUMP_WRITERS: dict[str, Callable[[TextIO, Any], None]] = {
+    "parse": ast_1_python.write_program,
+    "shrink": ast_2_shrunk.write_program,
+    "uniquify": ast_2_shrunk.write_program,
+    "reveal_functions": ast_3_revealed.write_program,
+    "shrink_uniquify_reveal": ast_3_revealed.write_program,
+    "inline": lambda out, p: write_inlined(out, p[0], p[1]),
+    "convert_assignments": ast_4_conv_ass.write_program,
+    "closure_conversion": ast_5_closures.write_program,
+    "limit_functions": ast_5_closures.write_program,
+    "alloc": ast_6_alloc.write_program,
+    "monadic": ast_7_mon.write_program,
+    "explicate": ast_8_exp.write_program,
+    "sccp": ast_8_exp.write_program,
+    "select": ast_9_sel.write_program,
+    "construct_ssa": ast_9_sel.write_ssa_program,
+    "gvn": lambda out, p: write_removed(out, ast_9_sel.write_ssa_program, p[0], p[1], "redundant"),
+    "destruct_ssa": ast_9_sel.write_program,
+    "eliminate_dead_code": lambda out, p: write_removed(out, ast_9_sel.write_program, p[0], p[1], "dead"),
+    "split_live_ranges": ast_9_sel.write_program,
+    "assign_homes": ast_10_mem.write_program,
+    "optimize": ast_10_mem.write_program,
+    "patch_instructions": ast_11_patched.write_program,
+    "add_prelude_and_conclusion": lambda out, p: write_parts(out, "\n", map(ast_12_riscv.pretty_instr, p)),
+}
+
+def dump_after(options: Options, name: str, x: Any) -> None:
+    """
+    Writes the output `x` of the pass `name` to its file in `options.dump_dir`,
+    if the pass is one of `options.dump_after`.
+    """
+    if name not in options.dump_after:
+        return
+    path = Path(options.dump_dir) / f"{PASS_NAMES.index(name):02}_{name}.txt"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w+") as f:
+            if name == "allocate_registers":
+                write_reg_allocs(f, x, options)
+            else:
+                DUMP_WRITERS[name](f, x)
+    except OSError as err:
+        print(f"Failed writing the output of {name} to file {path}: {err}", file=sys.stderr)
+
+def compile_cached(
+    src_str: str,
+    options: Options,
+    cache: Optional[CompileCache],
+    instrumentation: Optional[Instrumentation] = None,
+) -> str:
+    """
+    Like `compile_source`, but reuses the assembly of an earlier compilation
+    of the same source with the same options from the cache. In verbose
+    mode, with dumps or with instrumentation the program is always compiled,
+    such that all passes are printed, dumped or measured.
+    With `options.incremental`, the program is compiled by `compile_incremental`.
+    """
+    def compile() -> str:
+        if not options.incremental or options.dump_after:
+            return compile_source(src_str, options, instrumentation)
+        reset_fresh_counters()
+        function_cache = None if cache is None else cache.subcache("functions", "Function cache")
+        return compile_incremental(src_str, options, function_cache, instrumentation)
+
+    if cache is None or options.dump_after:
+        return compile()
+    key = cache.key(options.output_key(), src_str)
+    if not options.verbose and instrumentation is None:
+        tgt_str = cache.lookup(key)
+        if tgt_str is not None:
+            return tgt_str
+    tgt_str = compile()
+    cache.store(key, tgt_str)
+    return tgt_str
+
+def cache_from_args(args: Namespace) -> Optional[CompileCache]:
+    return None if args.no_cache else CompileCache(Path(args.cache_dir))
+
+def instrumentation_from_args(args: Namespace) -> Optional[Instrumentation]:
+    if not (args.time_passes or args.time_passes_json or args.time_passes_trace or args.profile_pass):
+        return None
+    return Instrumentation(args.profile_pass, args.profile_output)
+
+def report_instrumentation(instrumentation: Instrumentation, args: Namespace) -> None:
+    """
+    Prints the table of the passes to stderr and saves the measurements
+    to the files requested by the arguments. The table is printed to the
+    current `sys.stderr`, which the compile server redirects.
+    """
+    if args.time_passes:
+        print(instrumentation.table(), file=sys.stderr)
+    for path, out in [
+        (args.time_passes_json, instrumentation.to_json()),
+        (args.time_passes_trace, instrumentation.to_chrome_trace()),
+    ]:
+        if path is None:
+            continue
+        try:
+            with open(path, "w+") as f:
+                json.dump(out, f, indent=2)
+        except OSError as err:
+            print(f"Failed writing pass measurements to file {path}: {err}", file=sys.stderr)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = arg_parser.parse_args(argv)
+    src_path: str = args.src
+    tgt_path: Optional[str] = args.tgt
+    options = Options.from_args(args)
+    cache = cache_from_args(args)
+    instrumentation = instrumentation_from_args(args)
+    verbose = options.verbose
+
+    if verbose:
+        print("\n===== READING SOURCE FILE =====\n")
     try:
-        with open(tgt_path, "w+") as f:
-            f.write(tgt_str)
+        with open(src_path, "r") as f:
+            src_str = f.read()
     except OSError as err:
-        print(f"Failed writing to target file {tgt_path}: {err}")
-        exit(1)
+        print(f"Failed reading from source file {src_path}: {err}")
+        return 1
     if verbose:
-        print(f"Wrote output assembly to file {tgt_path}.")
+        print(src_str)
+
+    try:
+        tgt_str = compile_cached(src_str, options, cache, instrumentation)
+    except (ParseError, TypeError) as err:
+        print(err)
+        return 1
+    if cache is not None and args.cache_stats:
+        print(cache.stats(), file=stderr)
+    if instrumentation is not None:
+        report_instrumentation(instrumentation, args)
+
+    if verbose:
+        print("\n===== WRITING OUTPUT ASSEMBLY =====\n")
+    if tgt_path is None:
+        print(tgt_str)
+    else:
+        try:
+            with open(tgt_path, "w+") as f:
+                f.write(tgt_str)
+        except OSError as err:
+            print(f"Failed writing to target file {tgt_path}: {err}")
+            return 1
+        if verbose:
+            print(f"Wrote output assembly to file {tgt_path}.")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,298 @@
+# Dataflow analyses over the blocks of a function in `ast_9_sel`.
+#
+# All analyses are clients of the bit-vector framework in
+# `util.dataflow`: the facts are numbered once per function, each
+# instruction is translated once into a gen/kill transfer function, and
+# the per-instruction facts are only computed for the blocks where they
+# are actually requested.
+
+from dataclasses import dataclass
+from typing import Iterator
+
+from register import *
+from label import Label
+from identifier import Id
+import ast_9_sel as src
+from util.directed_graph import DirectedGraph
+from util.dataflow import (
+    BlockFacts, DataflowProblem, Numbering, Transfer, compose, solve_dataflow
+)
+
+type Node = Id | Register  # nodes in the inference graph
+
+# Read and Write Sets
+
+# the read set of an argument in read position
+def read_set_src_arg(arg: src.ArgRead) -> set[Node]:
+    match arg:
+        case Register(_):
+            return {arg}
+        case Id(_):
+            return {arg}
+        case src.Offset(arg2, _):
+            return read_set_src_arg(arg2)
+        case Label(_) | src.Const(_, _):
+            return set()
+
+# the read set of an argument in write position
+def read_set_dst_arg(arg: src.ArgWrite) -> set[Node]:
+    match arg:
+        case Register(_):
+            return set()
+        case Id(_):
+            return set()
+        case src.Offset(arg2, _):
+            return read_set_src_arg(arg2)
+
+# the write set of an argument in read position is always empty
+def write_set_src_arg(arg: src.ArgRead) -> set[Node]:
+    return set()
+
+# the write set of an argument in write position
+def write_set_dst_arg(arg: src.ArgWrite) -> set[Node]:
+    match arg:
+        case Register(_):
+            return {arg}
+        case Id(_):
+            return {arg}
+        case src.Offset(_, _):
+            return set()
+
+# the read set of an instruction
+def read_set(i: src.Instr) -> set[Node]:
+    match i:
+        case src.Move(rd, rs):
+            return read_set_dst_arg(rd) | read_set_src_arg(rs)
+        case src.Call(rs, arity, _):
+            fun_arg_regs: set[Node] = set(FUNCTION_ARG_REGISTERS[:arity])
+            return fun_arg_regs | read_set_src_arg(rs)
+        case src.Instr2(_, rd, rs1, rs2):
+            return read_set_dst_arg(rd) | read_set_src_arg(rs1) | read_set_src_arg(rs2)
+        case src.Branch(_, rs1, rs2, rs3):
+            return read_set_src_arg(rs1) | read_set_src_arg(rs2) | read_set_src_arg(rs3)
+        case src.Jump(rs):
+            return read_set_src_arg(rs)
+
+# the write set of an instruction
+def write_set(i: src.Instr) -> set[Node]:
+    match i:
+        case src.Move(rd, rs):
+            return write_set_dst_arg(rd) | write_set_src_arg(rs)
+        case src.Call(rs, _, _):
+            call_svd_regs: set[Node] = set(CALLER_SAVED_REGISTERS)
+            return call_svd_regs | write_set_src_arg(rs)
+        case src.Instr2(_, rd, rs1, rs2):
+            return write_set_dst_arg(rd) | write_set_src_arg(rs1) | write_set_src_arg(rs2)
+        case src.Branch(_, rs1, rs2, rs3):
+            return write_set_src_arg(rs1) | write_set_src_arg(rs2) | write_set_src_arg(rs3)
+        case src.Jump(rs):
+            return write_set_src_arg(rs)
+
+def node_key(x: Node) -> tuple[bool, str]:
+    """
+    A sort key for nodes, which orders them independently of the hash seed
+    and of the memory addresses of interned nodes.
+    """
+    return type(x) is Register, str(x)
+
+def entry_label(p: src.Blocks) -> Label:
+    # The entry block is always the first block of a function.
+    return next(iter(p.keys()))
+
+# Liveness Analysis
+
+class BlockLiveness(BlockFacts[Node]):
+    """
+    The live variables and registers at the begin of the block and
+    after each instruction of the block.
+    """
+
+    @property
+    def instr_out(self) -> list[set[Node]]:
+        return self.instr_sets()
+
+    def iter_instr_out_bits(self) -> Iterator[tuple[int, int]]:
+        """
+        Yields the index of each instruction together with the bit vector of
+        the nodes live after it, from the last instruction to the first.
+        """
+        return self.iter_instr_bits()
+
+# Liveness information for the blocks inside a function definitions
+type FunLiveness = dict[Label, BlockLiveness]
+
+def liveness_analysis(p: src.Blocks, cfg: DirectedGraph[Label]) -> FunLiveness:
+    nodes: Numbering[Node] = Numbering()
+    transfers: dict[Label, list[Transfer]] = {}
+    for label, block in p.items():
+        ts = []
+        for i in block:
+            r = read_set(i)
+            w = write_set(i)
+            # The numbering determines the order in which the register
+            # allocator visits nodes, so the nodes are numbered in an order
+            # which does not depend on the hash seed.
+            nodes.bits(sorted(r | w, key=node_key))
+            offset = min((nodes.number(x) for x in r | w), default=0)
+            ts.append(Transfer(nodes.bits(r, offset), nodes.bits(w, offset), offset))
+        transfers[label] = ts
+    problem = DataflowProblem(
+        "backward",
+        "union",
+        {label: compose(ts, "backward") for label, ts in transfers.items()},
+    )
+    solution = solve_dataflow(cfg, entry_label(p), problem)
+    return {
+        label: BlockLiveness(
+            nodes,
+            "backward",
+            transfers[label],
+            solution.block_in[label],
+            solution.block_out[label],
+        )
+        for label in p
+    }
+
+def debug_print_liveness(liveness: FunLiveness, p: src.Blocks) -> None:
+    print("–– LIVENESS ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+    for label, block in p.items():
+        print(f"{label}:")
+        print(f"\t  {liveness[label].block_in}")
+        for i, live in zip(block, liveness[label].instr_out):
+            print(f"{src.pretty_instr(i)}")
+            print(f"\t  {live}")
+    print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+
+# Reaching Definitions
+
+@dataclass(frozen=True)
+class Definition:
+    label: Label  # the block containing the defining instruction
+    index: int    # the position of the defining instruction in the block
+    node: Node    # the variable or register being defined
+
+class BlockReachingDefs(BlockFacts[Definition]):
+    """
+    The definitions reaching the begin of the block and each
+    instruction of the block.
+    """
+
+    @property
+    def instr_in(self) -> list[set[Definition]]:
+        return self.instr_sets()
+
+type FunReachingDefs = dict[Label, BlockReachingDefs]
+
+def reaching_definitions(p: src.Blocks, cfg: DirectedGraph[Label]) -> FunReachingDefs:
+    defs: Numbering[Definition] = Numbering()
+    defs_of: dict[Node, int] = {}
+    for label, block in p.items():
+        for i, instr in enumerate(block):
+            for x in write_set(instr):
+                defs_of[x] = defs_of.get(x, 0) | defs.bit(Definition(label, i, x))
+
+    transfers: dict[Label, list[Transfer]] = {}
+    for label, block in p.items():
+        ts = []
+        for i, instr in enumerate(block):
+            gen = 0
+            kill = 0
+            for x in write_set(instr):
+                gen |= defs.bit(Definition(label, i, x))
+                kill |= defs_of[x]
+            ts.append(Transfer.relative(gen, kill))
+        transfers[label] = ts
+
+    problem = DataflowProblem(
+        "forward",
+        "union",
+        {label: compose(ts, "forward") for label, ts in transfers.items()},
+    )
+    solution = solve_dataflow(cfg, entry_label(p), problem)
+    return {
+        label: BlockReachingDefs(
+            defs,
+            "forward",
+            transfers[label],
+            solution.block_in[label],
+            solution.block_out[label],
+        )
+        for label in p
+    }
+
+# Available Expressions
+
+@dataclass(frozen=True)
+class Expression:
+    name: src.Instr2Name
+    src1: Id | Register | Label | src.Const
+    src2: Id | Register | Label | src.Const
+
+class BlockAvailExprs(BlockFacts[Expression]):
+    """
+    The expressions available at the begin of the block and before
+    each instruction of the block.
+    """
+
+    @property
+    def instr_in(self) -> list[set[Expression]]:
+        return self.instr_sets()
+
+type FunAvailExprs = dict[Label, BlockAvailExprs]
+
+def expression_of(i: src.Instr) -> Expression | None:
+    """
+    Returns the expression computed by an instruction, if it is free
+    of side effects and does not access memory.
+    """
+    match i:
+        case src.Instr2(op, _, rs1, rs2):
+            match rs1, rs2:
+                case (src.Offset(), _) | (_, src.Offset()):
+                    return None
+                case _:
+                    return Expression(op, rs1, rs2)
+    return None
+
+def available_expressions(p: src.Blocks, cfg: DirectedGraph[Label]) -> FunAvailExprs:
+    exprs: Numbering[Expression] = Numbering()
+    exprs_using: dict[Node, int] = {}
+    for block in p.values():
+        for instr in block:
+            e = expression_of(instr)
+            if e is not None:
+                for x in read_set_src_arg(e.src1) | read_set_src_arg(e.src2):
+                    exprs_using[x] = exprs_using.get(x, 0) | exprs.bit(e)
+
+    transfers: dict[Label, list[Transfer]] = {}
+    for label, block in p.items():
+        ts = []
+        for instr in block:
+            w = write_set(instr)
+            kill = 0
+            for x in w:
+                kill |= exprs_using.get(x, 0)
+            gen = 0
+            e = expression_of(instr)
+            if e is not None and not (w & (read_set_src_arg(e.src1) | read_set_src_arg(e.src2))):
+                gen = exprs.bit(e)
+            ts.append(Transfer.relative(gen, kill))
+        transfers[label] = ts
+
+    problem = DataflowProblem(
+        "forward",
+        "intersection",
+        {label: compose(ts, "forward") for label, ts in transfers.items()},
+        top=exprs.all(),
+    )
+    solution = solve_dataflow(cfg, entry_label(p), problem)
+    return {
+        label: BlockAvailExprs(
+            exprs,
+            "forward",
+            transfers[label],
+            solution.block_in[label],
+            solution.block_out[label],
+        )
+        for label in p
+    }
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+from util.interning import interned
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Id:
     name: str
 
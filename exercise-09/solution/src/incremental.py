@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import ast_2_shrunk
+import ast_11_patched
+import ast_12_riscv
+import identifier
+import label
+from compile_cache import CompileCache
+from instrumentation import Instrumentation, run_pass
+from identifier import Id
+from label import Label
+from pass_0_1_parser import parse
+from type_checker import type_check
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify_decl
+from pass_2_3_reveal_functions import collect_functions, reveal_decl
+from pass_3_4_convert_assignments import conv_ass_decl
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_8_sccp import sccp
+from pass_8_9_select import select
+from pass_9_9_dead_code import eliminate_dead_code
+from pass_9_9_gvn import gvn
+from pass_9_9_split_live_ranges import split_live_ranges
+from pass_9_9_ssa import check_ssa, construct_ssa, destruct_ssa
+from pass_9_10_assign_homes import assign_homes
+from pass_10_10_optimize import optimize
+from pass_10_11_patch_instructions import patch_instructions
+from pass_11_12_add_prelude import add_prelude_and_conclusion
+from register_allocation import RegAllocOutput, allocate_registers
+from util.immutable_list import IList, ilist
+
+# Incremental Compilation
+#
+# After shrinking, a program is a list of top-level functions, and all
+# later passes up to `patch_instructions` transform each function on its
+# own, except that
+#
+# - `uniquify` and `reveal` need the names of all top-level functions, and
+# - the fresh names of `Id` and `Label` are numbered across the program.
+#
+# In incremental mode each top-level function is therefore compiled
+# separately with its own fresh names: the counters are reset for each
+# function, and fresh labels are prefixed with the function's name to keep
+# them unique. The patched functions and their register allocation are
+# cached under a fingerprint of the shrunk function and the signatures of
+# all top-level functions, so editing one function only recompiles that
+# function (and the lambdas it contains). The program is then linked by
+# adding the preludes and conclusions to all functions.
+#
+# The assembly differs from a normal compilation only in the fresh names.
+
+@dataclass(frozen=True)
+class CompiledFunction:
+    """
+    The back-end output of a top-level function, which consists of the
+    function itself and the lambdas lifted out of it.
+    """
+
+    patched: IList[ast_11_patched.Function]
+    reg_allocs: dict[Label, RegAllocOutput]
+
+def reset_fresh_names(scope: str) -> None:
+    identifier.fresh_id_counter = 0
+    label.fresh_label_counter = 0
+    label.fresh_label_prefix = scope
+
+def compile_function(
+    d: ast_2_shrunk.DFun,
+    renaming: dict[Id, Id],
+    funs: set[Id],
+    options: Any,
+    instrumentation: Optional[Instrumentation] = None,
+) -> CompiledFunction:
+    i = instrumentation
+    reset_fresh_names(f"{d.name.name}.")
+    try:
+        ast: Any = run_pass(i, "uniquify", uniquify_decl, renaming.copy(), d)
+        ast = run_pass(i, "reveal_functions", reveal_decl, funs, ast)
+        ast = run_pass(i, "convert_assignments", conv_ass_decl, ast)
+        ast = run_pass(i, "closure_conversion", closure_conv, ilist(ast))
+        ast = run_pass(i, "limit_functions", limit, ast)
+        ast = run_pass(i, "alloc", alloc, ast)
+        ast = run_pass(i, "monadic", monadic, ast)
+        explicated = run_pass(i, "explicate", explicate, ast)
+        if options.sccp:
+            explicated = run_pass(i, "sccp", sccp, explicated)
+        blocks = run_pass(i, "select", select, explicated)
+        if options.ssa:
+            ssa = run_pass(i, "construct_ssa", construct_ssa, blocks)
+            if options.check_ssa:
+                check_ssa(ssa)
+            if options.gvn:
+                ssa, _ = run_pass(i, "gvn", gvn, ssa)
+                if options.check_ssa:
+                    check_ssa(ssa)
+            blocks = run_pass(i, "destruct_ssa", destruct_ssa, ssa)
+        if options.eliminate_dead_code:
+            blocks, _ = run_pass(i, "eliminate_dead_code", eliminate_dead_code, blocks)
+        if options.split_live_ranges:
+            blocks = run_pass(i, "split_live_ranges", split_live_ranges, blocks)
+        reg_allocs = run_pass(
+            i, "allocate_registers", allocate_registers,
+            blocks, options.coalesce, options.linear_scan, options.split_live_ranges,
+        )
+        ast = run_pass(i, "assign_homes", assign_homes, blocks, reg_allocs)
+        ast = run_pass(i, "optimize", optimize, ast)
+        ast = run_pass(i, "patch_instructions", patch_instructions, ast)
+    finally:
+        reset_fresh_names("")
+    return CompiledFunction(ast, reg_allocs)
+
+def compile_incremental(
+    src_str: str,
+    options: Any,
+    cache: Optional[CompileCache],
+    instrumentation: Optional[Instrumentation] = None,
+) -> str:
+    """
+    Compiles the source code like `compile_source`, but reuses the back-end
+    output of unchanged top-level functions from the cache. With
+    `options.verbose`, the functions which were compiled or reused are printed.
+    """
+    i = instrumentation
+    ast: Any = run_pass(i, "parse", parse, src_str)
+    run_pass(i, "type_check", type_check, ast)
+    decls: ast_2_shrunk.Program = run_pass(i, "shrink", shrink, ast)
+
+    # Calls are compiled independently of the callee, but `uniquify` and
+    # `reveal` need to know which names refer to top-level functions.
+    renaming = {d.name: d.name for d in decls}
+    funs = collect_functions(decls)
+    signatures = repr(sorted((d.name.name, len(d.params)) for d in decls))
+    options_key = options.output_key()
+
+    if options.verbose:
+        print("\n===== INCREMENTAL COMPILATION =====\n")
+    patched: IList[ast_11_patched.Function] = ilist()
+    reg_allocs: dict[Label, RegAllocOutput] = {}
+    for d in decls:
+        key = "" if cache is None else cache.key(options_key, signatures, repr(d))
+        compiled = None if cache is None else cache.lookup_object(key)
+        if options.verbose:
+            print(f"{d.name}: {"reused" if compiled is not None else "compiled"}")
+        if compiled is None:
+            compiled = compile_function(d, renaming, funs, options, instrumentation)
+            if cache is not None:
+                cache.store_object(key, compiled)
+        patched += compiled.patched
+        reg_allocs |= compiled.reg_allocs
+
+    if options.verbose:
+        print("\n===== ADD PRELUDE & CONCLUSION =====\n")
+    out = run_pass(i, "add_prelude_and_conclusion", add_prelude_and_conclusion, patched, reg_allocs)
+    if options.verbose:
+        print(ast_12_riscv.pretty(out))
+    return ast_12_riscv.pretty(out)
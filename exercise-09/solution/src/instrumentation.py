@@ -0,0 +1,191 @@
+import cProfile
+import pstats
+import sys
+import tracemalloc
+from dataclasses import dataclass, field, fields, is_dataclass
+from time import perf_counter, process_time
+from typing import Any, Callable, Optional
+
+import ast_12_riscv
+from label import Label
+from util.immutable_list import IList
+
+# Pass Instrumentation
+#
+# Records the wall time, CPU time, peak memory and size of the output of
+# each pass of the compiler, and optionally profiles a single pass with
+# cProfile. The compiler calls its passes through `run_pass`, which calls
+# the pass directly if no instrumentation is requested.
+#
+# The peak memory is measured with `tracemalloc`, which slows down the
+# passes, so the recorded times are higher than without instrumentation,
+# but the relation between the passes stays roughly the same.
+
+@dataclass(frozen=True)
+class IRSize:
+    # the number of syntax tree nodes, i.e. dataclass instances
+    nodes: int = 0
+    # the number of basic blocks, or labels in the final assembly
+    blocks: int = 0
+    # the number of instructions in basic blocks or in the final assembly
+    instrs: int = 0
+
+@dataclass(frozen=True)
+class PassRecord:
+    name: str
+    # the wall time since the first pass, when the pass started
+    start: float
+    wall_time: float
+    cpu_time: float
+    # the peak memory allocated during the pass in bytes
+    peak_memory: int
+    size: IRSize
+
+@dataclass
+class Instrumentation:
+    # the name of the pass which is profiled with cProfile, if any
+    profile_pass: Optional[str] = None
+    # the file to dump the profile of the pass to; otherwise the
+    # statistics are printed
+    profile_output: Optional[str] = None
+    records: list[PassRecord] = field(default_factory=lambda: [])
+    _start: Optional[float] = None
+
+    def run[T](self, name: str, f: Callable[..., T], *args: Any) -> T:
+        if self._start is None:
+            self._start = perf_counter()
+        profiler = cProfile.Profile() if name == self.profile_pass else None
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memory_before, _ = tracemalloc.get_traced_memory()
+        start = perf_counter()
+        cpu_start = process_time()
+        if profiler is not None:
+            out = profiler.runcall(f, *args)
+        else:
+            out = f(*args)
+        cpu_time = process_time() - cpu_start
+        wall_time = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        self.records.append(PassRecord(
+            name, start - self._start, wall_time, cpu_time, peak - memory_before, ir_size(out)
+        ))
+        if profiler is not None:
+            self.dump_profile(name, profiler)
+        return out
+
+    def dump_profile(self, name: str, profiler: cProfile.Profile) -> None:
+        if self.profile_output is not None:
+            profiler.dump_stats(self.profile_output)
+            return
+        print(f"\n===== PROFILE OF {name} =====\n", file=sys.stderr)
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(25)
+
+    def table(self) -> str:
+        """
+        Returns a table of the records, where passes which ran several
+        times (e.g. once per function in incremental mode) are summed up.
+        """
+        rows: dict[str, list[PassRecord]] = {}
+        for r in self.records:
+            rows.setdefault(r.name, []).append(r)
+        width = max([len(name) for name in rows] + [5])
+        out = [
+            f"{'pass':<{width}} {'wall (ms)':>10} {'cpu (ms)':>10} {'peak (KiB)':>11}"
+            f" {'nodes':>8} {'blocks':>7} {'instrs':>7}"
+        ]
+        for name, rs in rows.items():
+            out.append(
+                f"{name:<{width}} {1000 * sum(r.wall_time for r in rs):>10.2f}"
+                f" {1000 * sum(r.cpu_time for r in rs):>10.2f}"
+                f" {max(r.peak_memory for r in rs) / 1024:>11.1f}"
+                f" {sum(r.size.nodes for r in rs):>8} {sum(r.size.blocks for r in rs):>7}"
+                f" {sum(r.size.instrs for r in rs):>7}"
+            )
+        out.append(
+            f"{'total':<{width}} {1000 * sum(r.wall_time for r in self.records):>10.2f}"
+            f" {1000 * sum(r.cpu_time for r in self.records):>10.2f}"
+        )
+        return "\n".join(out)
+
+    def to_json(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "pass": r.name,
+                "wall_time": r.wall_time,
+                "cpu_time": r.cpu_time,
+                "peak_memory": r.peak_memory,
+                "nodes": r.size.nodes,
+                "blocks": r.size.blocks,
+                "instrs": r.size.instrs,
+            }
+            for r in self.records
+        ]
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """
+        Returns the records in the trace event format, which can be viewed
+        with chrome://tracing or https://ui.perfetto.dev.
+        """
+        events = [
+            {
+                "name": r.name,
+                "ph": "X",
+                "ts": 1e6 * r.start,
+                "dur": 1e6 * r.wall_time,
+                "pid": 1,
+                "tid": 1,
+                "args": {
+                    "cpu_time_ms": 1000 * r.cpu_time,
+                    "peak_memory": r.peak_memory,
+                    "nodes": r.size.nodes,
+                    "blocks": r.size.blocks,
+                    "instrs": r.size.instrs,
+                },
+            }
+            for r in self.records
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def run_pass[T](instrumentation: Optional[Instrumentation], name: str, f: Callable[..., T], *args: Any) -> T:
+    """
+    Runs the pass `f` on the arguments, and records it if instrumentation is requested.
+    """
+    if instrumentation is None:
+        return f(*args)
+    return instrumentation.run(name, f, *args)
+
+def ir_size(ir: object) -> IRSize:
+    nodes = 0
+    blocks = 0
+    instrs = 0
+    stack: list[object] = [ir]
+    while stack:
+        x = stack.pop()
+        match x:
+            case dict():
+                for label, block in x.items():
+                    if type(label) is Label and type(block) is IList:
+                        blocks += 1
+                        instrs += len(block)
+                stack.extend(x.values())
+            case IList() | list() | tuple():
+                stack.extend(x)
+            case _ if is_dataclass(x):
+                nodes += 1
+                stack.extend(getattr(x, f.name) for f in fields(x))
+            case _:
+                pass
+
+    # The final assembly is a flat list of labels, directives and instructions.
+    if type(ir) is IList and any(type(x) is Label for x in ir):
+        blocks = sum(1 for x in ir if type(x) is Label)
+        instrs = sum(1 for x in ir if type(x) not in [Label, ast_12_riscv.DGlobal, ast_12_riscv.DAlign])
+    return IRSize(nodes, blocks, instrs)
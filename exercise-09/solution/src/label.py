@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+from util.interning import interned
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Label:
     label: str
 
@@ -10,8 +12,12 @@ class Label:
     @staticmethod
     def fresh(s: str) -> 'Label':
         global fresh_label_counter
-        x = f"{s}_{fresh_label_counter}"
+        x = f"{fresh_label_prefix}{s}_{fresh_label_counter}"
         fresh_label_counter += 1
         return Label(x)
 
 fresh_label_counter = 0
+
+# prepended to fresh labels, such that functions which are compiled
+# separately (see `incremental`) do not produce the same labels
+fresh_label_prefix = ""
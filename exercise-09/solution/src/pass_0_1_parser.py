@@ -5,6 +5,7 @@ import ast
 from ast_1_python import *
 from identifier import Id
 from util.immutable_list import IList, ilist
+from util.trampoline import Rec, trampoline
 
 @dataclass(frozen=True)
 class ParseError(Exception):
@@ -24,7 +25,12 @@ class IllegalName(ParseError):
     def __str__(self) -> str:
         return f"The `name` {self.name} is not a valid variable name, use only letters and numbers"
 
-def map_node(node: ast.AST) -> Any:
+@dataclass(frozen=True)
+class TooDeeplyNested(ParseError):
+    def __str__(self) -> str:
+        return "The program is nested too deeply for Python's parser"
+
+def map_node(node: ast.AST) -> Rec[Any]:
     match node:
         case ast.Add():
             return "+"
@@ -57,31 +63,31 @@ def map_node(node: ast.AST) -> Any:
                 raise IllegalName(id)
             return EVar(Id(id))
         case ast.UnaryOp(op, operand):
-            return EOp1(map_node(op), map_node(operand))
+            return EOp1((yield map_node(op)), (yield map_node(operand)))
         case ast.BinOp(left, op, right) | ast.BoolOp(op, [left, right]) | ast.Compare(left, [op], [right]):
-            return EOp2(map_node(left), map_node(op), map_node(right))
+            return EOp2((yield map_node(left)), (yield map_node(op)), (yield map_node(right)))
         case ast.If(test, body, orelse):
-            return SIf(map_node(test), map_nodes(body), map_nodes(orelse))
+            return SIf((yield map_node(test)), (yield map_nodes(body)), (yield map_nodes(orelse)))
         case ast.IfExp(test, body, orelse):
-            return EIf(map_node(test), map_node(body), map_node(orelse))
+            return EIf((yield map_node(test)), (yield map_node(body)), (yield map_node(orelse)))
         case ast.While(test, body, []):
-            return SWhile(map_node(test), map_nodes(body))
+            return SWhile((yield map_node(test)), (yield map_nodes(body)))
         case ast.Assign([ast.Name(x)], value, _):
-            return SAssign(Id(x), None, map_node(value))
+            return SAssign(Id(x), None, (yield map_node(value)))
         case ast.AnnAssign(ast.Name(x), ty, value) if value is not None:
-            return SAssign(Id(x), map_type_node(ty), map_node(value))
+            return SAssign(Id(x), map_type_node(ty), (yield map_node(value)))
         case ast.Call(ast.Name("input_int"), [], keywords) if len(keywords) == 0:
             return EInput()
         case ast.Expr(ast.Call(ast.Name("print"), [arg], keywords)) if len(keywords) == 0:
-            return SPrint(map_node(arg))
+            return SPrint((yield map_node(arg)))
         case ast.Tuple(elts, _):
-            return ETuple(map_nodes(elts))
+            return ETuple((yield map_nodes(elts)))
         case ast.Subscript(e, ast.Constant(int(i)), _):
-            return ETupleAccess(map_node(e), i)
+            return ETupleAccess((yield map_node(e)), i)
         case ast.Call(ast.Name("len"), [arg], keywords) if len(keywords) == 0:
-            return ETupleLen(map_node(arg))
+            return ETupleLen((yield map_node(arg)))
         case ast.Expr(value):
-            return SExpr(map_node(value))
+            return SExpr((yield map_node(value)))
         case ast.FunctionDef(name, args, body, _, returns, _, _):
             params: list[tuple[Id, Type]] = []
             for a in args.args:
@@ -93,18 +99,18 @@ def map_node(node: ast.AST) -> Any:
                 ret_ty: Type = TNone()
             else:
                 ret_ty = map_type_node(returns)
-            return DFun(Id(name), IList(params), ret_ty, map_nodes(body))
+            return DFun(Id(name), IList(params), ret_ty, (yield map_nodes(body)))
         case ast.Return(e):
             match e:
                 case None:
                     return SReturn(EConst(None))
                 case _:
-                    return SReturn(map_node(e))
+                    return SReturn((yield map_node(e)))
         case ast.Lambda(args, body):
             prms = IList([Id(a.arg) for a in args.args])
-            return ELambda(prms, map_node(body))
+            return ELambda(prms, (yield map_node(body)))
         case ast.Call(e, args, keywords) if len(keywords) == 0:
-            return ECall(map_node(e), map_nodes(args))
+            return ECall((yield map_node(e)), (yield map_nodes(args)))
         case ast.ClassDef(name, _, _, body, _):
             params = []
             for s in body:
@@ -119,12 +125,15 @@ def map_node(node: ast.AST) -> Any:
                         raise UnsupportedFeature(node)
             return SClass(Id(name), IList(params))
         case ast.Attribute(e, id):
-            return EField(map_node(e), Id(id))
+            return EField((yield map_node(e)), Id(id))
         case _:
             raise UnsupportedFeature(node)
 
-def map_nodes(nodes: Sequence[Any]) -> IList[Any]:
-    return IList([map_node(node) for node in nodes])
+def map_nodes(nodes: Sequence[Any]) -> Rec[IList[Any]]:
+    out = []
+    for node in nodes:
+        out.append((yield map_node(node)))
+    return IList(out)
 
 def map_type_node(node: ast.AST) -> Type:
     match node:
@@ -151,4 +160,9 @@ def map_type_nodes(nodes: Sequence[Any]) -> IList[Type]:
     return IList([map_type_node(node) for node in nodes])
 
 def parse(src_str: str) -> Program:
-    return Program(map_nodes(ast.parse(src_str).body))
+    try:
+        module = ast.parse(src_str)
+    except (RecursionError, MemoryError):
+        # CPython's parser has a fixed nesting limit of a few thousand.
+        raise TooDeeplyNested()
+    return Program(trampoline(map_nodes(module.body)))
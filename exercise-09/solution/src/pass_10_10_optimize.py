@@ -1,6 +1,6 @@
 import ast_10_mem as src
 import ast_10_mem as tgt
-from util.immutable_list import IList, ilist
+from util.immutable_list import IList, IListBuilder
 
 def optimize(p: src.Program) -> tgt.Program:
     return IList([optimize_fun(f) for f in p])
@@ -39,7 +39,7 @@ def optimize_blocks(blocks: src.Blocks, entry_label: src.Label) -> tgt.Blocks:
     return blocks_out2
 
 def optimize_block(block: src.Block) -> tgt.Block:
-    block_out1: src.Block = ilist()
+    out1 = IListBuilder[src.Instr]()
     i = 0
     while i < len(block):
         match block[i]:
@@ -68,48 +68,49 @@ def optimize_block(block: src.Block) -> tgt.Block:
                     case "srl":
                         val_out = val1 >> val2
                 val_out = simulate_over_and_underflow(int(val_out))
-                block_out1 += ilist(src.Move(dst, src.Const(val_out, "64bit")))
+                out1.append(src.Move(dst, src.Const(val_out, "64bit")))
             case src.Instr2(op, dst, src1, src.Const(val1, size1)):
                 val1 = to_int_64(val1, size1)
                 if op in ["add", "sub"] and val1 == 0:
-                    block_out1 += ilist(src.Move(dst, src1))
+                    out1.append(src.Move(dst, src1))
                 elif op in ["mul", "div"] and val1 == 1:
-                    block_out1 += ilist(src.Move(dst, src1))
+                    out1.append(src.Move(dst, src1))
                 elif op == "mul" and val1 == 0:
-                    block_out1 += ilist(src.Move(dst, src.Const(0, "64bit")))
+                    out1.append(src.Move(dst, src.Const(0, "64bit")))
                 else:
-                    block_out1 += ilist(block[i])
+                    out1.append(block[i])
             case src.Branch(cc, src.Const(val1, size1), src.Const(val2, size2), target):
                 val1 = to_int_64(val1, size1)
                 val2 = to_int_64(val2, size2)
                 match cc:
                     case "beq":
                         if val1 == val2:
-                            block_out1 += ilist(src.Jump(target))
+                            out1.append(src.Jump(target))
                             break
                     case "bne":
                         if val1 != val2:
-                            block_out1 += ilist(src.Jump(target))
+                            out1.append(src.Jump(target))
                             break
                     case "blt":
                         if val1 < val2:
-                            block_out1 += ilist(src.Jump(target))
+                            out1.append(src.Jump(target))
                             break
                     case "bge":
                         if val1 >= val2:
-                            block_out1 += ilist(src.Jump(target))
+                            out1.append(src.Jump(target))
                             break
             case _:
-                block_out1 += ilist(block[i])
+                out1.append(block[i])
         i += 1
 
-    block_out2: src.Block = ilist()
+    block_out1 = out1.build()
+    block_out2 = IListBuilder[src.Instr]()
     i = 0
     while i < len(block_out1):
         match block_out1[i]:
             case src.Move(dst1, src1):
                 if dst1 != src1:
-                    block_out2 += ilist(block_out1[i])
+                    block_out2.append(block_out1[i])
                     while i+1 < len(block_out1):
                         match block_out1[i+1]:
                             case src.Move(dst2, src2) if dst1 == src2 and src1 == dst2:
@@ -119,9 +120,9 @@ def optimize_block(block: src.Block) -> tgt.Block:
                             case _:
                                 break
             case _:
-                block_out2 += ilist(block_out1[i])
+                block_out2.append(block_out1[i])
         i += 1
-    return block_out2
+    return block_out2.build()
 
 def to_int_64(value: int, size: str) -> int:
     return value << (1 if size == "63bit" else 0)
@@ -1,7 +1,7 @@
 import ast_10_mem as src
 import ast_11_patched as tgt
 from register import *
-from util.immutable_list import IList, ilist
+from util.immutable_list import IList, IListBuilder, ilist
 from label import Label
 
 def patch_instructions(p: src.Program) -> tgt.Program:
@@ -18,10 +18,10 @@ def patch_fun(f: src.Function) -> tgt.Function:
 def patch_blocks(blocks: src.Blocks) -> tgt.Blocks:
     out: tgt.Blocks = {}
     for label, block in blocks.items():
-        block_out: tgt.Block = ilist()
+        block_out = IListBuilder[tgt.Instr]()
         for i in block:
             block_out += patch_instruction(i)
-        out[label] = block_out
+        out[label] = block_out.build()
     return out
 
 def patch_instruction(i: src.Instr) -> tgt.Block:
@@ -2,14 +2,14 @@ import ast_11_patched as src
 import ast_12_riscv as tgt
 from register import *
 from register_allocation import RegAllocOutput
-from util.immutable_list import ilist
+from util.immutable_list import IListBuilder, ilist
 from label import Label
 
 def add_prelude_and_conclusion(p: src.Program, reg_allocs: dict[Label, RegAllocOutput]) -> tgt.Program:
-    out: tgt.Program = ilist()
+    out = IListBuilder[tgt.Instr]()
     for f in p:
         out += apc_fun(f, reg_allocs)
-    return out
+    return out.build()
 
 def apc_fun(f: src.Function, reg_allocs: dict[Label, RegAllocOutput]) -> tgt.Program:
     is_main = f.entry_label == Label("main")
@@ -21,7 +21,7 @@ def apc_fun(f: src.Function, reg_allocs: dict[Label, RegAllocOutput]) -> tgt.Pro
     f.body[f.entry_label] = prelude + f.body[f.entry_label]
     f.body[f.end_label] = f.body[f.end_label] + conclusion
 
-    out: tgt.Program = ilist()
+    out = IListBuilder[tgt.Instr]()
 
     for label, block in f.body.items():
         if label == f.entry_label:
@@ -37,12 +37,18 @@ def apc_fun(f: src.Function, reg_allocs: dict[Label, RegAllocOutput]) -> tgt.Pro
                     out += ilist(tgt.LoadAddress(t0, l))
                     out += ilist(tgt.JumpIndirect(t0, 0))
                 case src.TailJumpIndirect(r):
+                    if r in reg_alloc.callee_saved:
+                        # The conclusion restores the callee-saved registers of the caller.
+                        out += ilist(tgt.IInstr2("addi", t0, r, 0))
+                        r = t0
                     out += compute_conclusion(reg_alloc, False, True)
                     out += ilist(tgt.JumpIndirect(r, 0))
+                case src.Call(Label("gc_collect")):
+                    out += compute_gc_call(i)
                 case _:
-                    out += ilist(i)
+                    out.append(i)
 
-    return out
+    return out.build()
 
 def compute_prelude(reg_alloc: RegAllocOutput, is_main: bool) -> tgt.Program:
     offset = align(16, reg_alloc.offset_sp)
@@ -70,7 +76,7 @@ def compute_prelude(reg_alloc: RegAllocOutput, is_main: bool) -> tgt.Program:
         # Zero all calle saved registers in main, such that
         # other functions called by main don't spill registers with
         # untagged values, and break the garbage collector.
-        for r in set(CALLEE_SAVED_REGISTERS) - {sp, fp}:
+        for r in [r for r in CALLEE_SAVED_REGISTERS if r not in [sp, fp]]:
             prelude += ilist(tgt.RInstr('add', r, zero, zero))
         prelude += ilist(
             # Call the garbage collector initialization function
@@ -85,6 +91,34 @@ def compute_prelude(reg_alloc: RegAllocOutput, is_main: bool) -> tgt.Program:
 
     return prelude
 
+# The registers which can hold heap pointers during a call to the
+# garbage collector. All other registers are caller-saved.
+GC_ROOT_REGISTERS = [s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11]
+
+def compute_gc_call(call: tgt.Instr) -> tgt.Program:
+    # The garbage collector only scans the stack for heap pointers, so
+    # the callee-saved registers, which may contain heap pointers of
+    # this function or its callers, are pushed to the stack for the
+    # collection and reloaded afterwards, as the collector may have
+    # moved the objects they point to. The first argument of
+    # `gc_collect` is the end of the stack to scan, so it's set to
+    # the new stack pointer.
+    size = align(16, 8 * len(GC_ROOT_REGISTERS))
+    out: tgt.Program = ilist(tgt.IInstr2("addi", sp, sp, -size))
+    for i, r in enumerate(GC_ROOT_REGISTERS):
+        out += ilist(tgt.Store(r, tgt.Offset(sp, 8 * i)))
+    # The padding is scanned as well, so it must not contain garbage.
+    for i in range(len(GC_ROOT_REGISTERS), size // 8):
+        out += ilist(tgt.Store(zero, tgt.Offset(sp, 8 * i)))
+    out += ilist(
+        tgt.IInstr2("addi", a0, sp, 0),
+        call,
+    )
+    for i, r in enumerate(GC_ROOT_REGISTERS):
+        out += ilist(tgt.Load(r, tgt.Offset(sp, 8 * i)))
+    out += ilist(tgt.IInstr2("addi", sp, sp, size))
+    return out
+
 def compute_conclusion(reg_alloc: RegAllocOutput, is_main: bool, is_tail_call: bool) -> tgt.Program:
     offset = align(16, reg_alloc.offset_sp)
 
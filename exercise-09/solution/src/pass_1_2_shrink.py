@@ -3,10 +3,11 @@ import ast_2_shrunk as tgt
 from types_ import *
 from util.immutable_list import *
 from identifier import Id
+from util.trampoline import Rec, trampoline
 
 def shrink(p: src.Program) -> tgt.Program:
     out: IList[tgt.Decl] = ilist()
-    stmts: IList[src.Stmt] = ilist()
+    stmts = IListBuilder[src.Stmt]()
     for d in p.body:
         match d:
             case src.DFun():
@@ -21,8 +22,8 @@ def shrink(p: src.Program) -> tgt.Program:
                     tgt.DFun(name, ids, ilist(tgt.SReturn(tgt.ETuple(IList([tgt.EVar(x) for x in ids])))))
                 )
             case s:
-                stmts += ilist(s)
-    main = tgt.DFun(Id("main"), ilist(), shrink_stmts(stmts))
+                stmts.append(s)
+    main = tgt.DFun(Id("main"), ilist(), trampoline(shrink_stmts(stmts.build())))
     out += ilist(main)
     return out
 
@@ -30,33 +31,36 @@ def shrink_decl(d: src.Decl) -> tgt.Decl:
     match d:
         case src.DFun(name, params, _, body):
             params_out = IList([x for (x, _) in params])
-            return tgt.DFun(name, params_out, shrink_stmts(body))
+            return tgt.DFun(name, params_out, trampoline(shrink_stmts(body)))
 
-def shrink_stmts(ss: IList[src.Stmt]) -> IList[tgt.Stmt]:
-    return IList([shrink_stmt(s) for s in ss])
+def shrink_stmts(ss: IList[src.Stmt]) -> Rec[IList[tgt.Stmt]]:
+    out = []
+    for s in ss:
+        out.append((yield shrink_stmt(s)))
+    return IList(out)
 
-def shrink_stmt(s: src.Stmt) -> tgt.Stmt:
+def shrink_stmt(s: src.Stmt) -> Rec[tgt.Stmt]:
     match s:
         case src.SExpr(e):
-            e_out = shrink_expr(e)
+            e_out = yield shrink_expr(e)
             return tgt.SExpr(e_out)
         case src.SPrint(e):
-            e_out = shrink_expr(e)
+            e_out = yield shrink_expr(e)
             return tgt.SPrint(e_out)
         case src.SAssign(x, _, e):
-            e_out = shrink_expr(e)
+            e_out = yield shrink_expr(e)
             return tgt.SAssign(x, e_out)
         case src.SIf(e, b1, b2):
-            e_out = shrink_expr(e)
-            b1_out = shrink_stmts(b1)
-            b2_out = shrink_stmts(b2)
+            e_out = yield shrink_expr(e)
+            b1_out = yield shrink_stmts(b1)
+            b2_out = yield shrink_stmts(b2)
             return tgt.SIf(e_out, b1_out, b2_out)
         case src.SWhile(e, b):
-            e_out = shrink_expr(e)
-            b_out = shrink_stmts(b)
+            e_out = yield shrink_expr(e)
+            b_out = yield shrink_stmts(b)
             return tgt.SWhile(e_out, b_out)
         case src.SReturn(e):
-            e_out = shrink_expr(e)
+            e_out = yield shrink_expr(e)
             return tgt.SReturn(e_out)
         case src.SClass(name, fields):
             # this case happens, when we are in a function already.
@@ -65,7 +69,7 @@ def shrink_stmt(s: src.Stmt) -> tgt.Stmt:
             ids = IList([x for x, _ in fields])
             return tgt.SAssign(name, tgt.ELambda(ids, tgt.ETuple(IList([tgt.EVar(x) for x in ids]))))
 
-def shrink_expr(e: src.Expr) -> tgt.Expr:
+def shrink_expr(e: src.Expr) -> Rec[tgt.Expr]:
     match e:
         case src.EConst(c):
             return tgt.EConst(c, '63bit')
@@ -74,11 +78,11 @@ def shrink_expr(e: src.Expr) -> tgt.Expr:
         case src.EInput():
             return tgt.EInput()
         case src.EOp1(op, e1):
-            e1_out = shrink_expr(e1)
+            e1_out = yield shrink_expr(e1)
             return tgt.EOp1(op, e1_out)
         case src.EOp2(e1, op, e2):
-            e1_out = shrink_expr(e1)
-            e2_out = shrink_expr(e2)
+            e1_out = yield shrink_expr(e1)
+            e2_out = yield shrink_expr(e2)
             match op:
                 case "and":
                     return tgt.EIf(e1_out, e2_out, tgt.EConst(False, '63bit'))
@@ -91,22 +95,28 @@ def shrink_expr(e: src.Expr) -> tgt.Expr:
                 case _:
                     return tgt.EOp2(e1_out, op, e2_out)
         case src.EIf(e1, e2, e3):
-            e1_out = shrink_expr(e1)
-            e2_out = shrink_expr(e2)
-            e3_out = shrink_expr(e3)
+            e1_out = yield shrink_expr(e1)
+            e2_out = yield shrink_expr(e2)
+            e3_out = yield shrink_expr(e3)
             return tgt.EIf(e1_out, e2_out, e3_out)
         case src.ETuple(es):
-            return tgt.ETuple(IList([shrink_expr(e) for e in es]))
+            return tgt.ETuple((yield shrink_exprs(es)))
         case src.ETupleAccess(e, i):
-            return tgt.ETupleAccess(shrink_expr(e), i)
+            return tgt.ETupleAccess((yield shrink_expr(e)), i)
         case src.ETupleLen(e):
-            return tgt.ETupleLen(shrink_expr(e))
+            return tgt.ETupleLen((yield shrink_expr(e)))
         case src.ECall(e_fun, e_args):
-            e_fun_out = shrink_expr(e_fun)
-            e_args_out = IList([shrink_expr(arg) for arg in e_args])
+            e_fun_out = yield shrink_expr(e_fun)
+            e_args_out = yield shrink_exprs(e_args)
             return tgt.ECall(e_fun_out, e_args_out)
         case src.ELambda(params, body):
-            return tgt.ELambda(params, shrink_expr(body))
+            return tgt.ELambda(params, (yield shrink_expr(body)))
         case src.EField(e, _, idx):
             assert idx is not None, "`idx` is set during type checking."
-            return tgt.ETupleAccess(shrink_expr(e), idx)
+            return tgt.ETupleAccess((yield shrink_expr(e)), idx)
+
+def shrink_exprs(es: IList[src.Expr]) -> Rec[IList[tgt.Expr]]:
+    out = []
+    for e in es:
+        out.append((yield shrink_expr(e)))
+    return IList(out)
@@ -0,0 +1,155 @@
+# Fused Front-End
+#
+# Performs `shrink`, `uniquify` and `reveal` in a single traversal, which
+# builds only the `ast_3_revealed` program instead of two intermediate
+# programs. The result is identical to the staged passes, including the
+# fresh names, which are created in the same order as by `uniquify`:
+# the top-level functions come first and `main` last, and in each
+# function the parameters are renamed first, then the statements in order,
+# where an assigned variable is renamed before its right-hand side.
+#
+# The staged passes are still used with `--verbose`, which prints the
+# output of each of them.
+
+import ast_1_python as src
+import ast_3_revealed as tgt
+from identifier import Id
+from label import Label
+from util.immutable_list import *
+from util.trampoline import Rec, trampoline
+
+def shrink_uniquify_reveal(p: src.Program) -> tgt.Program:
+    # Functions keep their names, so they are renamed to themselves.
+    funs = {Id("main")}
+    for d in p.body:
+        match d:
+            case src.DFun(name, _, _, _) | src.SClass(name, _):
+                funs.add(name)
+    renaming = {f: f for f in funs}
+
+    out = IListBuilder[tgt.Decl]()
+    stmts = IListBuilder[src.Stmt]()
+    for d in p.body:
+        match d:
+            case src.DFun(name, params, _, body):
+                out.append(fuse_fun(renaming.copy(), funs, name, IList([x for (x, _) in params]), body))
+            case src.SClass(name, fields):
+                # The constructor of a top-level class, see `shrink`.
+                ids = IList([x for x, _ in fields])
+                out.append(fuse_constructor(renaming.copy(), name, ids))
+            case s:
+                stmts.append(s)
+    out.append(fuse_fun(renaming.copy(), funs, Id("main"), ilist(), stmts.build()))
+    return out.build()
+
+def fuse_fun(
+    renaming: dict[Id, Id], funs: set[Id], name: Id, params: IList[Id], body: IList[src.Stmt]
+) -> tgt.Decl:
+    new_params = rename_params(renaming, params)
+    return tgt.DFun(Label(name.name), new_params, trampoline(fuse_stmts(renaming, funs, body)))
+
+def fuse_constructor(renaming: dict[Id, Id], name: Id, ids: IList[Id]) -> tgt.Decl:
+    new_ids = rename_params(renaming, ids)
+    tup = tgt.ETuple(IList([tgt.EVar(x) for x in new_ids]))
+    return tgt.DFun(Label(name.name), new_ids, ilist(tgt.SReturn(tup)))
+
+def rename_params(renaming: dict[Id, Id], params: IList[Id]) -> IList[Id]:
+    new_params = IList([Id.fresh(x.name) for x in params])
+    renaming |= { x: x_new for (x, x_new) in zip(params, new_params) }
+    return new_params
+
+def rename_assigned(renaming: dict[Id, Id], x: Id) -> Id:
+    if x not in renaming:
+        renaming[x] = Id.fresh(x.name)
+    return renaming[x]
+
+def fuse_stmts(renaming: dict[Id, Id], funs: set[Id], ss: IList[src.Stmt]) -> Rec[IList[tgt.Stmt]]:
+    out = []
+    for s in ss:
+        out.append((yield fuse_stmt(renaming, funs, s)))
+    return IList(out)
+
+def fuse_stmt(renaming: dict[Id, Id], funs: set[Id], s: src.Stmt) -> Rec[tgt.Stmt]:
+    match s:
+        case src.SExpr(e):
+            return tgt.SExpr((yield fuse_expr(renaming, funs, e)))
+        case src.SPrint(e):
+            return tgt.SPrint((yield fuse_expr(renaming, funs, e)))
+        case src.SAssign(x, _, e):
+            y = rename_assigned(renaming, x)
+            return tgt.SAssign(y, (yield fuse_expr(renaming, funs, e)))
+        case src.SIf(e, b1, b2):
+            e_out = yield fuse_expr(renaming, funs, e)
+            b1_out = yield fuse_stmts(renaming, funs, b1)
+            b2_out = yield fuse_stmts(renaming, funs, b2)
+            return tgt.SIf(e_out, b1_out, b2_out)
+        case src.SWhile(e, b):
+            e_out = yield fuse_expr(renaming, funs, e)
+            b_out = yield fuse_stmts(renaming, funs, b)
+            return tgt.SWhile(e_out, b_out)
+        case src.SReturn(e):
+            return tgt.SReturn((yield fuse_expr(renaming, funs, e)))
+        case src.SClass(name, fields):
+            # A class in a function becomes a curried constructor, see `shrink`.
+            y = rename_assigned(renaming, name)
+            renaming = renaming.copy()
+            ids = IList([x for x, _ in fields])
+            new_ids = rename_params(renaming, ids)
+            tup = tgt.ETuple(IList([fuse_var(renaming, funs, x) for x in ids]))
+            return tgt.SAssign(y, tgt.ELambda(new_ids, tup))
+
+def fuse_var(renaming: dict[Id, Id], funs: set[Id], x: Id) -> tgt.Expr:
+    y = renaming[x]
+    if y in funs:
+        return tgt.EFunRef(Label(y.name))
+    return tgt.EVar(y)
+
+def fuse_expr(renaming: dict[Id, Id], funs: set[Id], e: src.Expr) -> Rec[tgt.Expr]:
+    match e:
+        case src.EConst(c):
+            return tgt.EConst(c, '63bit')
+        case src.EVar(x):
+            return fuse_var(renaming, funs, x)
+        case src.EInput():
+            return tgt.EInput()
+        case src.EOp1(op, e1):
+            return tgt.EOp1(op, (yield fuse_expr(renaming, funs, e1)))
+        case src.EOp2(e1, op, e2):
+            e1_out = yield fuse_expr(renaming, funs, e1)
+            e2_out = yield fuse_expr(renaming, funs, e2)
+            match op:
+                case "and":
+                    return tgt.EIf(e1_out, e2_out, tgt.EConst(False, '63bit'))
+                case "or":
+                    return tgt.EIf(e1_out, tgt.EConst(True, '63bit'), e2_out)
+                case "is":
+                    return tgt.EOp2(e1_out, "==", e2_out)
+                case _:
+                    return tgt.EOp2(e1_out, op, e2_out)
+        case src.EIf(e1, e2, e3):
+            e1_out = yield fuse_expr(renaming, funs, e1)
+            e2_out = yield fuse_expr(renaming, funs, e2)
+            e3_out = yield fuse_expr(renaming, funs, e3)
+            return tgt.EIf(e1_out, e2_out, e3_out)
+        case src.ETuple(es):
+            return tgt.ETuple((yield fuse_exprs(renaming, funs, es)))
+        case src.ETupleAccess(e, i):
+            return tgt.ETupleAccess((yield fuse_expr(renaming, funs, e)), i)
+        case src.ETupleLen(e):
+            return tgt.ETupleLen((yield fuse_expr(renaming, funs, e)))
+        case src.ECall(e_func, e_args):
+            return tgt.ECall((yield fuse_expr(renaming, funs, e_func)), (yield fuse_exprs(renaming, funs, e_args)))
+        case src.ELambda(params, body):
+            # Lambda parameters shadow variables with the same name from the outside.
+            renaming = renaming.copy()
+            new_params = rename_params(renaming, params)
+            return tgt.ELambda(new_params, (yield fuse_expr(renaming, funs, body)))
+        case src.EField(e, _, idx):
+            assert idx is not None, "`idx` is set during type checking."
+            return tgt.ETupleAccess((yield fuse_expr(renaming, funs, e)), idx)
+
+def fuse_exprs(renaming: dict[Id, Id], funs: set[Id], es: IList[src.Expr]) -> Rec[IList[tgt.Expr]]:
+    out = []
+    for e in es:
+        out.append((yield fuse_expr(renaming, funs, e)))
+    return IList(out)
@@ -0,0 +1,419 @@
+from dataclasses import dataclass, field
+
+import ast_3_revealed as src
+import ast_3_revealed as tgt
+from identifier import Id
+from label import Label
+from util.directed_graph import DirectedGraph
+from util.immutable_list import IList
+from util.trampoline import Rec, trampoline
+
+# Function Inlining
+#
+# Replaces direct calls `f(a1, ..., an)` of small top-level functions by
+# their bodies: the arguments are assigned to the parameters, and each
+# `return e` becomes an assignment of `e` to the variable holding the
+# result of the call. This saves the call and return, the moves of the
+# arguments, and the spills of the caller-saved registers around the call,
+# and lets the later passes optimize the body together with the arguments.
+#
+# As statements have no value, the body is placed before the statement
+# containing the call, and the call becomes a read of the result. This is
+# only valid if nothing with an effect is evaluated before the call in that
+# statement, i.e. no input and no other call, so those are inlined only
+# where they appear first. The calls in the branches of an `if` expression
+# and in the test of a `while` loop are not always evaluated, and the ones
+# in the body of a lambda not at all, so they are not inlined either.
+#
+# Only bodies whose `return` statements are at their end are inlined, such
+# that no jump is needed to skip the rest of the body. The variables of the
+# body get new names at each call site, as a body may be inlined several
+# times into the same function, and the names have to stay unique.
+#
+# The functions are handled in the order of the call graph, callees first,
+# such that a function is inlined with the calls in its body already
+# inlined. Recursive functions are never inlined, as this would not end,
+# but calls from them to other functions are.
+
+MAIN = Label("main")
+
+@dataclass
+class Callee:
+    fun: tgt.DFun
+    size: int
+    # the variables assigned in the body, which are not replaced by constants
+    assigned: set[Id]
+    # whether the end of the body can be reached without a `return`
+    falls_through: bool
+
+@dataclass
+class Inliner:
+    callees: dict[Label, Callee]
+    # the number of call sites each function was inlined at
+    inlined: dict[Label, int] = field(default_factory=dict)
+
+@dataclass
+class Site:
+    """
+    The statements placed before the statement containing the calls, and
+    whether the next call can still be moved there.
+    """
+    before: list[tgt.Stmt]
+    movable: bool = True
+
+def inline(p: src.Program, budget: int) -> tuple[tgt.Program, dict[Label, str]]:
+    """
+    Inlines the direct calls to functions whose size is at most `budget`,
+    and returns the program with the decision for each function.
+    """
+    funs = {d.name: d for d in p}
+    calls: DirectedGraph[Label] = DirectedGraph()
+    for d in p:
+        calls.add_node(d.name)
+        for f in trampoline(called_stmts(d.body)):
+            calls.add_edge(d.name, f)
+
+    inliner = Inliner({})
+    decisions: dict[Label, str] = {}
+    for component in calls.strongly_connected_components():
+        recursive = len(component) > 1 or calls.has_edge(component[0], component[0])
+        for name in component:
+            d = funs[name]
+            d = tgt.DFun(d.name, d.params, trampoline(inline_stmts(inliner, d.body)))
+            funs[name] = d
+            size = trampoline(size_stmts(d.body))
+            if name == MAIN:
+                continue
+            elif recursive:
+                decisions[name] = f"not inlined: recursive (size {size})"
+            elif size > budget:
+                decisions[name] = f"not inlined: size {size} exceeds the budget of {budget}"
+            elif not trampoline(returns_at_end(d.body, True)):
+                decisions[name] = f"not inlined: returns before the end of its body (size {size})"
+            else:
+                inliner.callees[name] = Callee(
+                    d, size, trampoline(assigned_vars_stmts(d.body)), not trampoline(always_returns(d.body))
+                )
+
+    for name, callee in inliner.callees.items():
+        n = inliner.inlined.get(name, 0)
+        decisions[name] = f"inlined at {n} call site{"" if n == 1 else "s"} (size {callee.size})"
+    return (
+        IList([funs[d.name] for d in p]),
+        {d.name: decisions[d.name] for d in p if d.name in decisions},
+    )
+
+# Inlining the Calls
+
+def inline_stmts(inliner: Inliner, ss: IList[src.Stmt]) -> Rec[IList[tgt.Stmt]]:
+    out: list[tgt.Stmt] = []
+    for s in ss:
+        site = Site(out)
+        match s:
+            case src.SExpr(src.ECall() as e):
+                e_out = yield inline_call(inliner, site, e, None, False)
+                if e_out is not None:
+                    out.append(tgt.SExpr(e_out))
+            case src.SExpr(e):
+                e_out = yield inline_expr(inliner, site, e)
+                out.append(tgt.SExpr(e_out))
+            case src.SPrint(e):
+                e_out = yield inline_expr(inliner, site, e)
+                out.append(tgt.SPrint(e_out))
+            case src.SAssign(x, src.ECall() as e):
+                # The result is assigned to `x` directly.
+                e_out = yield inline_call(inliner, site, e, x, True)
+                if e_out != tgt.EVar(x):
+                    out.append(tgt.SAssign(x, e_out))
+            case src.SAssign(x, e):
+                e_out = yield inline_expr(inliner, site, e)
+                out.append(tgt.SAssign(x, e_out))
+            case src.SIf(e, b1, b2):
+                e_out = yield inline_expr(inliner, site, e)
+                b1_out = yield inline_stmts(inliner, b1)
+                b2_out = yield inline_stmts(inliner, b2)
+                out.append(tgt.SIf(e_out, b1_out, b2_out))
+            case src.SWhile(e, b):
+                b_out = yield inline_stmts(inliner, b)
+                out.append(tgt.SWhile(e, b_out))
+            case src.SReturn(e):
+                e_out = yield inline_expr(inliner, site, e)
+                out.append(tgt.SReturn(e_out))
+    return IList(out)
+
+def inline_expr(inliner: Inliner, site: Site, e: src.Expr) -> Rec[tgt.Expr]:
+    match e:
+        case src.EConst() | src.EVar() | src.EFunRef() | src.ELambda():
+            return e
+        case src.EInput():
+            site.movable = False
+            return e
+        case src.EOp1(op, e1):
+            e1_out = yield inline_expr(inliner, site, e1)
+            return tgt.EOp1(op, e1_out)
+        case src.EOp2(e1, op, e2):
+            e1_out = yield inline_expr(inliner, site, e1)
+            e2_out = yield inline_expr(inliner, site, e2)
+            return tgt.EOp2(e1_out, op, e2_out)
+        case src.EIf(e1, e2, e3):
+            e1_out = yield inline_expr(inliner, site, e1)
+            if (yield has_effects(e2)) or (yield has_effects(e3)):
+                site.movable = False
+            return tgt.EIf(e1_out, e2, e3)
+        case src.ETuple(es):
+            return tgt.ETuple((yield inline_exprs(inliner, site, es)))
+        case src.ETupleAccess(e1, i):
+            return tgt.ETupleAccess((yield inline_expr(inliner, site, e1)), i)
+        case src.ETupleLen(e1):
+            return tgt.ETupleLen((yield inline_expr(inliner, site, e1)))
+        case src.ECall():
+            e_out = yield inline_call(inliner, site, e, None, True)
+            assert e_out is not None
+            return e_out
+
+def inline_exprs(inliner: Inliner, site: Site, es: IList[src.Expr]) -> Rec[IList[tgt.Expr]]:
+    out = []
+    for e in es:
+        out.append((yield inline_expr(inliner, site, e)))
+    return IList(out)
+
+def inline_call(
+    inliner: Inliner, site: Site, e: src.ECall, result: Id | None, used: bool
+) -> Rec[tgt.Expr | None]:
+    """
+    Returns the expression replacing the call, which reads the variable
+    `result` or a new one, or `None` if the result is not `used`.
+    """
+    movable = site.movable
+    fun_out = yield inline_expr(inliner, site, e.fun)
+    args_out = yield inline_exprs(inliner, site, e.args)
+    match fun_out:
+        case tgt.EFunRef(f) if movable and f in inliner.callees:
+            pass
+        case _:
+            site.movable = False
+            return tgt.ECall(fun_out, args_out)
+
+    # The arguments are evaluated in the assignments to the parameters,
+    # so everything up to the end of the body is placed before the
+    # statement in order, and the calls after this one can follow.
+    callee = inliner.callees[f]
+    inliner.inlined[f] = inliner.inlined.get(f, 0) + 1
+    renaming: dict[Id, tgt.Expr] = {}
+    for x, a in zip(callee.fun.params, args_out):
+        match a:
+            case tgt.EConst() | tgt.EFunRef() if x not in callee.assigned:
+                renaming[x] = a
+            case _:
+                x_new = fresh_like(x)
+                renaming[x] = tgt.EVar(x_new)
+                site.before.append(tgt.SAssign(x_new, a))
+    if used and result is None:
+        result = Id.fresh("result")
+    if result is not None and callee.falls_through:
+        site.before.append(tgt.SAssign(result, tgt.EConst(None, '63bit')))
+    site.before.extend((yield copy_stmts(renaming, result, callee.fun.body)))
+    return None if result is None else tgt.EVar(result)
+
+def fresh_like(x: Id) -> Id:
+    return Id.fresh(x.name.rsplit(":", 1)[0])
+
+# Copying the Bodies
+#
+# All variables of a function are its parameters or assigned in its body,
+# so every variable in the copy gets a new name.
+
+def rename(renaming: dict[Id, tgt.Expr], x: Id) -> Id:
+    if x not in renaming:
+        renaming[x] = tgt.EVar(fresh_like(x))
+    match renaming[x]:
+        case tgt.EVar(y):
+            return y
+    raise Exception(f"inline: variable {x} was replaced by a constant")
+
+def copy_stmts(renaming: dict[Id, tgt.Expr], result: Id | None, ss: IList[src.Stmt]) -> Rec[IList[tgt.Stmt]]:
+    out: list[tgt.Stmt] = []
+    for s in ss:
+        match s:
+            case src.SExpr(e):
+                out.append(tgt.SExpr((yield copy_expr(renaming, e))))
+            case src.SPrint(e):
+                out.append(tgt.SPrint((yield copy_expr(renaming, e))))
+            case src.SAssign(x, e):
+                e_out = yield copy_expr(renaming, e)
+                out.append(tgt.SAssign(rename(renaming, x), e_out))
+            case src.SIf(e, b1, b2):
+                e_out = yield copy_expr(renaming, e)
+                b1_out = yield copy_stmts(renaming, result, b1)
+                b2_out = yield copy_stmts(renaming, result, b2)
+                out.append(tgt.SIf(e_out, b1_out, b2_out))
+            case src.SWhile(e, b):
+                e_out = yield copy_expr(renaming, e)
+                b_out = yield copy_stmts(renaming, result, b)
+                out.append(tgt.SWhile(e_out, b_out))
+            case src.SReturn(e):
+                e_out = yield copy_expr(renaming, e)
+                if result is not None:
+                    out.append(tgt.SAssign(result, e_out))
+                elif (yield has_effects(e_out)):
+                    out.append(tgt.SExpr(e_out))
+    return IList(out)
+
+def copy_expr(renaming: dict[Id, tgt.Expr], e: src.Expr) -> Rec[tgt.Expr]:
+    match e:
+        case src.EConst() | src.EInput() | src.EFunRef():
+            return e
+        case src.EVar(x):
+            if x not in renaming:
+                renaming[x] = tgt.EVar(fresh_like(x))
+            return renaming[x]
+        case src.EOp1(op, e1):
+            return tgt.EOp1(op, (yield copy_expr(renaming, e1)))
+        case src.EOp2(e1, op, e2):
+            e1_out = yield copy_expr(renaming, e1)
+            e2_out = yield copy_expr(renaming, e2)
+            return tgt.EOp2(e1_out, op, e2_out)
+        case src.EIf(e1, e2, e3):
+            e1_out = yield copy_expr(renaming, e1)
+            e2_out = yield copy_expr(renaming, e2)
+            e3_out = yield copy_expr(renaming, e3)
+            return tgt.EIf(e1_out, e2_out, e3_out)
+        case src.ETuple(es):
+            return tgt.ETuple((yield copy_exprs(renaming, es)))
+        case src.ETupleAccess(e1, i):
+            return tgt.ETupleAccess((yield copy_expr(renaming, e1)), i)
+        case src.ETupleLen(e1):
+            return tgt.ETupleLen((yield copy_expr(renaming, e1)))
+        case src.ECall(e1, es):
+            e1_out = yield copy_expr(renaming, e1)
+            return tgt.ECall(e1_out, (yield copy_exprs(renaming, es)))
+        case src.ELambda(params, body):
+            params_out = IList([rename(renaming, x) for x in params])
+            return tgt.ELambda(params_out, (yield copy_expr(renaming, body)))
+
+def copy_exprs(renaming: dict[Id, tgt.Expr], es: IList[src.Expr]) -> Rec[IList[tgt.Expr]]:
+    out = []
+    for e in es:
+        out.append((yield copy_expr(renaming, e)))
+    return IList(out)
+
+# Analyses
+
+def called_stmts(ss: IList[src.Stmt]) -> Rec[set[Label]]:
+    """
+    Returns the functions called directly in the statements.
+    """
+    funs: set[Label] = set()
+    for s in ss:
+        match s:
+            case src.SExpr(e) | src.SPrint(e) | src.SAssign(_, e) | src.SReturn(e):
+                funs |= yield called_expr(e)
+            case src.SIf(e, b1, b2):
+                funs |= yield called_expr(e)
+                funs |= yield called_stmts(b1)
+                funs |= yield called_stmts(b2)
+            case src.SWhile(e, b):
+                funs |= yield called_expr(e)
+                funs |= yield called_stmts(b)
+    return funs
+
+def called_expr(e: src.Expr) -> Rec[set[Label]]:
+    funs: set[Label] = set()
+    for e1 in subexprs(e):
+        funs |= yield called_expr(e1)
+    match e:
+        case src.ECall(src.EFunRef(f), _):
+            funs.add(f)
+    return funs
+
+def has_effects(e: src.Expr) -> Rec[bool]:
+    """
+    Returns whether evaluating the expression reads input or calls a function.
+    """
+    match e:
+        case src.EInput() | src.ECall():
+            return True
+        case src.ELambda():
+            return False
+    for e1 in subexprs(e):
+        if (yield has_effects(e1)):
+            return True
+    return False
+
+def subexprs(e: src.Expr) -> list[src.Expr]:
+    match e:
+        case src.EOp1(_, e1) | src.ETupleAccess(e1, _) | src.ETupleLen(e1) | src.ELambda(_, e1):
+            return [e1]
+        case src.EOp2(e1, _, e2):
+            return [e1, e2]
+        case src.EIf(e1, e2, e3):
+            return [e1, e2, e3]
+        case src.ETuple(es):
+            return list(es)
+        case src.ECall(e1, es):
+            return [e1, *es]
+    return []
+
+def size_stmts(ss: IList[src.Stmt]) -> Rec[int]:
+    """
+    Returns the number of statements and expressions.
+    """
+    size = 0
+    for s in ss:
+        size += 1
+        match s:
+            case src.SExpr(e) | src.SPrint(e) | src.SAssign(_, e) | src.SReturn(e):
+                size += yield size_expr(e)
+            case src.SIf(e, b1, b2):
+                size += yield size_expr(e)
+                size += yield size_stmts(b1)
+                size += yield size_stmts(b2)
+            case src.SWhile(e, b):
+                size += yield size_expr(e)
+                size += yield size_stmts(b)
+    return size
+
+def size_expr(e: src.Expr) -> Rec[int]:
+    size = 1
+    for e1 in subexprs(e):
+        size += yield size_expr(e1)
+    return size
+
+def returns_at_end(ss: IList[src.Stmt], at_end: bool) -> Rec[bool]:
+    """
+    Returns whether each `return` is the last statement of the body,
+    or of a branch of an `if` statement at the end of the body.
+    """
+    for i, s in enumerate(ss):
+        last = at_end and i == len(ss) - 1
+        match s:
+            case src.SReturn(_) if not last:
+                return False
+            case src.SIf(_, b1, b2):
+                if not (yield returns_at_end(b1, last)) or not (yield returns_at_end(b2, last)):
+                    return False
+            case src.SWhile(_, b):
+                if not (yield returns_at_end(b, False)):
+                    return False
+    return True
+
+def always_returns(ss: IList[src.Stmt]) -> Rec[bool]:
+    match ss:
+        case [*_, src.SReturn(_)]:
+            return True
+        case [*_, src.SIf(_, b1, b2)]:
+            return (yield always_returns(b1)) and (yield always_returns(b2))
+    return False
+
+def assigned_vars_stmts(ss: IList[src.Stmt]) -> Rec[set[Id]]:
+    avs: set[Id] = set()
+    for s in ss:
+        match s:
+            case src.SAssign(x, _):
+                avs.add(x)
+            case src.SIf(_, b1, b2):
+                avs |= yield assigned_vars_stmts(b1)
+                avs |= yield assigned_vars_stmts(b2)
+            case src.SWhile(_, b):
+                avs |= yield assigned_vars_stmts(b)
+    return avs
@@ -2,6 +2,7 @@ import ast_5_closures as src
 import ast_6_alloc as tgt
 from identifier import Id
 from util.immutable_list import *
+from util.trampoline import Rec, trampoline
 
 def alloc(p: src.Program) -> tgt.Program:
     return IList([alloc_decl(d) for d in p])
@@ -9,44 +10,47 @@ def alloc(p: src.Program) -> tgt.Program:
 def alloc_decl(d: src.Decl) -> tgt.Decl:
     match d:
         case src.DFun(name, params, body):
-            return tgt.DFun(name, params, alloc_stmts(body))
+            return tgt.DFun(name, params, trampoline(alloc_stmts(body)))
 
-def alloc_stmts(ss: IList[src.Stmt]) -> IList[tgt.Stmt]:
-    return IList([alloc_stmt(s) for s in ss])
+def alloc_stmts(ss: IList[src.Stmt]) -> Rec[IList[tgt.Stmt]]:
+    out = []
+    for s in ss:
+        out.append((yield alloc_stmt(s)))
+    return IList(out)
 
-def alloc_stmt(s: src.Stmt) -> tgt.Stmt:
+def alloc_stmt(s: src.Stmt) -> Rec[tgt.Stmt]:
     match s:
         case src.SExpr(e):
-            e_out = alloc_expr(e)
+            e_out = yield alloc_expr(e)
             return tgt.SExpr(e_out)
         case src.SPrint(e):
-            e_out = alloc_expr(e)
+            e_out = yield alloc_expr(e)
             return tgt.SPrint(e_out)
         case src.SAssign(x, e):
-            lhs = alloc_lhs(x)
-            e_out = alloc_expr(e)
+            lhs = yield alloc_lhs(x)
+            e_out = yield alloc_expr(e)
             return tgt.SAssign(lhs, e_out)
         case src.SIf(e, b1, b2):
-            e_out = alloc_expr(e)
-            b1_out = alloc_stmts(b1)
-            b2_out = alloc_stmts(b2)
+            e_out = yield alloc_expr(e)
+            b1_out = yield alloc_stmts(b1)
+            b2_out = yield alloc_stmts(b2)
             return tgt.SIf(e_out, b1_out, b2_out)
         case src.SWhile(e, b):
-            e_out = alloc_expr(e)
-            b_out = alloc_stmts(b)
+            e_out = yield alloc_expr(e)
+            b_out = yield alloc_stmts(b)
             return tgt.SWhile(e_out, b_out)
         case src.SReturn(e):
-            e_out = alloc_expr(e)
+            e_out = yield alloc_expr(e)
             return tgt.SReturn(e_out)
 
-def alloc_lhs(lhs: src.Lhs) -> tgt.Lhs:
+def alloc_lhs(lhs: src.Lhs) -> Rec[tgt.Lhs]:
     match lhs:
         case src.LId(x):
             return tgt.LId(x)
         case src.LSubscript(e, i):
-            return tgt.LSubscript(alloc_expr(e), i)
+            return tgt.LSubscript((yield alloc_expr(e)), i)
 
-def alloc_expr(e: src.Expr) -> tgt.Expr:
+def alloc_expr(e: src.Expr) -> Rec[tgt.Expr]:
     match e:
         case src.EConst(c, size):
             return tgt.EConst(c, size)
@@ -55,19 +59,19 @@ def alloc_expr(e: src.Expr) -> tgt.Expr:
         case src.EInput():
             return tgt.EInput()
         case src.EOp1(op, e1):
-            e1_out = alloc_expr(e1)
+            e1_out = yield alloc_expr(e1)
             return tgt.EOp1(op, e1_out)
         case src.EOp2(e1, op, e2):
-            e1_out = alloc_expr(e1)
-            e2_out = alloc_expr(e2)
+            e1_out = yield alloc_expr(e1)
+            e2_out = yield alloc_expr(e2)
             return tgt.EOp2(e1_out, op, e2_out)
         case src.EIf(e1, e2, e3):
-            e1_out = alloc_expr(e1)
-            e2_out = alloc_expr(e2)
-            e3_out = alloc_expr(e3)
+            e1_out = yield alloc_expr(e1)
+            e2_out = yield alloc_expr(e2)
+            e3_out = yield alloc_expr(e3)
             return tgt.EIf(e1_out, e2_out, e3_out)
         case src.ETuple(es):
-            body: IList[tgt.Stmt] = ilist()
+            body = IListBuilder[tgt.Stmt]()
 
             # We need 8 bytes for the garbage collector tag and
             # 8 bytes for each element as all our values currently
@@ -79,7 +83,7 @@ def alloc_expr(e: src.Expr) -> tgt.Expr:
             # new temporary variables.
             xs = []
             for e in es:
-                e_out = alloc_expr(e)
+                e_out = yield alloc_expr(e)
                 x = Id.fresh("tup")
                 body += ilist(tgt.SAssign(tgt.LId(x), e_out))
                 xs += [x]
@@ -105,18 +109,21 @@ def alloc_expr(e: src.Expr) -> tgt.Expr:
             for i, x in enumerate(xs):
                 body += ilist(tgt.SAssign(tgt.LSubscript(tgt.EVar(v), i), tgt.EVar(x)))
 
-            return tgt.EBegin(body, tgt.EVar(v))
+            return tgt.EBegin(body.build(), tgt.EVar(v))
         case src.ETupleAccess(e, i):
-            return tgt.ETupleAccess(alloc_expr(e), i)
+            return tgt.ETupleAccess((yield alloc_expr(e)), i)
         case src.ETupleLen(e):
-            return tgt.ETupleLen(alloc_expr(e))
+            return tgt.ETupleLen((yield alloc_expr(e)))
         case src.ECall(e_func, e_args):
-            return tgt.ECall(alloc_expr(e_func), alloc_exprs(e_args))
+            return tgt.ECall((yield alloc_expr(e_func)), (yield alloc_exprs(e_args)))
         case src.EFunRef(name):
             return tgt.EFunRef(name)
         case src.EBegin(ss, e):
-            return tgt.EBegin(alloc_stmts(ss), alloc_expr(e))
+            return tgt.EBegin((yield alloc_stmts(ss)), (yield alloc_expr(e)))
 
-def alloc_exprs(es: IList[src.Expr]) -> IList[tgt.Expr]:
-    return IList([alloc_expr(e) for e in es])
+def alloc_exprs(es: IList[src.Expr]) -> Rec[IList[tgt.Expr]]:
+    out = []
+    for e in es:
+        out.append((yield alloc_expr(e)))
+    return IList(out)
 
@@ -1,8 +1,12 @@
 import ast_7_mon as src
 import ast_8_exp as tgt
 from identifier import Id
-from util.immutable_list import IList, ilist
+from util.immutable_list import IList, IListBuilder, ilist
 from label import Label
+from util.trampoline import Rec, trampoline
+
+# The blocks under construction, which are frozen at the end of each function.
+type BlockBuilders = dict[Label, IListBuilder[tgt.Stmt]]
 
 def explicate(p: src.Program) -> tgt.Program:
     return IList([explicate_decl(d) for d in p])
@@ -16,23 +20,24 @@ def explicate_decl(d: src.Decl) -> tgt.Decl:
             l_start = Label(name + "_start")
             l_end = Label(name + "_conclusion")
 
-            out: tgt.Blocks = {}
-            out[l_fun] = ilist(tgt.SGoto(l_start))
-            out[l_start] = ilist()
+            out: BlockBuilders = {}
+            out[l_fun] = IListBuilder([tgt.SGoto(l_start)])
+            out[l_start] = IListBuilder()
 
-            l = explicate_stmts(out, l_start, body)
+            l = trampoline(explicate_stmts(out, l_start, body))
 
             out[l] += ilist(tgt.SGoto(l_end))
-            out[l_end] = ilist()
+            out[l_end] = IListBuilder()
 
-            return tgt.DFun(Label(name), params, l_start, l_end, out)
+            blocks = {label: block.build() for label, block in out.items()}
+            return tgt.DFun(Label(name), params, l_start, l_end, blocks)
 
-def explicate_stmts(out: tgt.Blocks, l: Label, p: IList[src.Stmt]) -> Label:
+def explicate_stmts(out: BlockBuilders, l: Label, p: IList[src.Stmt]) -> Rec[Label]:
     for s in p:
-        l = explicate_stmt(out, l, s)
+        l = yield explicate_stmt(out, l, s)
     return l
 
-def explicate_stmt(out: tgt.Blocks, l: Label, s: src.Stmt) -> Label:
+def explicate_stmt(out: BlockBuilders, l: Label, s: src.Stmt) -> Rec[Label]:
     match s:
         case src.SAssign(lhs, e):
             lhs_out = explicate_lhs(lhs)
@@ -53,15 +58,15 @@ def explicate_stmt(out: tgt.Blocks, l: Label, s: src.Stmt) -> Label:
             test = tgt.EOp2Comp(explicate_atom(a1), op, explicate_atom(a2))
             out[l] += ilist(tgt.SIf(test, body_label, orelse_label))
 
-            out[body_label] = ilist()
-            out[orelse_label] = ilist()
-            body_label_out = explicate_stmts(out, body_label, b1)
-            orelse_label_out = explicate_stmts(out, orelse_label, b2)
+            out[body_label] = IListBuilder()
+            out[orelse_label] = IListBuilder()
+            body_label_out = yield explicate_stmts(out, body_label, b1)
+            orelse_label_out = yield explicate_stmts(out, orelse_label, b2)
 
             out[body_label_out] += ilist(tgt.SGoto(cont_label))
             out[orelse_label_out] += ilist(tgt.SGoto(cont_label))
 
-            out[cont_label] = ilist()
+            out[cont_label] = IListBuilder()
             return cont_label
         case src.SWhile(test_prelude, src.EOp2Comp(a1, op, a2), b):
             test_label: Label = Label.fresh("test")
@@ -72,19 +77,19 @@ def explicate_stmt(out: tgt.Blocks, l: Label, s: src.Stmt) -> Label:
             out[l] += ilist(tgt.SGoto(test_label))
 
             # Create one (or more) blocks for the condition.
-            out[test_label] = ilist()
-            test_label_out = explicate_stmts(out, test_label, test_prelude)
+            out[test_label] = IListBuilder()
+            test_label_out = yield explicate_stmts(out, test_label, test_prelude)
             test = tgt.EOp2Comp(explicate_atom(a1), op, explicate_atom(a2))
             out[test_label_out] += ilist(tgt.SIf(test, body_label, cont_label))
 
             # Create a new block for the body, which should jump
             # to the `test_prelude_label` after running.
-            out[body_label] = ilist()
-            body_label_out = explicate_stmts(out, body_label, b)
+            out[body_label] = IListBuilder()
+            body_label_out = yield explicate_stmts(out, body_label, b)
             out[body_label_out] += ilist(tgt.SGoto(test_label))
 
             # Continue with a new block at `cont_label`
-            out[cont_label] = ilist()
+            out[cont_label] = IListBuilder()
             return cont_label
         case src.SReturn(e):
             e_out = explicate_expr(e)
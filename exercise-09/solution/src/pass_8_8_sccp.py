@@ -0,0 +1,362 @@
+from collections import deque
+from typing import Callable, Literal
+
+import ast_8_exp as src
+import ast_8_exp as tgt
+from identifier import Id
+from label import Label
+from semantics import simulate_over_and_underflow
+from util.immutable_list import IList, IListBuilder
+
+# Sparse Conditional Constant Propagation
+#
+# `sccp` computes for each variable of a function whether it holds the same
+# constant whenever it is read, and which blocks can be executed at all,
+# like the algorithm of Wegman and Zadeck. Both are computed together: a
+# block is only executable if it is reached by an executable edge, and an
+# `if` whose test is a known constant only makes the edge to the taken
+# branch executable. The constants then are substituted for the variables,
+# the operations on constants are folded, the `if`s with a known test are
+# replaced by gotos, and the blocks which are not executable are removed.
+# Finally, a block which is only reached by the goto of one other block is
+# appended to that block, so the chains of gotos left by the resolved `if`s
+# become straight-line code.
+#
+# The blocks are not in SSA form, but most variables are temporaries which
+# are assigned only once. These have a single value for the whole function,
+# which is updated sparsely: when it changes, only the blocks reading the
+# variable are visited again. The other variables, which are assigned more
+# than once, e.g. in loops, are tracked per block, and their values at the
+# begin of a block are met from the ends of its executable predecessors.
+#
+# The constants are the tagged values of the program, i.e. `EConst`s of size
+# '63bit', whose arithmetic wraps around like in `semantics`. Constants of
+# size '64bit', which only occur in the code for the garbage collector,
+# are folded on their untagged machine values.
+
+# The value of a variable: "undefined" as long as no executed assignment
+# of the variable was seen, a constant, or "varying" if the variable may
+# have different values.
+type Value = src.EConst | Literal["undefined", "varying"]
+type Env = dict[Id, Value]
+
+def sccp(p: src.Program) -> tgt.Program:
+    return IList([sccp_decl(d) for d in p])
+
+def sccp_decl(d: src.DFun) -> tgt.DFun:
+    blocks = d.body
+
+    # The parameters are assigned by the caller.
+    num_assigns: dict[Id, int] = {x: 1 for x in d.params}
+    for block in blocks.values():
+        for s in block:
+            match s:
+                case src.SAssign(src.LId(x), _):
+                    num_assigns[x] = num_assigns.get(x, 0) + 1
+
+    # the values of the variables which are assigned only once, and the
+    # blocks reading them
+    values: Env = {x: "varying" for x in d.params if num_assigns[x] == 1}
+    readers: dict[Id, list[Label]] = {}
+    for label, block in blocks.items():
+        for x in dict.fromkeys(x for s in block for x in read_vars(s)):
+            if num_assigns.get(x) == 1:
+                readers.setdefault(x, []).append(label)
+
+    # the values of the other variables at the end of each visited block
+    block_out: dict[Label, Env] = {}
+    entry_env: Env = {x: "varying" for x in d.params if num_assigns[x] > 1}
+    executable_preds: dict[Label, list[Label]] = {d.name: []}
+
+    work = deque([d.name])
+    queued = {d.name}
+
+    def enqueue(label: Label) -> None:
+        if label not in queued:
+            queued.add(label)
+            work.append(label)
+
+    def block_in(label: Label) -> Env:
+        if label == d.name:
+            return dict(entry_env)
+        return meet([block_out[pred] for pred in executable_preds[label] if pred in block_out])
+
+    while work:
+        label = work.popleft()
+        queued.remove(label)
+        env = block_in(label)
+        lookup = lookup_in(env, values, num_assigns)
+
+        succs: list[Label] = []
+        for s in blocks[label]:
+            match s:
+                case src.SAssign(src.LId(x), e):
+                    value = evaluate(e, lookup)
+                    if num_assigns[x] > 1:
+                        env[x] = value
+                    elif values.get(x, "undefined") != value:
+                        values[x] = value
+                        for reader in readers.get(x, []):
+                            if reader in executable_preds:
+                                enqueue(reader)
+                case src.SIf(test, body, orelse):
+                    match evaluate(test, lookup):
+                        case src.EConst(b, _):
+                            succs = [body if b else orelse]
+                        case _:
+                            succs = [body, orelse]
+                    break
+                case src.SGoto(target):
+                    succs = [target]
+                    break
+                case src.SReturn(_) | src.STailCall(_, _):
+                    # A return jumps to the conclusion. A tail call does not, but
+                    # like the goto after it, the edge keeps the conclusion
+                    # reachable for the later passes.
+                    succs = [d.end_label]
+                    break
+
+        changed = block_out.get(label) != env
+        block_out[label] = env
+        for succ in succs:
+            preds = executable_preds.setdefault(succ, [])
+            if label not in preds:
+                preds.append(label)
+                enqueue(succ)
+            elif changed:
+                enqueue(succ)
+
+    blocks_out: tgt.Blocks = {}
+    for label, block in blocks.items():
+        if label in executable_preds:
+            blocks_out[label] = rewrite_block(block, block_in(label), values, num_assigns, d.end_label)
+        elif label == d.end_label:
+            # The conclusion is needed even if the function never returns.
+            blocks_out[label] = block
+    blocks_out = merge_blocks(blocks_out, {d.name, d.start_label, d.end_label})
+    return tgt.DFun(d.name, d.params, d.start_label, d.end_label, blocks_out)
+
+def lookup_in(env: Env, values: Env, num_assigns: dict[Id, int]) -> Callable[[Id], Value]:
+    """
+    Returns the lookup of the value of a variable, which is in `values`
+    for the variables assigned only once, and in `env` for the others.
+    """
+    def lookup(x: Id) -> Value:
+        if num_assigns.get(x) == 1:
+            return values.get(x, "undefined")
+        return env.get(x, "undefined")
+    return lookup
+
+def merge_blocks(blocks: tgt.Blocks, keep: set[Label]) -> tgt.Blocks:
+    num_preds: dict[Label, int] = {}
+    for block in blocks.values():
+        match block:
+            case [*_, tgt.SGoto(target)]:
+                num_preds[target] = num_preds.get(target, 0) + 1
+            case [*_, tgt.SIf(_, body, orelse)]:
+                num_preds[body] = num_preds.get(body, 0) + 1
+                num_preds[orelse] = num_preds.get(orelse, 0) + 1
+
+    def merged_target(label: Label) -> Label | None:
+        match blocks[label]:
+            case [*_, tgt.SGoto(target)] if target not in keep and target != label and num_preds[target] == 1:
+                return target
+        return None
+
+    merged = {t for label in blocks if (t := merged_target(label)) is not None}
+    out: tgt.Blocks = {}
+    for label, block in blocks.items():
+        if label in merged:
+            continue
+        block_out = IListBuilder[tgt.Stmt]()
+        next_label = merged_target(label)
+        while next_label is not None:
+            block_out += block[:-1]
+            block = blocks[next_label]
+            next_label = merged_target(next_label)
+        block_out += block
+        out[label] = block_out.build()
+    return out
+
+def meet(envs: list[Env]) -> Env:
+    out: Env = {}
+    for env in envs:
+        for x, value in env.items():
+            other = out.get(x, "undefined")
+            if other == "undefined":
+                out[x] = value
+            elif value != "undefined" and value != other:
+                out[x] = "varying"
+    return out
+
+def read_vars(s: src.Stmt) -> list[Id]:
+    match s:
+        case src.SAssign(src.LSubscript(e1, _), e2):
+            return atom_vars([e1]) + expr_vars(e2)
+        case src.SAssign(_, e) | src.SPrint(e) | src.SIf(e, _, _) | src.SReturn(e):
+            return expr_vars(e)
+        case src.STailCall(e_func, e_args):
+            return atom_vars([e_func, *e_args])
+    return []
+
+def expr_vars(e: src.Expr) -> list[Id]:
+    match e:
+        case src.EVar(_):
+            return atom_vars([e])
+        case src.EOp1(_, e1) | src.ETupleAccess(e1, _) | src.ETupleLen(e1):
+            return atom_vars([e1])
+        case src.EOp2Arith(e1, _, e2) | src.EOp2Comp(e1, _, e2):
+            return atom_vars([e1, e2])
+        case src.ECall(e_func, e_args):
+            return atom_vars([e_func, *e_args])
+    return []
+
+def atom_vars(es: list[src.ExprAtom]) -> list[Id]:
+    return [e.name for e in es if isinstance(e, src.EVar)]
+
+# Evaluation
+
+def evaluate(e: src.Expr, lookup: Callable[[Id], Value]) -> Value:
+    match e:
+        case src.EConst(_, _):
+            return e
+        case src.EVar(x):
+            return lookup(x)
+        case src.EOp1(op, e1):
+            match evaluate(e1, lookup):
+                case src.EConst(_, _) as c:
+                    return fold_op1(op, c)
+                case v:
+                    return v
+        case src.EOp2Arith(e1, op, e2):
+            match evaluate(e1, lookup), evaluate(e2, lookup):
+                case src.EConst(_, _) as c1, src.EConst(_, _) as c2:
+                    return fold_arith(c1, op, c2)
+                case v1, v2:
+                    return unknown(v1, v2)
+        case src.EOp2Comp(e1, cmp, e2):
+            match evaluate(e1, lookup), evaluate(e2, lookup):
+                case src.EConst(_, _) as c1, src.EConst(_, _) as c2:
+                    return fold_comp(c1, cmp, c2)
+                case v1, v2:
+                    return unknown(v1, v2)
+    # Inputs, memory and calls
+    return "varying"
+
+def unknown(v1: Value, v2: Value) -> Value:
+    return "varying" if v1 == "varying" or v2 == "varying" else "undefined"
+
+def fold_op1(op: src.Op1, c: src.EConst) -> Value:
+    if c.size != "63bit":
+        return "varying"
+    match op:
+        case "not":
+            return src.EConst(not c.value, "63bit")
+        case "-":
+            return src.EConst(simulate_over_and_underflow(-tagged_int(c)), "63bit")
+    return "varying"
+
+def fold_arith(c1: src.EConst, op: src.Op2Arith, c2: src.EConst) -> src.EConst:
+    sign = 1 if op == "+" else -1
+    if c1.size == "63bit" and c2.size == "63bit":
+        return src.EConst(simulate_over_and_underflow(tagged_int(c1) + sign * tagged_int(c2)), "63bit")
+    return src.EConst(wrap_64(machine_int(c1) + sign * machine_int(c2)), "64bit")
+
+def fold_comp(c1: src.EConst, cmp: src.Op2Comp, c2: src.EConst) -> src.EConst:
+    # The tagging preserves the order, so the machine values are compared.
+    v1 = machine_int(c1)
+    v2 = machine_int(c2)
+    match cmp:
+        case "==":
+            b = v1 == v2
+        case "!=":
+            b = v1 != v2
+        case "<":
+            b = v1 < v2
+        case "<=":
+            b = v1 <= v2
+        case ">":
+            b = v1 > v2
+        case ">=":
+            b = v1 >= v2
+    return src.EConst(b, "63bit")
+
+def tagged_int(c: src.EConst) -> int:
+    return 0 if c.value is None else int(c.value)
+
+def machine_int(c: src.EConst) -> int:
+    return tagged_int(c) << (1 if c.size == "63bit" else 0)
+
+def wrap_64(i: int) -> int:
+    return (i + 2**63) % 2**64 - 2**63
+
+# Rewriting
+
+def rewrite_block(
+    block: src.Block, env: Env, values: Env, num_assigns: dict[Id, int], end_label: Label
+) -> tgt.Block:
+    lookup = lookup_in(env, values, num_assigns)
+
+    def atom(e: src.ExprAtom) -> tgt.ExprAtom:
+        match e:
+            case src.EVar(x):
+                value = lookup(x)
+                if isinstance(value, src.EConst):
+                    return value
+        return e
+
+    out = IListBuilder[tgt.Stmt]()
+    for s in block:
+        match s:
+            case src.SAssign(src.LId(x) as lhs, e):
+                value = evaluate(e, lookup)
+                if num_assigns[x] > 1:
+                    env[x] = value
+                if isinstance(value, src.EConst):
+                    out.append(tgt.SAssign(lhs, value))
+                else:
+                    out.append(tgt.SAssign(lhs, rewrite_expr(e, atom)))
+            case src.SAssign(lhs, e):
+                out.append(tgt.SAssign(lhs, rewrite_expr(e, atom)))
+            case src.SPrint(e):
+                out.append(tgt.SPrint(atom(e)))
+            case src.SIf(test, body, orelse):
+                match evaluate(test, lookup):
+                    case src.EConst(b, _):
+                        out.append(tgt.SGoto(body if b else orelse))
+                    case _:
+                        out.append(tgt.SIf(rewrite_comp(test, atom), body, orelse))
+                break
+            case src.SReturn(e):
+                out.append(tgt.SReturn(atom(e)))
+                # The rest of the block is not executed.
+                out.append(tgt.SGoto(end_label))
+                break
+            case src.STailCall(e_func, e_args):
+                out.append(tgt.STailCall(e_func, IList([atom(e) for e in e_args])))
+                out.append(tgt.SGoto(end_label))
+                break
+            case src.SGoto(_):
+                out.append(s)
+                break
+            case _:
+                out.append(s)
+    return out.build()
+
+def rewrite_expr(e: src.Expr, atom: Callable[[src.ExprAtom], tgt.ExprAtom]) -> tgt.Expr:
+    # Tuples and functions are never constants, so their variables are kept.
+    match e:
+        case src.EConst(_, _) | src.EVar(_):
+            return atom(e)
+        case src.EOp1(op, e1):
+            return tgt.EOp1(op, atom(e1))
+        case src.EOp2Arith(e1, op, e2):
+            return tgt.EOp2Arith(atom(e1), op, atom(e2))
+        case src.EOp2Comp(_, _, _):
+            return rewrite_comp(e, atom)
+        case src.ECall(e_func, e_args):
+            return tgt.ECall(e_func, IList([atom(e) for e in e_args]))
+    return e
+
+def rewrite_comp(e: src.EOp2Comp, atom: Callable[[src.ExprAtom], tgt.ExprAtom]) -> tgt.EOp2Comp:
+    return tgt.EOp2Comp(atom(e.left), e.cmp, atom(e.right))
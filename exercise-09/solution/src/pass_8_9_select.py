@@ -5,7 +5,7 @@ import ast_9_sel as tgt
 from identifier import Id
 from label import Label
 from register import *
-from util.immutable_list import ilist, IList
+from util.immutable_list import ilist, IList, IListBuilder
 
 def select(p: src.Program) -> tgt.Program:
     return IList([select_decl(d) for d in p])
@@ -24,10 +24,10 @@ def select_decl(d: src.Decl) -> tgt.Function:
             return tgt.Function(label, start_label, end_label, out)
 
 def select_block(end_label: Label, p: src.Block) -> tgt.Block:
-    out: tgt.Block = ilist()
+    out = IListBuilder[tgt.Instr]()
     for s in p:
         out += select_stmt(end_label, s)
-    return out
+    return out.build()
 
 def select_stmt(end_label: Label, s: src.Stmt) -> IList[tgt.Instr]:
     match s:
@@ -1,8 +1,8 @@
 import ast_9_sel as src
 import ast_10_mem as tgt
 from register import *
-from register_allocation import RegAllocOutput
-from util.immutable_list import ilist, IList
+from register_allocation import Home, RegAllocOutput
+from util.immutable_list import IList, IListBuilder
 from identifier import Id
 from label import Label
 from register import Register
@@ -20,17 +20,23 @@ def assign_homes_fun(f: src.Function, reg_info: dict[Label, RegAllocOutput]) ->
 
 def assign_homes_body(
     blocks: src.Blocks,
-    env: dict[Id, Register | tgt.Offset],
+    env: dict[Id, Home],
 ) -> tgt.Blocks:
     out: tgt.Blocks = {}
     for label, block in blocks.items():
-        block_out: tgt.Block = ilist()
+        block_out = IListBuilder[tgt.Instr]()
         for i in block:
-            block_out += ilist(assign_homes_instr(env, i))
-        out[label] = block_out
+            match i:
+                # Rematerialized variables are replaced by their value at
+                # each use, so their definition is not needed anymore.
+                case src.Move(Id(_) as x, _) if isinstance(env.get(x), tgt.Const | Label):
+                    continue
+                case _:
+                    block_out.append(assign_homes_instr(env, i))
+        out[label] = block_out.build()
     return out
 
-def assign_homes_instr(env: dict[Id, Register | tgt.Offset], i: src.Instr) -> tgt.Instr:
+def assign_homes_instr(env: dict[Id, Home], i: src.Instr) -> tgt.Instr:
     match i:
         case src.Jump(label):
             return tgt.Jump(label)
@@ -48,10 +54,14 @@ def assign_homes_instr(env: dict[Id, Register | tgt.Offset], i: src.Instr) -> tg
                 assign_home_src(env, src2),
             )
 
-def assign_home_dst(env: dict[Id, Register | tgt.Offset], arg: src.ArgWrite) -> tgt.ArgWrite:
+def assign_home_dst(env: dict[Id, Home], arg: src.ArgWrite) -> tgt.ArgWrite:
     match arg:
         case Id(_) as x:
-            return assign_home_id(env, x)
+            match assign_home_id(env, x):
+                case Register(_) | tgt.Offset(_, _) as home:
+                    return home
+                case _:
+                    raise Exception(f"Expected rematerialized {x} to be only written by its definition!")
         case Register(r):
             return Register(r)
         case src.Offset(e, i):
@@ -61,18 +71,26 @@ def assign_home_dst(env: dict[Id, Register | tgt.Offset], arg: src.ArgWrite) ->
                 case Label(l):
                     return tgt.Offset(Label(l), i)
                 case Id(_) as x:
-                    return tgt.Offset(assign_home_id(env, x), i)
+                    match assign_home_id(env, x):
+                        case Register(_) | tgt.Offset(_, _) as home:
+                            return tgt.Offset(home, i)
+                        case Label(_) as label:
+                            return tgt.Offset(label, i)
+                        case _:
+                            raise Exception(f"Expected {x} to not be used as an address!")
 
-def assign_home_src(env: dict[Id, Register | tgt.Offset], arg: src.ArgRead) -> tgt.ArgRead:
+def assign_home_src(env: dict[Id, Home], arg: src.ArgRead) -> tgt.ArgRead:
     match arg:
         case src.Const(i, size):
             return tgt.Const(i, size)
         case Label(l):
             return Label(l)
+        case Id(_) as x:
+            return assign_home_id(env, x)
         case _:
             return assign_home_dst(env, arg)
 
-def assign_home_id(env: dict[Id, Register | tgt.Offset], x: Id) -> Register | tgt.Offset:
+def assign_home_id(env: dict[Id, Home], x: Id) -> Home:
     if x not in env:
         raise Exception(
             f"Expected {x} to have either a register or stack location assigned!"
@@ -0,0 +1,68 @@
+import ast_9_sel as src
+import ast_9_sel as tgt
+from dataflow_analysis import BlockLiveness, liveness_analysis
+from identifier import Id
+from label import Label
+from register_allocation import control_flow_graph
+from util.immutable_list import IList
+
+# Dead Code Elimination
+#
+# Removes the moves and arithmetic instructions which assign a variable
+# that is not live afterwards. These have no other effect, so the program
+# behaves the same without them, but they would still take a register and
+# interfere with the other variables during register allocation.
+#
+# Instructions writing a register or memory through an `Offset`, like the
+# updates of `gc_free_ptr` and the stores into tuples, are always kept, as
+# the liveness analysis does not know who reads them, and so are calls.
+#
+# Each block is swept backwards from the variables live at its end, such
+# that a chain of dead assignments within a block is removed at once.
+# Removing the last read of a variable in one block can make assignments
+# in other blocks dead, so the liveness is computed again until nothing
+# is removed anymore.
+
+def eliminate_dead_code(p: src.Program) -> tuple[tgt.Program, dict[Label, int]]:
+    """
+    Returns the program without dead instructions and the number of
+    removed instructions in each function.
+    """
+    funs = []
+    removed: dict[Label, int] = {}
+    for f in p:
+        f_out, removed[f.entry_label] = eliminate_dead_code_fun(f)
+        funs.append(f_out)
+    return IList(funs), removed
+
+def eliminate_dead_code_fun(f: src.Function) -> tuple[tgt.Function, int]:
+    blocks = f.body
+    # Only instructions with a variable as destination are removed, so the
+    # control flow graph stays the same.
+    cfg = control_flow_graph(blocks)
+    removed = 0
+    while True:
+        liveness = liveness_analysis(blocks, cfg)
+        blocks_out: tgt.Blocks = {}
+        removed_now = 0
+        for label, block in blocks.items():
+            blocks_out[label] = sweep_block(block, liveness[label])
+            removed_now += len(block) - len(blocks_out[label])
+        blocks = blocks_out
+        if removed_now == 0:
+            break
+        removed += removed_now
+    return tgt.Function(f.entry_label, f.start_label, f.end_label, blocks), removed
+
+def sweep_block(block: src.Block, facts: BlockLiveness) -> tgt.Block:
+    live = facts.block_out_bits
+    kept: list[tgt.Instr] = []
+    for i, transfer in zip(reversed(block), reversed(facts.transfers)):
+        match i:
+            case src.Move(Id() as x, _) | src.Instr2(_, Id() as x, _, _):
+                if not live >> facts.numbering.number(x) & 1:
+                    continue
+        live = transfer.apply(live)
+        kept.append(i)
+    kept.reverse()
+    return IList(kept)
@@ -0,0 +1,183 @@
+from typing import Any
+
+import ast_9_sel as src
+import ast_9_sel as tgt
+from dataflow_analysis import entry_label
+from identifier import Id
+from label import Label
+from register import Register, zero
+from register_allocation import control_flow_graph
+from util.immutable_list import IList, IListBuilder
+
+# Global Value Numbering
+#
+# `gvn` removes the instructions of a function in SSA form which compute a
+# value that is already held by a variable. As each variable is assigned
+# only once, an instruction computes the same value as an earlier one with
+# the same operation and operands, and the variable of the earlier one can
+# be read instead, wherever the earlier instruction dominates. The blocks
+# are visited in a preorder walk of the dominator tree, where the values
+# computed in a block are available in the blocks it dominates. A copy of
+# a variable is removed as well, and the variable is read directly.
+#
+# Loads from memory are different: the value behind an `Offset` changes by
+# stores, and calls may store into tuples or run the garbage collector,
+# which moves the tuples and updates `gc_free_ptr`. So each store and call
+# starts a new version of the memory, and a load is only reused within the
+# same version. A block with a single predecessor continues the version of
+# its predecessor, which is also its immediate dominator, and all other
+# blocks start a new version. A store also makes the stored variable
+# available for the loads from the same `Offset` until the next version.
+
+# the operations whose operands can be swapped
+COMMUTATIVE = {"add", "mul", "xor", "and"}
+
+def gvn(p: src.SSAProgram) -> tuple[tgt.SSAProgram, dict[Label, int]]:
+    """
+    Returns the program without redundant instructions and the number of
+    removed instructions in each function.
+    """
+    funs = []
+    removed: dict[Label, int] = {}
+    for f in p:
+        f_out, removed[f.entry_label] = gvn_fun(f)
+        funs.append(f_out)
+    return IList(funs), removed
+
+def gvn_fun(f: src.SSAFunction) -> tuple[tgt.SSAFunction, int]:
+    cfg = control_flow_graph(f.body)
+    dominators = cfg.dominators(entry_label(f.body))
+
+    # the variable or constant replacing each removed variable, and the
+    # variable holding each available value
+    replace: dict[Id, Id] = {}
+    available: dict[tuple[Any, ...], Id] = {}
+    # the memory version at the end of each visited block
+    memory_out: dict[Label, int] = {}
+    num_versions = 0
+    body: dict[Label, tgt.Block] = {}
+    removed = 0
+
+    def arg_write(a: src.ArgWrite) -> src.ArgWrite:
+        match a:
+            case Id():
+                return replace.get(a, a)
+            case src.Offset(Id() as x, k):
+                return src.Offset(replace.get(x, x), k)
+        return a
+
+    def arg(a: src.ArgRead) -> src.ArgRead:
+        match a:
+            case Id() | src.Offset():
+                return arg_write(a)
+        return a
+
+    def lookup(added: list[tuple[Any, ...]], key: tuple[Any, ...], x: Id) -> bool:
+        """
+        Returns whether the value of `key` is available, and then replaces
+        `x` by its variable. Otherwise makes `x` available for `key`, and
+        adds `key` to the values `added` by the current block.
+        """
+        y = available.get(key)
+        if y is not None:
+            replace[x] = y
+            return True
+        available[key] = x
+        added.append(key)
+        return False
+
+    # The walk keeps the values which a block adds, and removes them again
+    # after the blocks it dominates.
+    stack: list[tuple[Label, list[tuple[Any, ...]] | None]] = [(dominators.entry, None)]
+    while stack:
+        label, added = stack.pop()
+        if added is not None:
+            for added_key in added:
+                del available[added_key]
+            continue
+        added = []
+
+        preds = list(cfg.neighbors_in(label))
+        if len(preds) == 1 and preds[0] in memory_out:
+            memory = memory_out[preds[0]]
+        else:
+            num_versions += 1
+            memory = num_versions
+
+        block_out = IListBuilder[tgt.Instr]()
+        for i in f.body[label]:
+            match i:
+                case src.Move(Id() as x, Id() as y):
+                    replace[x] = replace.get(y, y)
+                    removed += 1
+                    continue
+                case src.Move(Id() as x, src.Offset(_, _) as a):
+                    a = arg(a)
+                    if lookup(added, ("load", a, memory), x):
+                        removed += 1
+                        continue
+                    i = tgt.Move(x, a)
+                case src.Move(src.Offset(_, _) as a, b):
+                    num_versions += 1
+                    memory = num_versions
+                    i = tgt.Move(arg_write(a), arg(b))
+                    match i:
+                        case tgt.Move(a, Id() as y):
+                            available[("load", a, memory)] = y
+                            added.append(("load", a, memory))
+                case src.Instr2(op, Id() as x, a, b) if not reads_register(a) and not reads_register(b):
+                    a, b = arg(a), arg(b)
+                    key: tuple[Any, ...] = (op, a, b)
+                    if op in COMMUTATIVE and str(b) < str(a):
+                        key = (op, b, a)
+                    if type(a) is src.Offset or type(b) is src.Offset:
+                        key += (memory,)
+                    if lookup(added, key, x):
+                        removed += 1
+                        continue
+                    i = tgt.Instr2(op, x, a, b)
+                case src.Instr2(op, dst, a, b):
+                    if type(dst) is src.Offset:
+                        num_versions += 1
+                        memory = num_versions
+                    i = tgt.Instr2(op, arg_write(dst), arg(a), arg(b))
+                case src.Call(target, arity, ty):
+                    num_versions += 1
+                    memory = num_versions
+                    i = tgt.Call(arg(target), arity, ty)
+                case src.Move(dst, a):
+                    i = tgt.Move(arg_write(dst), arg(a))
+                case src.Branch(cc, a, b, target):
+                    i = tgt.Branch(cc, arg(a), arg(b), target)
+            block_out.append(i)
+        body[label] = block_out.build()
+        memory_out[label] = memory
+
+        stack.append((label, added))
+        stack.extend((child, None) for child in reversed(dominators.children[label]))
+
+    # The phi nodes read the values at the end of the predecessors, which
+    # are only known after the walk.
+    phis = {
+        label: IList([
+            tgt.Phi(phi.dst, {pred: arg(a) for pred, a in phi.srcs.items()})
+            for phi in block_phis
+        ])
+        for label, block_phis in f.phis.items()
+    }
+    return tgt.SSAFunction(
+        f.entry_label,
+        f.start_label,
+        f.end_label,
+        phis,
+        {label: body.get(label, block) for label, block in f.body.items()},
+    ), removed
+
+def reads_register(a: src.ArgRead) -> bool:
+    # Except for `zero`, the registers are not in SSA form.
+    match a:
+        case Register() if a != zero:
+            return True
+        case src.Offset(Register(), _):
+            return True
+    return False
@@ -0,0 +1,212 @@
+import ast_9_sel as src
+import ast_9_sel as tgt
+from identifier import Id
+from label import Label
+from util.immutable_list import IList, IListBuilder, ilist
+from dataflow_analysis import entry_label, liveness_analysis, read_set, write_set
+from register_allocation import control_flow_graph, rematerializable
+
+# Live Range Splitting
+#
+# Splits the live ranges of variables into pieces, which are connected by
+# moves, such that the register allocator can give each piece its own home:
+#
+# - Loops: variables used inside an outermost natural loop and live at its
+#   boundary are renamed inside the loop. They are copied into the new
+#   variable on the edges entering the loop and back on the edges leaving
+#   the loop.
+# - Calls: variables live across a call are copied into a new variable
+#   after their last reference before the call, and back before their
+#   next reference after the call, or at the end of the block. Calls
+#   inside loops are not split, as the copies would then be executed in
+#   every iteration, and a piece which is spilled would add a store and a
+#   load to each of them.
+#
+# Rematerializable variables are not split, as spilling them is free,
+# whereas a piece is defined by a move and thus takes a stack slot.
+#
+# This way a variable which has to be kept on the stack across a call can
+# still be kept in a register inside a loop. The register allocator prefers
+# giving move related pieces the same home, in which case the moves are
+# removed by `optimize`.
+
+def split_live_ranges(p: src.Program) -> tgt.Program:
+    return IList([split_fun(f) for f in p])
+
+def split_fun(f: src.Function) -> tgt.Function:
+    body = split_loops(f.body)
+    body = split_calls(body)
+    return tgt.Function(f.entry_label, f.start_label, f.end_label, body)
+
+def split_loops(blocks: src.Blocks) -> src.Blocks:
+    cfg = control_flow_graph(blocks)
+    liveness = liveness_analysis(blocks, cfg)
+    loops = cfg.natural_loops(entry_label(blocks))
+    remat = rematerializable(blocks)
+
+    renamings: dict[Label, dict[Id, Id]] = {}
+    # the moves to insert on each edge, which consist of the moves of
+    # a loop being left, followed by the moves of a loop being entered
+    edge_moves: dict[tuple[Label, Label], list[tgt.Instr]] = {}
+
+    for header, body in loops.items():
+        if any(header in body2 for header2, body2 in loops.items() if header2 != header):
+            continue
+
+        used = {
+            x
+            for label in body
+            for i in blocks[label]
+            for x in read_set(i) | write_set(i)
+            if type(x) is Id and x not in remat
+        }
+        exits = [(l, t) for l in body for t in cfg.neighbors_out(l) if t not in body]
+        entries = [(l, header) for l in cfg.neighbors_in(header) if l not in body]
+        boundary = set(liveness[header].block_in)
+        for _, target in exits:
+            boundary |= liveness[target].block_in
+
+        renaming = {x: fresh_piece(x) for x in sorted(used & boundary, key=str)}
+        if not renaming:
+            continue
+        for label in body:
+            renamings[label] = renaming
+
+        for edge in exits:
+            live = liveness[edge[1]].block_in
+            moves: list[tgt.Instr] = [tgt.Move(x, y) for x, y in renaming.items() if x in live]
+            edge_moves[edge] = moves + edge_moves.get(edge, [])
+        for edge in entries:
+            live = liveness[header].block_in
+            moves = [tgt.Move(y, x) for x, y in renaming.items() if x in live]
+            edge_moves[edge] = edge_moves.get(edge, []) + moves
+
+    # The moves of an edge are placed at the end of its source, if the
+    # source has no other successor, or else at the begin of its target,
+    # if the target has no other predecessor. Otherwise the edge is
+    # critical and gets a new block, which is placed before its target.
+    append: dict[Label, list[tgt.Instr]] = {}
+    prepend: dict[Label, list[tgt.Instr]] = {}
+    edge_labels: dict[tuple[Label, Label], Label] = {}
+    edge_blocks: dict[Label, list[tuple[Label, tgt.Block]]] = {}
+    for (source, target), moves in edge_moves.items():
+        if not moves:
+            continue
+        if len(cfg.neighbors_out(source)) == 1 and not ends_with_branch(blocks[source]):
+            append[source] = moves
+        elif len(cfg.neighbors_in(target)) == 1:
+            prepend[target] = moves
+        else:
+            label = Label.fresh("split")
+            edge_labels[(source, target)] = label
+            block = IList(moves) + ilist(tgt.Jump(target))
+            edge_blocks.setdefault(target, []).append((label, block))
+
+    out: tgt.Blocks = {}
+    for label, block in blocks.items():
+        for label2, block2 in edge_blocks.get(label, []):
+            out[label2] = block2
+        renaming = renamings.get(label, {})
+        block_out = IList([rename_instr(i, renaming) for i in block]) if renaming else block
+        block_out = IList(prepend.get(label, [])) + block_out
+        if label in append:
+            block_out = block_out[:-1] + IList(append[label]) + block_out[-1:]
+        out[label] = retarget(block_out, label, edge_labels)
+    return out
+
+def split_calls(blocks: src.Blocks) -> src.Blocks:
+    cfg = control_flow_graph(blocks)
+    liveness = liveness_analysis(blocks, cfg)
+    in_loop = {label for body in cfg.natural_loops(entry_label(blocks)).values() for label in body}
+    remat = rematerializable(blocks)
+
+    out: tgt.Blocks = {}
+    for label, block in blocks.items():
+        if label in in_loop:
+            out[label] = block
+            continue
+        live_outs = liveness[label].instr_out
+        refs = [{x for x in read_set(i) | write_set(i) if type(x) is Id} for i in block]
+        end = len(block)
+        while end > 0 and type(block[end - 1]) in [src.Jump, src.Branch]:
+            end -= 1
+
+        # A piece spans all calls between two references of a variable
+        # in the block, and is copied in and out at these references.
+        moves_before: dict[int, list[tgt.Instr]] = {}
+        regions: set[tuple[Id, int, int]] = set()
+        for k, i in enumerate(block):
+            if type(i) is not src.Call or i.ty != 'normal':
+                continue
+            for x in sorted([x for x in live_outs[k] if type(x) is Id and x not in remat], key=str):
+                start = k
+                while start > 0 and x not in refs[start - 1]:
+                    start -= 1
+                stop = k + 1
+                while stop < end and x not in refs[stop]:
+                    stop += 1
+                if (x, start, stop) in regions:
+                    continue
+                regions.add((x, start, stop))
+                y = fresh_piece(x)
+                moves_before.setdefault(start, []).append(tgt.Move(y, x))
+                moves_before.setdefault(stop, []).insert(0, tgt.Move(x, y))
+
+        block_out = IListBuilder[tgt.Instr]()
+        for k, i in enumerate(block):
+            block_out += moves_before.get(k, [])
+            block_out.append(i)
+        block_out += moves_before.get(len(block), [])
+        out[label] = block_out.build()
+    return out
+
+def fresh_piece(x: Id) -> Id:
+    return Id.fresh(x.name.split(":")[0])
+
+def ends_with_branch(block: src.Block) -> bool:
+    match block:
+        case [*_, src.Branch(), _]:
+            return True
+        case _:
+            return False
+
+def retarget(block: tgt.Block, source: Label, edge_labels: dict[tuple[Label, Label], Label]) -> tgt.Block:
+    def target(l: Label) -> Label:
+        return edge_labels.get((source, l), l)
+
+    match block:
+        case [*instrs, tgt.Branch(cc, rs1, rs2, l1), tgt.Jump(l2)]:
+            return IList(instrs) + ilist(tgt.Branch(cc, rs1, rs2, target(l1)), tgt.Jump(target(l2)))
+        case [*instrs, tgt.Jump(l)]:
+            return IList(instrs) + ilist(tgt.Jump(target(l)))
+        case _:
+            return block
+
+# Renaming
+
+def rename_instr(i: src.Instr, renaming: dict[Id, Id]) -> tgt.Instr:
+    match i:
+        case src.Move(dst, src_):
+            return tgt.Move(rename_arg(dst, renaming), rename_arg(src_, renaming))
+        case src.Call(target, arity, ty):
+            return tgt.Call(rename_arg(target, renaming), arity, ty)
+        case src.Instr2(op, dst, src1, src2):
+            return tgt.Instr2(
+                op,
+                rename_arg(dst, renaming),
+                rename_arg(src1, renaming),
+                rename_arg(src2, renaming),
+            )
+        case src.Branch(cc, src1, src2, target):
+            return tgt.Branch(cc, rename_arg(src1, renaming), rename_arg(src2, renaming), target)
+        case src.Jump(_):
+            return i
+
+def rename_arg[A: src.ArgRead](arg: A, renaming: dict[Id, Id]) -> A:
+    match arg:
+        case Id(_):
+            return renaming.get(arg, arg)  # type: ignore
+        case src.Offset(Id(_) as x, offset):
+            return src.Offset(renaming.get(x, x), offset)  # type: ignore
+        case _:
+            return arg
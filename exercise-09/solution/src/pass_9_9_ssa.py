@@ -0,0 +1,293 @@
+from typing import Callable
+
+import ast_9_sel as src
+import ast_9_sel as tgt
+from dataflow_analysis import entry_label, liveness_analysis, read_set
+from identifier import Id
+from label import Label
+from pass_9_9_split_live_ranges import ends_with_branch, fresh_piece, rename_arg, retarget
+from register_allocation import control_flow_graph
+from util.immutable_list import IList, IListBuilder, ilist
+
+# Static Single Assignment Form
+#
+# `construct_ssa` converts the blocks of each function into SSA form, where
+# each variable is assigned only once, such that each use of a variable
+# refers to a single definition, which is what sparse analyses need.
+# Registers are not renamed, as they are fixed by the calling convention.
+#
+# The phi nodes are placed by the algorithm of Cytron et al.: a variable
+# assigned in a block needs a phi node at the blocks in the dominance
+# frontier of the block, and, as a phi node is an assignment itself, in
+# their dominance frontiers and so on. Only variables which are live at
+# the begin of a block get a phi node there (pruned SSA). The variables are
+# then renamed in a preorder walk of the dominator tree, where each use
+# refers to the closest dominating assignment of the variable.
+#
+# A variable which is read on some path without being assigned before
+# keeps its name, which is never assigned, like in the original program.
+# Blocks which are unreachable from the entry are left as they are.
+#
+# `destruct_ssa` replaces the phi nodes of a block by moves at the end of
+# each predecessor, or in a new block on the edge, if the predecessor has
+# several successors. The moves of an edge are executed simultaneously
+# like the phi nodes, so they are ordered such that no variable is
+# overwritten before it is read, using a temporary to break cycles.
+
+class SSAError(Exception):
+    """
+    A violation of the invariants of the SSA form, found by `check_ssa`.
+    """
+
+def construct_ssa(p: src.Program) -> tgt.SSAProgram:
+    return IList([construct_ssa_fun(f) for f in p])
+
+def construct_ssa_fun(f: src.Function) -> tgt.SSAFunction:
+    blocks = f.body
+    cfg = control_flow_graph(blocks)
+    dominators = cfg.dominators(entry_label(blocks))
+    frontiers = cfg.dominance_frontiers(dominators)
+    liveness = liveness_analysis(blocks, cfg)
+    preorder = dominators.preorder()
+
+    def live_in(x: Id, label: Label) -> bool:
+        return liveness[label].block_in_contains(x)
+
+    # Phi Placement
+
+    def_blocks: dict[Id, dict[Label, None]] = {}
+    for label in preorder:
+        for i in blocks[label]:
+            match i:
+                case src.Move(Id() as x, _) | src.Instr2(_, Id() as x, _, _):
+                    def_blocks.setdefault(x, {})[label] = None
+
+    phi_vars: dict[Label, list[Id]] = {label: [] for label in preorder}
+    for x, labels in def_blocks.items():
+        work = list(labels)
+        has_phi: set[Label] = set()
+        while work:
+            for join in frontiers[work.pop()]:
+                if join in has_phi or not live_in(x, join):
+                    continue
+                has_phi.add(join)
+                phi_vars[join].append(x)
+                if join not in labels:
+                    work.append(join)
+
+    # Renaming
+
+    # the current name of each variable, and the values flowing into the
+    # phi nodes of each block by variable and predecessor
+    current: dict[Id, Id] = {}
+    phi_dsts: dict[Label, dict[Id, Id]] = {label: {} for label in preorder}
+    phi_srcs: dict[Label, dict[Id, dict[Label, src.ArgRead]]] = {
+        label: {x: {} for x in xs} for label, xs in phi_vars.items()
+    }
+    body: dict[Label, tgt.Block] = {}
+
+    # gives a variable a new name, recording the name it shadows
+    def define_in(shadowed: list[tuple[Id, Id | None]]) -> Callable[[Id], Id]:
+        def define(x: Id) -> Id:
+            shadowed.append((x, current.get(x)))
+            current[x] = fresh_piece(x)
+            return current[x]
+        return define
+
+    # The walk keeps the names which a block shadows, and restores them
+    # after the blocks it dominates.
+    stack: list[tuple[Label, list[tuple[Id, Id | None]] | None]] = [(dominators.entry, None)]
+    while stack:
+        label, shadowed = stack.pop()
+        if shadowed is not None:
+            for x, y in reversed(shadowed):
+                if y is None:
+                    del current[x]
+                else:
+                    current[x] = y
+            continue
+        shadowed = []
+        define = define_in(shadowed)
+        for x in phi_vars[label]:
+            phi_dsts[label][x] = define(x)
+        block_out = IListBuilder[tgt.Instr]()
+        for i in blocks[label]:
+            block_out.append(rename_instr(i, current, define))
+        body[label] = block_out.build()
+        for succ in cfg.neighbors_out(label):
+            for x, srcs in phi_srcs.get(succ, {}).items():
+                srcs[label] = current.get(x, x)
+
+        stack.append((label, shadowed))
+        stack.extend((child, None) for child in reversed(dominators.children[label]))
+
+    phis: dict[Label, IList[tgt.Phi]] = {}
+    for label in blocks:
+        if phi_vars.get(label):
+            preds = [pred for pred in cfg.neighbors_in(label) if pred in dominators.idom]
+            phis[label] = IList([
+                tgt.Phi(phi_dsts[label][x], {pred: phi_srcs[label][x][pred] for pred in preds})
+                for x in phi_vars[label]
+            ])
+    return tgt.SSAFunction(
+        f.entry_label,
+        f.start_label,
+        f.end_label,
+        phis,
+        {label: body.get(label, block) for label, block in blocks.items()},
+    )
+
+def rename_instr(i: src.Instr, current: dict[Id, Id], define: Callable[[Id], Id]) -> tgt.Instr:
+    # The sources are renamed before the destination, which may be one of them.
+    match i:
+        case src.Move(dst, src_):
+            src_out = rename_arg(src_, current)
+            return tgt.Move(rename_dst(dst, current, define), src_out)
+        case src.Instr2(op, dst, src1, src2):
+            src1_out = rename_arg(src1, current)
+            src2_out = rename_arg(src2, current)
+            return tgt.Instr2(op, rename_dst(dst, current, define), src1_out, src2_out)
+        case src.Call(target, arity, ty):
+            return tgt.Call(rename_arg(target, current), arity, ty)
+        case src.Branch(cc, src1, src2, target):
+            return tgt.Branch(cc, rename_arg(src1, current), rename_arg(src2, current), target)
+        case src.Jump(_):
+            return i
+
+def rename_dst(dst: src.ArgWrite, current: dict[Id, Id], define: Callable[[Id], Id]) -> tgt.ArgWrite:
+    match dst:
+        case Id(_):
+            return define(dst)
+        case _:
+            return rename_arg(dst, current)
+
+# Validation
+
+def check_ssa(p: tgt.SSAProgram) -> None:
+    """
+    Checks that each variable is assigned at most once, that each use of
+    an assigned variable is dominated by its assignment, and that the phi
+    nodes have a value for exactly the reachable predecessors of their
+    block. Raises `SSAError` otherwise.
+    """
+    for f in p:
+        check_ssa_fun(f)
+
+def check_ssa_fun(f: tgt.SSAFunction) -> None:
+    cfg = control_flow_graph(f.body)
+    dominators = cfg.dominators(entry_label(f.body))
+
+    def error(msg: str) -> SSAError:
+        return SSAError(f"Invalid SSA form in function {f.entry_label}: {msg}")
+
+    # the block and position of the assignment of each variable, where
+    # phi nodes are at position -1
+    defs: dict[Id, tuple[Label, int]] = {}
+
+    def add_def(x: Id, label: Label, k: int) -> None:
+        if x in defs:
+            raise error(f"{x} is assigned in {defs[x][0]} and in {label}")
+        defs[x] = (label, k)
+
+    for label, phis in f.phis.items():
+        if label not in dominators.idom:
+            raise error(f"the unreachable block {label} has phi nodes")
+        preds = {pred for pred in cfg.neighbors_in(label) if pred in dominators.idom}
+        for phi in phis:
+            if set(phi.srcs) != preds:
+                raise error(f"the phi node of {phi.dst} in {label} does not match the predecessors")
+            add_def(phi.dst, label, -1)
+    for label in dominators.idom:
+        for k, i in enumerate(f.body[label]):
+            match i:
+                case tgt.Move(Id() as x, _) | tgt.Instr2(_, Id() as x, _, _):
+                    add_def(x, label, k)
+
+    def check_use(x: Id, label: Label, k: int) -> None:
+        if x not in defs:
+            return
+        def_label, def_k = defs[x]
+        if def_label == label and def_k < k or def_label != label and dominators.dominates(def_label, label):
+            return
+        raise error(f"the use of {x} in {label} is not dominated by its assignment in {def_label}")
+
+    for label, phis in f.phis.items():
+        for phi in phis:
+            for pred, arg in phi.srcs.items():
+                if type(arg) is Id:
+                    check_use(arg, pred, len(f.body[pred]))
+    for label in dominators.idom:
+        for k, i in enumerate(f.body[label]):
+            for y in read_set(i):
+                if type(y) is Id:
+                    check_use(y, label, k)
+
+# Destruction
+
+def destruct_ssa(p: src.SSAProgram) -> tgt.Program:
+    return IList([destruct_ssa_fun(f) for f in p])
+
+def destruct_ssa_fun(f: src.SSAFunction) -> tgt.Function:
+    cfg = control_flow_graph(f.body)
+
+    copies: dict[tuple[Label, Label], list[tuple[Id, src.ArgRead]]] = {}
+    for label, phis in f.phis.items():
+        for phi in phis:
+            for pred, arg in phi.srcs.items():
+                copies.setdefault((pred, label), []).append((phi.dst, arg))
+
+    append: dict[Label, list[tgt.Instr]] = {}
+    edge_labels: dict[tuple[Label, Label], Label] = {}
+    edge_blocks: dict[Label, list[tuple[Label, tgt.Block]]] = {}
+    for (source, target), edge_copies in copies.items():
+        moves = sequentialize(edge_copies)
+        if not moves:
+            continue
+        if len(cfg.neighbors_out(source)) == 1 and not ends_with_branch(f.body[source]):
+            append[source] = moves
+        else:
+            label = Label.fresh("phi")
+            edge_labels[(source, target)] = label
+            edge_blocks.setdefault(target, []).append((label, IList(moves) + ilist(tgt.Jump(target))))
+
+    out: tgt.Blocks = {}
+    for label, block in f.body.items():
+        for label2, block2 in edge_blocks.get(label, []):
+            out[label2] = block2
+        if label in append:
+            block = block[:-1] + IList(append[label]) + block[-1:]
+        out[label] = retarget(block, label, edge_labels)
+    return tgt.Function(f.entry_label, f.start_label, f.end_label, out)
+
+def sequentialize(copies: list[tuple[Id, src.ArgRead]]) -> list[tgt.Instr]:
+    """
+    Orders the simultaneous copies `dst <- src` with distinct destinations
+    into a sequence of moves. A copy is emitted once no other pending copy
+    reads its destination. If only cycles of copies are left, the value of
+    one destination is saved in a temporary, which its reader reads instead.
+    """
+    pending = {dst: src_ for dst, src_ in copies if dst != src_}
+    readers: dict[src.ArgRead, list[Id]] = {}
+    for dst, src_ in pending.items():
+        readers.setdefault(src_, []).append(dst)
+    num_readers = {x: len(dsts) for x, dsts in readers.items()}
+    ready = [dst for dst in reversed(pending) if dst not in num_readers]
+
+    out: list[tgt.Instr] = []
+    while pending:
+        while ready:
+            dst = ready.pop()
+            src_ = pending.pop(dst)
+            out.append(tgt.Move(dst, src_))
+            if src_ in pending:
+                num_readers[src_] -= 1
+                if num_readers[src_] == 0:
+                    ready.append(src_)
+        if pending:
+            dst = next(iter(pending))
+            tmp = fresh_piece(dst)
+            out.append(tgt.Move(tmp, dst))
+            reader = next(y for y in readers[dst] if pending.get(y) == dst)
+            pending[reader] = tmp
+            ready.append(dst)
+    return out
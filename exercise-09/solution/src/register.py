@@ -2,8 +2,10 @@ from dataclasses import dataclass
 from typing import Literal
 
 from util.immutable_list import ilist
+from util.interning import interned
 
-@dataclass(frozen=True)
+@interned
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Register:
     type Name = Literal[
         "zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "fp", "s1", "a0", "a1",
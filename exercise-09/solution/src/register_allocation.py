@@ -1,6 +1,7 @@
+from bisect import bisect_left
+from heapq import heapify, heappop, heappush
 from itertools import count
-from functools import reduce
-from collections import deque
+from typing import Optional
 
 from register import *
 from label import Label
@@ -8,33 +9,79 @@ from identifier import Id
 import ast_9_sel as src
 import ast_10_mem as tgt
 from util.undirected_graph import UndirectedGraph
+from util.interference_graph import InterferenceGraph
 from util.priority_queue import PriorityQueue
 from util.immutable_list import ilist
 from util.directed_graph import DirectedGraph
+from dataflow_analysis import (
+    Node, read_set, write_set, FunLiveness, liveness_analysis,
+    entry_label, node_key,
+)
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 # API
 
+# The home of a variable is a register, a stack slot, or the constant or
+# label it is always equal to, if it is rematerialized instead of spilled.
+type Home = Register | tgt.Offset | tgt.Const | Label
+
 @dataclass
 class RegAllocOutput:
-    env: dict[Id, Register | tgt.Offset]
+    env: dict[Id, Home]
     offset_sp: int
-    callee_saved: set[Register]
-
-def allocate_registers(p: src.Program) -> dict[Label, RegAllocOutput]:
+    callee_saved: list[Register]
+    # number of move instructions whose source and destination were coalesced
+    coalesced_moves: int = 0
+    # the estimated cost of spilling each variable (see `spill_costs`)
+    spill_costs: dict[Id, int] = field(default_factory=lambda: {})
+
+def allocate_registers(
+    p: src.Program, coalesce: bool = False, linear_scan: bool = False, biased: bool = False
+) -> dict[Label, RegAllocOutput]:
+    """
+    Allocates the registers of each function. With `biased`, a variable
+    gets the color of a move related variable where possible, which makes
+    the copies of split live ranges free (see `split_live_ranges`).
+    """
     outputs = {}
     for f in p:
         is_main = f.entry_label == Label("main")
-        outputs[f.entry_label] = allocate_registers_for_body(is_main, f.body)
+        if linear_scan:
+            outputs[f.entry_label] = allocate_registers_linear_scan(is_main, f.body, biased)
+        else:
+            outputs[f.entry_label] = allocate_registers_for_body(is_main, f.body, coalesce, biased)
     return outputs
 
-def allocate_registers_for_body(is_main: bool, blocks: src.Blocks) -> RegAllocOutput:
+def allocate_registers_for_body(
+    is_main: bool, blocks: src.Blocks, coalesce: bool = False, biased: bool = False
+) -> RegAllocOutput:
     cfg = control_flow_graph(blocks)
     liveness = liveness_analysis(blocks, cfg)
     interference = build_interference_graph(blocks, liveness)
-    coloring = color_graph(interference)
-    return assign_locations(is_main, coloring)
+    remat = rematerializable(blocks)
+    costs = spill_costs(blocks, cfg, remat)
+    moves = build_move_graph(blocks) if coalesce or biased else None
+    if not coalesce:
+        coloring = color_graph(interference, costs, moves)
+        return assign_locations(is_main, coloring, costs, remat)
+    assert moves is not None
+    aliases = coalesce_moves(interference, moves)
+    coloring = color_coalesced_graph(interference, aliases, costs, moves if biased else None)
+    out = assign_locations(is_main, coloring, costs, remat)
+    out.coalesced_moves = count_coalesced_moves(blocks, aliases)
+    return out
+
+def allocate_registers_linear_scan(is_main: bool, blocks: src.Blocks, biased: bool = False) -> RegAllocOutput:
+    cfg = control_flow_graph(blocks)
+    liveness = liveness_analysis(blocks, cfg)
+    layout = linearize_blocks(blocks, cfg)
+    intervals, fixed = build_live_intervals(blocks, liveness, layout)
+    remat = rematerializable(blocks)
+    costs = spill_costs(blocks, cfg, remat)
+    moves = build_move_graph(blocks) if biased else None
+    coloring = linear_scan(intervals, fixed, costs, moves)
+    return assign_locations(is_main, coloring, costs, remat)
 
 # Implementation
 
@@ -51,77 +98,13 @@ REGISTER_TO_COLOR = {r: i - 8 for i, r in enumerate(REG_ORDER)}
 COLOR_TO_REGISTER = {v: k for k, v in REGISTER_TO_COLOR.items()}
 
 type Color = int  # colors are represented by natural numbers
-type Node = Id | Register  # nodes in the inference graph
 
-# the read set of an argument in read position
-def read_set_src_arg(arg: src.ArgRead) -> set[Node]:
-    match arg:
-        case Register(_):
-            return {arg}
-        case Id(_):
-            return {arg}
-        case src.Offset(arg2, _):
-            return read_set_src_arg(arg2)
-        case Label(_) | src.Const(_, _):
-            return set()
-
-# the read set of an argument in write position
-def read_set_dst_arg(arg: src.ArgWrite) -> set[Node]:
-    match arg:
-        case Register(_):
-            return set()
-        case Id(_):
-            return set()
-        case src.Offset(arg2, _):
-            return read_set_src_arg(arg2)
-
-# the write set of an argument in read position is always empty
-def write_set_src_arg(arg: src.ArgRead) -> set[Node]:
-    return set()
-
-# the write set of an argument in write position
-def write_set_dst_arg(arg: src.ArgWrite) -> set[Node]:
-    match arg:
-        case Register(_):
-            return {arg}
-        case Id(_):
-            return {arg}
-        case src.Offset(_, _):
-            return set()
-
-# the read set of an instruction
-def read_set(i: src.Instr) -> set[Node]:
-    match i:
-        case src.Move(rd, rs):
-            return read_set_dst_arg(rd) | read_set_src_arg(rs)
-        case src.Call(rs, arity, _):
-            fun_arg_regs: set[Node] = set(FUNCTION_ARG_REGISTERS[:arity])
-            return fun_arg_regs | read_set_src_arg(rs)
-        case src.Instr2(_, rd, rs1, rs2):
-            return read_set_dst_arg(rd) | read_set_src_arg(rs1) | read_set_src_arg(rs2)
-        case src.Branch(_, rs1, rs2, rs3):
-            return read_set_src_arg(rs1) | read_set_src_arg(rs2) | read_set_src_arg(rs3)
-        case src.Jump(rs):
-            return read_set_src_arg(rs)
-
-# the write set of an instruction
-def write_set(i: src.Instr) -> set[Node]:
-    match i:
-        case src.Move(rd, rs):
-            return write_set_dst_arg(rd) | write_set_src_arg(rs)
-        case src.Call(rs, _, _):
-            call_svd_regs: set[Node] = set(CALLER_SAVED_REGISTERS) 
-            return call_svd_regs | write_set_src_arg(rs)
-        case src.Instr2(_, rd, rs1, rs2):
-            return write_set_dst_arg(rd) | write_set_src_arg(rs1) | write_set_src_arg(rs2)
-        case src.Branch(_, rs1, rs2, rs3):
-            return write_set_src_arg(rs1) | write_set_src_arg(rs2) | write_set_src_arg(rs3)
-        case src.Jump(rs):
-            return write_set_src_arg(rs)
+type Graph = UndirectedGraph[Node] | InterferenceGraph[Node]
 
 def control_flow_graph(p: src.Blocks) -> DirectedGraph[Label]:
     cfg: DirectedGraph[Label] = DirectedGraph()
     for source, block in p.items():
+        cfg.add_node(source)
         match block:
             case [*_, src.Jump(target)]:
                 cfg.add_edge(source, target)
@@ -134,79 +117,387 @@ def control_flow_graph(p: src.Blocks) -> DirectedGraph[Label]:
                 pass
     return cfg
 
-@dataclass
-class BlockLiveness:
-    block_in: set[Node]
-    instr_out: list[set[Node]]
-
-# Liveness information for the blocks inside a function definitions
-type FunLiveness = dict[Label, BlockLiveness]
-
-def debug_print_liveness(liveness: FunLiveness, p: src.Blocks) -> None:
-    print("–– LIVENESS ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-    for label, block in p.items():
-        print(f"{label}:")
-        print(f"\t  {liveness[label].block_in}")
-        for i, live in zip(block, liveness[label].instr_out):
-            print(f"{src.pretty_instr(i)}")
-            print(f"\t  {live}")
-    print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-
-def liveness_analysis(p: src.Blocks, cfg: DirectedGraph[Label]) -> FunLiveness:
-    liveness = {lab: BlockLiveness(set(), [set() for _ in b]) for lab, b in p.items()}
-    liveness[Label("exit")] = BlockLiveness(set(), [])
-    queue = deque(cfg.nodes())
-    while queue:
-        label = queue.pop()
-        prev_live_block_in = liveness[label].block_in.copy()
-        cur_live_out: set[Node] = reduce(
-            set.union, (liveness[ln].block_in for ln in cfg.neighbors_out(label)), set()
-        )
-        if label in p:
-            for i, instr in reversed(list(enumerate(p[label]))):
-                liveness[label].instr_out[i] = cur_live_out
-                cur_live_out = (cur_live_out - write_set(instr)) | read_set(instr)
-        if cur_live_out != prev_live_block_in:
-            liveness[label].block_in = cur_live_out
-            queue.extend(cfg.neighbors_in(label))
-    return liveness
-
-def build_interference_graph(p: src.Blocks, liveness: FunLiveness) -> UndirectedGraph[Node]:
-    graph: UndirectedGraph[Node] = UndirectedGraph()
+# Spill Costs
+#
+# Each use and definition of a variable is weighted by 10^d, where d is
+# the loop depth of its block, i.e. the number of natural loops containing
+# the block. The spill cost of a variable is the sum of these weights and
+# estimates how many loads and stores spilling the variable would cost.
+
+LOOP_WEIGHT = 10
+
+def loop_depths(p: src.Blocks, cfg: DirectedGraph[Label]) -> dict[Label, int]:
+    depths = {label: 0 for label in p}
+    for body in cfg.natural_loops(entry_label(p)).values():
+        for label in body:
+            if label in depths:
+                depths[label] += 1
+    return depths
+
+def spill_costs(
+    p: src.Blocks, cfg: DirectedGraph[Label], remat: dict[Id, src.Const | Label]
+) -> dict[Id, int]:
+    costs: dict[Id, int] = {}
+    for label, depth in loop_depths(p, cfg).items():
+        weight = LOOP_WEIGHT ** depth
+        for instr in p[label]:
+            for x in read_set(instr) | write_set(instr):
+                if type(x) is Id and x not in remat:
+                    costs[x] = costs.get(x, 0) + weight
+    for x in remat:
+        costs[x] = 0
+    return costs
+
+# Rematerialization
+#
+# A variable which is defined exactly once by moving a constant or a label
+# into it always has the same value. Instead of spilling such a variable to
+# the stack, each use is replaced by the value itself, which is loaded with
+# `li` or `la` by `patch_instructions`, and the definition is removed by
+# `assign_homes`. Spilling these variables is thus for free.
+
+def instr_args(i: src.Instr) -> list[src.ArgRead]:
+    match i:
+        case src.Move(dst, src_):
+            return [dst, src_]
+        case src.Call(target, _, _):
+            return [target]
+        case src.Instr2(_, dst, src1, src2):
+            return [dst, src1, src2]
+        case src.Branch(_, src1, src2, _):
+            return [src1, src2]
+        case src.Jump(_):
+            return []
+
+def rematerializable(p: src.Blocks) -> dict[Id, src.Const | Label]:
+    values: dict[Id, src.Const | Label] = {}
+    excluded: set[Id] = set()
+    for block in p.values():
+        for instr in block:
+            match instr:
+                case src.Move(Id(_) as x, src.Const(_, _) | Label(_) as v) if x not in values:
+                    values[x] = v
+                case _:
+                    excluded |= {x for x in write_set(instr) if type(x) is Id}
+            # Offsets relative to constants can not be expressed.
+            for arg in instr_args(instr):
+                match arg:
+                    case src.Offset(Id(_) as x, _):
+                        if type(values.get(x)) is src.Const:
+                            excluded.add(x)
+                    case _:
+                        pass
+    return {x: v for x, v in values.items() if x not in excluded}
+
+def build_interference_graph(p: src.Blocks, liveness: FunLiveness) -> InterferenceGraph[Node]:
+    # The graph shares the numbering of the liveness analysis, such that
+    # the live variables can be added as neighbors as bit vectors.
+    numbering = liveness[entry_label(p)].numbering
+    graph: InterferenceGraph[Node] = InterferenceGraph(numbering)
 
     for label, block in p.items():
-        for i, instr in enumerate(block):
-            r = read_set(instr)
+        for k, live_out in liveness[label].iter_instr_out_bits():
+            instr = block[k]
             w = write_set(instr)
 
-            for x in r | w:
-                graph.add_node(x)
-
-            live_out = liveness[label].instr_out[i]
+            graph.add_nodes(numbering.bits(read_set(instr)) | numbering.bits(w))
 
             match instr:
-                case src.Call(Label(l), _) if l not in ["print_int64", "input_int64"]:
-                    # Cause all live variables to be spilled during
-                    # garbage collection by adding interference with
-                    # all registers. User functions are also included
-                    # because they may trigger garbage collection.
-                    for x in live_out:
-                        for ro in REG_ORDER:
-                            graph.add_edge(x, ro)
+                # Variables which are live across a call interfere with
+                # the caller-saved registers written by the call, so they
+                # are placed in callee-saved registers or on the stack.
+                # Callee-saved registers are pushed to the stack during
+                # garbage collection (see `add_prelude_and_conclusion`).
                 case src.Move(d, s):
-                    for x in live_out:
-                        if x != d and x != s:
-                            for y in w:
-                                graph.add_edge(y, x)
+                    live = live_out
+                    for x in (d, s):
+                        if type(x) is Id or type(x) is Register:
+                            live &= ~numbering.bit(x)
+                    for y in w:
+                        graph.add_edges(y, live)
                 case _:
                     for d in w:
-                        for x in live_out:
-                            if x != d:
-                                graph.add_edge(d, x)
+                        graph.add_edges(d, live_out & ~numbering.bit(d))
+
+    return graph
+
+# Move Coalescing
+#
+# Two nodes connected by a move instruction can share the same home if
+# they do not interfere, in which case the move becomes `mv x, x` and is
+# removed by the peephole optimizations. Merging nodes can however make
+# the graph harder to color, so we only merge conservatively:
+#
+# - Briggs: two variables are merged, if the merged node has fewer
+#   than K neighbors of significant degree, i.e. of degree >= K.
+# - George: a variable is merged into a register, if each neighbor of
+#   the variable already interferes with the register or has
+#   insignificant degree.
+#
+# where K is the number of registers available for allocation.
+
+NUM_COLORS = len([c for c in COLOR_TO_REGISTER if c >= 0])
+
+def is_move_related(x: src.ArgRead) -> bool:
+    match x:
+        case Id(_):
+            return True
+        case Register(_):
+            return REGISTER_TO_COLOR[x] >= 0
+        case _:
+            return False
 
+def build_move_graph(p: src.Blocks) -> UndirectedGraph[Node]:
+    graph: UndirectedGraph[Node] = UndirectedGraph()
+    for block in p.values():
+        for instr in block:
+            match instr:
+                case src.Move(Id(_) | Register(_) as d, Id(_) | Register(_) as s):
+                    if d != s and is_move_related(d) and is_move_related(s) \
+                            and (type(d) is Id or type(s) is Id):
+                        graph.add_edge(d, s)
     return graph
 
-def color_graph(graph: UndirectedGraph[Node]) -> dict[Id, Color]:
+def coalesce_moves(interference: Graph, moves: UndirectedGraph[Node]) -> dict[Id, Node]:
+    """
+    Merges move related nodes which do not interfere and satisfy the
+    Briggs or George criterion, until no more nodes can be merged.
+    Returns the node each merged variable has been merged into.
+    """
+    adj: dict[Node, set[Node]] = {n: set(interference.neighbors(n)) for n in interference.nodes()}
+    aliases: dict[Id, Node] = {}
+
+    def find(x: Node) -> Node:
+        while type(x) is Id and x in aliases:
+            x = aliases[x]
+        return x
+
+    def significant(x: Node) -> bool:
+        return type(x) is Register or len(adj[x]) >= NUM_COLORS
+
+    def briggs(x: Node, y: Node) -> bool:
+        return sum(1 for t in adj[x] | adj[y] if significant(t)) < NUM_COLORS
+
+    def george(x: Node, r: Node) -> bool:
+        return all(type(t) is Register or t in adj[r] or not significant(t) for t in adj[x])
+
+    pairs = [(x, y) for x in moves.nodes() for y in moves.neighbors(x) if type(x) is Id]
+
+    changed = True
+    while changed:
+        changed = False
+        for x, y in pairs:
+            a, b = find(x), find(y)
+            if a == b or type(a) is not Id or b in adj[a]:
+                continue
+            if not (george(a, b) if type(b) is Register else briggs(a, b)):
+                continue
+            aliases[a] = b
+            for t in adj.pop(a):
+                adj[t].discard(a)
+                adj[t].add(b)
+                adj[b].add(t)
+            changed = True
+
+    return {x: find(x) for x in aliases}
+
+def color_coalesced_graph(
+    interference: Graph,
+    aliases: dict[Id, Node],
+    costs: dict[Id, int],
+    moves: Optional[UndirectedGraph[Node]] = None,
+) -> dict[Id, Color]:
+    """
+    Colors the interference graph where the merged nodes are replaced by
+    the node they were merged into, and gives each merged variable the
+    color of that node. The coloring is biased by the `moves` which were
+    not coalesced, if given.
+    """
+    merged_costs = dict(costs)
+    for x, y in aliases.items():
+        if type(y) is Id:
+            merged_costs[y] = merged_costs.get(y, 0) + merged_costs.pop(x, 0)
+
+    graph: UndirectedGraph[Node] = UndirectedGraph()
+    for u in interference.nodes():
+        u2 = aliases.get(u, u) if isinstance(u, Id) else u
+        graph.add_node(u2)
+        for v in interference.neighbors(u):
+            v2 = aliases.get(v, v) if isinstance(v, Id) else v
+            graph.add_edge(u2, v2)
+
+    merged_moves: Optional[UndirectedGraph[Node]] = None
+    if moves is not None:
+        merged_moves = UndirectedGraph()
+        for u in moves.nodes():
+            u2 = aliases.get(u, u) if isinstance(u, Id) else u
+            for v in moves.neighbors(u):
+                v2 = aliases.get(v, v) if isinstance(v, Id) else v
+                if u2 != v2:
+                    merged_moves.add_edge(u2, v2)
+
+    coloring = color_graph(graph, merged_costs, merged_moves)
+    for x, y in aliases.items():
+        match y:
+            case Register(_):
+                coloring[x] = REGISTER_TO_COLOR[y]
+            case Id(_):
+                coloring[x] = coloring[y]
+    return coloring
+
+def count_coalesced_moves(p: src.Blocks, aliases: dict[Id, Node]) -> int:
+    num_moves = 0
+    for block in p.values():
+        for instr in block:
+            match instr:
+                case src.Move(Id(_) | Register(_) as d, Id(_) | Register(_) as s) if d != s:
+                    d2 = aliases.get(d, d) if type(d) is Id else d
+                    s2 = aliases.get(s, s) if type(s) is Id else s
+                    if d2 == s2:
+                        num_moves += 1
+    return num_moves
+
+# Linear Scan
+#
+# A faster alternative to graph coloring for large functions, following
+# Poletto and Sarkar's "Linear Scan Register Allocation". The blocks are
+# laid out in reverse postorder and each variable gets a live interval
+# from the first to the last point of the layout where it is live. The
+# intervals are then allocated in order of their start, so no interference
+# graph needs to be built. Intervals ignore the holes in live ranges,
+# which makes the allocation conservative but may cause more spills.
+#
+# The point `2 * k` is right before and the point `2 * k + 1` right after
+# the `k`-th instruction of the layout. Registers written by instructions
+# (e.g. the caller-saved registers by calls) are not intervals but are
+# recorded as the sorted list of points where they are occupied.
+
+@dataclass
+class LiveInterval:
+    var: Id
+    start: int
+    end: int
+
+def linearize_blocks(p: src.Blocks, cfg: DirectedGraph[Label]) -> list[Label]:
+    layout = [l for l in cfg.iter_reverse_postorder([entry_label(p)]) if l in p]
+    reachable = set(layout)
+    return layout + [l for l in p if l not in reachable]
+
+def build_live_intervals(
+    p: src.Blocks, liveness: FunLiveness, layout: list[Label]
+) -> tuple[list[LiveInterval], dict[Register, list[int]]]:
+    """
+    Returns the live intervals of all variables ordered by their start,
+    and the points at which each allocatable register is occupied.
+    """
+    intervals: dict[Id, LiveInterval] = {}
+    fixed: dict[Register, list[int]] = {
+        r: [] for r, color in REGISTER_TO_COLOR.items() if color >= 0
+    }
+
+    # The points are visited in increasing order, so extending the end of
+    # an interval and appending to the lists of registers keeps them sorted.
+    def occupy(x: Node, point: int) -> None:
+        match x:
+            case Id(_):
+                if x in intervals:
+                    intervals[x].end = point
+                else:
+                    intervals[x] = LiveInterval(x, point, point)
+            case Register(_):
+                if x in fixed and (not fixed[x] or fixed[x][-1] != point):
+                    fixed[x].append(point)
+
+    k = 0
+    for label in layout:
+        block_liveness = liveness[label]
+        for x in block_liveness.block_in:
+            occupy(x, 2 * k)
+        for instr, live_out in zip(p[label], block_liveness.instr_out):
+            for x in read_set(instr):
+                occupy(x, 2 * k)
+            for x in write_set(instr) | live_out:
+                occupy(x, 2 * k + 1)
+            k += 1
+
+    return sorted(intervals.values(), key=lambda i: (i.start, node_key(i.var))), fixed
+
+def linear_scan(
+    intervals: list[LiveInterval],
+    fixed: dict[Register, list[int]],
+    costs: dict[Id, int],
+    moves: Optional[UndirectedGraph[Node]] = None,
+) -> dict[Id, Color]:
+    colors: dict[Id, Color] = {}
+    # a heap of the active intervals by end, and by the order in which
+    # they became active for the same end
+    active: list[tuple[int, int, LiveInterval]] = []
+    spilled: list[LiveInterval] = []
+
+    def is_free(color: Color, interval: LiveInterval) -> bool:
+        points = fixed[COLOR_TO_REGISTER[color]]
+        i = bisect_left(points, interval.start)
+        return i == len(points) or points[i] > interval.end
+
+    for n, interval in enumerate(intervals):
+        while active and active[0][0] < interval.start:
+            heappop(active)
+
+        used = {colors[a.var] for _, _, a in active}
+        candidates = list(range(NUM_COLORS))
+        if moves is not None:
+            candidates = preferred_colors(interval.var, moves, colors) + candidates
+        color = next(
+            (c for c in candidates if c < NUM_COLORS and c not in used and is_free(c, interval)),
+            None,
+        )
+        if color is None:
+            # Spill the cheapest interval among the current one and the
+            # active ones whose register can be used for the current one.
+            # Of equally cheap intervals the one which ends last is spilled.
+            entry = min(
+                (e for e in active if is_free(colors[e[2].var], interval)),
+                key=lambda e: (costs.get(e[2].var, 0), -e[0], e[1]),
+                default=None,
+            )
+            if entry is None or (costs.get(entry[2].var, 0), -entry[0]) \
+                    >= (costs.get(interval.var, 0), -interval.end):
+                spilled.append(interval)
+                continue
+            victim = entry[2]
+            color = colors.pop(victim.var)
+            # spilling is rare, so the victim is removed by rebuilding the heap
+            active.remove(entry)
+            heapify(active)
+            spilled.append(victim)
+
+        colors[interval.var] = color
+        heappush(active, (interval.end, n, interval))
+
+    # Spilled variables with disjoint intervals share a stack slot, where
+    # the lowest free slot is reused first.
+    spilled.sort(key=lambda i: i.start)
+    active.clear()
+    free_slots: list[Color] = []  # a heap
+    next_slot = NUM_COLORS
+    for n, interval in enumerate(spilled):
+        while active and active[0][0] < interval.start:
+            heappush(free_slots, colors[heappop(active)[2].var])
+        if free_slots:
+            color = heappop(free_slots)
+        else:
+            color = next_slot
+            next_slot += 1
+        colors[interval.var] = color
+        heappush(active, (interval.end, n, interval))
+
+    return colors
+
+def color_graph(
+    graph: Graph,
+    costs: Optional[dict[Id, int]] = None,
+    moves: Optional[UndirectedGraph[Node]] = None,
+) -> dict[Id, Color]:
     colors: dict[Id, Color] = {}
     saturation: dict[Id, set[Color]] = {n: set() for n in graph.nodes() if type(n) is Id}
     queue: PriorityQueue[Id] = PriorityQueue()
@@ -217,7 +508,7 @@ def color_graph(graph: UndirectedGraph[Node]) -> dict[Id, Color]:
                 for x in graph.neighbors(n):
                     match x:
                         case Register(_):
-                            saturation[n] |= {REGISTER_TO_COLOR[x]}
+                            saturation[n].add(REGISTER_TO_COLOR[x])
                         case _:
                             pass
                 queue.push(n, len(saturation[n]))
@@ -226,30 +517,105 @@ def color_graph(graph: UndirectedGraph[Node]) -> dict[Id, Color]:
         head = queue.pop()
         sat = saturation[head]
         color = next(x for x in count() if x not in sat)
+        if moves is not None:
+            # Biased coloring: reuse the color of a move related node, such
+            # that the move becomes redundant, unless that would spill.
+            for c in preferred_colors(head, moves, colors):
+                if c not in sat and (c < NUM_COLORS or color >= NUM_COLORS):
+                    color = c
+                    break
 
         for x in graph.neighbors(head):
             match x:
                 case src.Id(_):
-                    if color not in saturation[x]:
+                    # Already colored nodes have left the queue, so
+                    # their saturation is no longer relevant.
+                    if x in queue and color not in saturation[x]:
                         queue.increment(x)
-                        saturation[x] |= {color}
+                        saturation[x].add(color)
 
         colors[head] = color
 
+    if costs is not None:
+        recolor_by_spill_cost(graph, colors, costs)
+
     return colors
 
-def assign_locations(is_main: bool, coloring: dict[Id, Color]) -> RegAllocOutput:
-    env: dict[Id, Register | tgt.Offset] = {}
+def preferred_colors(x: Id, moves: UndirectedGraph[Node], colors: dict[Id, Color]) -> list[Color]:
+    """
+    Returns the colors of the already colored nodes which are move related to `x`.
+    """
+    out: list[Color] = []
+    if not moves.has_node(x):
+        return out
+    for y in moves.neighbors(x):
+        match y:
+            case Register(_):
+                out.append(REGISTER_TO_COLOR[y])
+            case Id(_) if y in colors:
+                out.append(colors[y])
+            case _:
+                pass
+    return out
+
+def recolor_by_spill_cost(graph: Graph, colors: dict[Id, Color], costs: dict[Id, int]) -> None:
+    """
+    DSatur decides which variables are spilled only by the coloring order.
+    Afterwards, spilled variables are moved into a register, if the register
+    is free among their neighbors, or if it is taken by neighbors with lower
+    spill cost in total, which are spilled instead. There can be several such
+    neighbors, as biased coloring gives move related variables the same
+    register. The spilled variables are visited in order of decreasing spill
+    cost.
+    """
+    def color_of(x: Node) -> Color:
+        return REGISTER_TO_COLOR[x] if isinstance(x, Register) else colors[x]
+
+    spilled = [x for x, c in colors.items() if c >= NUM_COLORS]
+    spilled.sort(key=lambda x: costs.get(x, 0), reverse=True)
+    for x in spilled:
+        owners: dict[Color, list[Node]] = {c: [] for c in range(NUM_COLORS)}
+        for y in graph.neighbors(x):
+            c = color_of(y)
+            if c in owners:
+                owners[c].append(y)
+
+        free = [c for c, ys in owners.items() if not ys]
+        if free:
+            colors[x] = free[0]
+            continue
+
+        candidates = [
+            (sum(costs.get(y, 0) for y in ys), c, ys)
+            for c, ys in owners.items()
+            if all(type(y) is Id for y in ys)
+        ]
+        candidates = [v for v in candidates if v[0] < costs.get(x, 0)]
+        if not candidates:
+            continue
+        _, color, victims = min(candidates, key=lambda v: v[0])
+        colors[x] = color
+        for victim in victims:
+            used = {color_of(z) for z in graph.neighbors(victim)}
+            colors[victim] = next(c for c in count(NUM_COLORS) if c not in used)
+
+def assign_locations(
+    is_main: bool,
+    coloring: dict[Id, Color],
+    costs: Optional[dict[Id, int]] = None,
+    remat: Optional[dict[Id, src.Const | Label]] = None,
+) -> RegAllocOutput:
+    env: dict[Id, Home] = {}
     offset: int = 16
-    callee_saved: set[Register] = set()
+    # the callee saved registers are listed in the order of
+    # `CALLEE_SAVED_REGISTERS`, such that the prelude does not depend
+    # on the iteration order of sets
+    callee_saved: list[Register]
     if is_main:
-        callee_saved = set(CALLEE_SAVED_REGISTERS) - {fp, sp}
+        callee_saved = [r for r in CALLEE_SAVED_REGISTERS if r not in [fp, sp]]
     else:
-        for color in coloring.values():
-            if color in COLOR_TO_REGISTER:
-                reg = COLOR_TO_REGISTER[color]
-                if reg in CALLEE_SAVED_REGISTERS:
-                    callee_saved.add(reg)
+        used = {COLOR_TO_REGISTER[c] for c in coloring.values() if c in COLOR_TO_REGISTER}
+        callee_saved = [r for r in CALLEE_SAVED_REGISTERS if r in used]
 
     offset += len(callee_saved) * 8
 
@@ -258,6 +624,12 @@ def assign_locations(is_main: bool, coloring: dict[Id, Color]) -> RegAllocOutput
     for id, color in coloring.items():
         if color in COLOR_TO_REGISTER:
             env[id] = COLOR_TO_REGISTER[color]
+        elif remat is not None and id in remat:
+            match remat[id]:
+                case src.Const(value, size):
+                    env[id] = tgt.Const(value, size)
+                case Label(_) as l:
+                    env[id] = l
         else:
             if color in mapping:
                 env[id] = mapping[color]
@@ -267,4 +639,4 @@ def assign_locations(is_main: bool, coloring: dict[Id, Color]) -> RegAllocOutput
                 env[id] = off
                 mapping[color] = off
 
-    return RegAllocOutput(env, offset, callee_saved)
+    return RegAllocOutput(env, offset, callee_saved, spill_costs=costs or {})
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 
 from ast_1_python import *
 from util.immutable_list import IList
+from util.trampoline import Rec, trampoline
 
 from identifier import Id
 
@@ -30,9 +31,9 @@ def type_check(p: Program) -> None:
                     case SClass():
                         type_declare_class(ctx, s)
                     case DFun():
-                        type_check_def(ctx, s)
+                        trampoline(type_check_def(ctx, s))
                     case _:
-                        type_check_stmt(ctx, s)
+                        trampoline(type_check_stmt(ctx, s))
 
 def type_declare_def(ctx: TCtx, d: Decl) -> None:
     match d:
@@ -50,7 +51,7 @@ def type_declare_class(ctx: TCtx, c: SClass) -> None:
             ctx[name] = TCallable(IList([t for _, t in fields]), TClass(name))
             ctx[Id(f"{name}@type")] = TClass(name, fields)
 
-def type_check_def(ctx: TCtx, d: Decl) -> None:
+def type_check_def(ctx: TCtx, d: Decl) -> Rec[None]:
     match d:
         case DFun(funcvar, parameters, result_type, body):
             type_well_formed(ctx, result_type)
@@ -59,27 +60,27 @@ def type_check_def(ctx: TCtx, d: Decl) -> None:
             local_ctx = ctx.copy()
             local_ctx.update(parameters)
             local_ctx[Id('@ret')] = result_type
-            if not type_check_stmts(local_ctx, body):
+            if not (yield type_check_stmts(local_ctx, body)):
                 raise TypeError(f"Function {funcvar} does not return {result_type} on all paths")
 
-def type_check_stmts(ctx: TCtx, ss: IList[Stmt]) -> bool:
+def type_check_stmts(ctx: TCtx, ss: IList[Stmt]) -> Rec[bool]:
     for s in ss:
-        if type_check_stmt(ctx, s):
+        if (yield type_check_stmt(ctx, s)):
             return True
     return False
 
-def type_check_stmt(ctx: TCtx, s: Stmt) -> bool:
+def type_check_stmt(ctx: TCtx, s: Stmt) -> Rec[bool]:
     match s:
         case SExpr(e):
-            _ = type_check_expr(ctx, e)
+            _ = yield type_check_expr(ctx, e)
             return False
         case SPrint(e):
-            te = type_check_expr(ctx, e)
+            te = yield type_check_expr(ctx, e)
             check_type_equal(te, TInt(), e)
             return False
         case SAssign(x, t, e):
             if t is None:
-                te = type_check_expr(ctx, e)
+                te = yield type_check_expr(ctx, e)
                 if x in ctx:
                     check_type_equal(te, ctx[x], s)
                 else:
@@ -91,25 +92,25 @@ def type_check_stmt(ctx: TCtx, s: Stmt) -> bool:
                     check_type_equal(t, ctx[x], s)
                 else:
                     ctx[x] = t
-                check_expr(ctx, e, t)
+                yield check_expr(ctx, e, t)
                 return False
         case SIf(test, body, orelse):
-            ttest = type_check_expr(ctx, test)
+            ttest = yield type_check_expr(ctx, test)
             check_type_equal(ttest, TBool(), test)
             ctx_orelse = ctx.copy()
-            rt_body = type_check_stmts(ctx, body)
-            rt_else = type_check_stmts(ctx_orelse, orelse)
+            rt_body = yield type_check_stmts(ctx, body)
+            rt_else = yield type_check_stmts(ctx_orelse, orelse)
             check_ctx_equal(ctx, ctx_orelse, s)
             return rt_body and rt_else
         case SWhile(test, body):
-            ttest = type_check_expr(ctx, test)
+            ttest = yield type_check_expr(ctx, test)
             check_type_equal(ttest, TBool(), test)
-            type_check_stmts(ctx, body)
+            yield type_check_stmts(ctx, body)
             return False
         case SReturn(e):
             if Id('@ret') not in ctx:
                 raise TypeError(f"Unexpected return statement {s} on top-level of the program.")
-            check_expr(ctx, e, ctx[Id('@ret')])
+            yield check_expr(ctx, e, ctx[Id('@ret')])
             return True
         case SClass():
             # locally defined class are handled the same way as toplevel classes
@@ -118,7 +119,7 @@ def type_check_stmt(ctx: TCtx, s: Stmt) -> bool:
             return False
 
 # infer type of an expression        
-def type_check_expr(ctx: TCtx, e: Expr) -> Type:
+def type_check_expr(ctx: TCtx, e: Expr) -> Rec[Type]:
     match e:
         case EConst(x):
             match x:
@@ -137,7 +138,7 @@ def type_check_expr(ctx: TCtx, e: Expr) -> Type:
             else:
                 raise TypeError(f"Undefined variable {x}.")
         case EOp1(op, e):
-            te = type_check_expr(ctx, e)
+            te = yield type_check_expr(ctx, e)
             match op:
                 case "-":
                     check_type_equal(te, TInt(), e)
@@ -146,8 +147,8 @@ def type_check_expr(ctx: TCtx, e: Expr) -> Type:
                     check_type_equal(te, TBool(), e)
                     return TBool()
         case EOp2(e1, op, e2):
-            t1 = type_check_expr(ctx, e1)
-            t2 = type_check_expr(ctx, e2)
+            t1 = yield type_check_expr(ctx, e1)
+            t2 = yield type_check_expr(ctx, e2)
             if type(t1) is TTuple or type(t2) is TTuple:
                 match op:
                     case "is":
@@ -176,16 +177,19 @@ def type_check_expr(ctx: TCtx, e: Expr) -> Type:
         case EInput():
             return TInt()
         case EIf(test, body, orelse):
-            ttest = type_check_expr(ctx, test)
-            tbody = type_check_expr(ctx, body)
-            torelse = type_check_expr(ctx, orelse)
+            ttest = yield type_check_expr(ctx, test)
+            tbody = yield type_check_expr(ctx, body)
+            torelse = yield type_check_expr(ctx, orelse)
             check_type_equal(ttest, TBool(), test)
             check_type_equal(tbody, torelse, e)
             return tbody
         case ETuple(es):
-            return TTuple(IList([type_check_expr(ctx, e) for e in es]))
+            ts_out: list[Type] = []
+            for e in es:
+                ts_out.append((yield type_check_expr(ctx, e)))
+            return TTuple(IList(ts_out))
         case ETupleAccess(e, i):
-            t = type_check_expr(ctx, e)
+            t = yield type_check_expr(ctx, e)
             match t:
                 case TTuple(ts):
                     if 0 <= i < len(ts):
@@ -195,27 +199,27 @@ def type_check_expr(ctx: TCtx, e: Expr) -> Type:
                 case t:
                     raise TypeError(f"Tuple access on non-tuple type {t}.")
         case ETupleLen(e):
-            t = type_check_expr(ctx, e)
+            t = yield type_check_expr(ctx, e)
             match t:
                 case TTuple(ts):
                     return TInt()
                 case t:
                     raise TypeError(f"Tuple length used on non-tuple type {t}.")
         case ECall(f, es):
-            fty = type_check_expr(ctx, f)
+            fty = yield type_check_expr(ctx, f)
             match fty:
                 case TCallable(arg_tys, res_ty):
                     if len(es) != len(arg_tys):
                         raise TypeError(f"Calling function with wrong number of arguments {e}.")
                     for (e, ty) in zip(es, arg_tys):
-                        check_expr(ctx, e, ty)
+                        yield check_expr(ctx, e, ty)
                     return res_ty
                 case t:
                     raise TypeError(f"Calling non-function type {t}.")
         case ELambda():
             raise TypeError(f"Cannot synthesize type of {pretty_expr(e)}")
         case EField(f, field):
-            ety = type_check_expr(ctx, f)
+            ety = yield type_check_expr(ctx, f)
             match ety:
                 case TClass(name): 
                     ty = ctx[Id(f"{name}@type")]
@@ -234,7 +238,7 @@ def type_check_expr(ctx: TCtx, e: Expr) -> Type:
                     raise TypeError(f"Field access not allwed on non-dataclass {ety}.")
 
 # check expression against given type
-def check_expr(ctx: TCtx, e: Expr, ty: Type) -> None:
+def check_expr(ctx: TCtx, e: Expr, ty: Type) -> Rec[None]:
     match e:
         case ELambda(xs, body):
             match ty:
@@ -243,11 +247,11 @@ def check_expr(ctx: TCtx, e: Expr, ty: Type) -> None:
                         raise TypeError(f"Wrong number of arguments: {pretty_expr(e)} - {pretty_type(ty)}.")
                     new_ctx = ctx.copy()
                     new_ctx.update(zip(xs, arg_tys))
-                    check_expr(new_ctx, body, ret_ty)
+                    yield check_expr(new_ctx, body, ret_ty)
                 case _:
                     raise TypeError(f"Lambda cannot have type {pretty_type(ty)}.")
         case _:
-            te = type_check_expr(ctx, e)
+            te = yield type_check_expr(ctx, e)
             check_type_equal(te, ty, e)
 
 # Type Equality
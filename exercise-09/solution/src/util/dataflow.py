@@ -0,0 +1,320 @@
+# Bit-vector dataflow analysis.
+#
+# The facts of an analysis (e.g. the live variables, or the reaching
+# definitions) are numbered once by a `Numbering`, such that a set of
+# facts can be represented as a python `int`, where bit `i` is set iff
+# the fact with number `i` is in the set. Union, intersection and
+# difference of sets then become `|`, `&` and `& ~`, which are much
+# cheaper than the corresponding operations on python `set`s.
+#
+# A `DataflowProblem` describes a gen/kill analysis, i.e. an analysis
+# where the transfer function of each block has the form
+#
+#     f(x) = gen | (x & ~kill)
+#
+# and is solved by `solve_dataflow`, which iterates over the control
+# flow graph in reverse postorder (forward problems) or postorder
+# (backward problems) until a fixpoint is reached.
+
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Literal, Optional
+
+from util.directed_graph import DirectedGraph
+
+type Direction = Literal["forward", "backward"]
+type Meet = Literal["union", "intersection"]
+
+@dataclass
+class Numbering[T]:
+    """
+    Assigns consecutive natural numbers to items, such that sets of
+    items can be represented as bit vectors.
+    """
+
+    # maps items to their number
+    _numbers: dict[T, int] = field(default_factory=lambda: {})
+
+    # maps numbers to their item
+    _items: list[T] = field(default_factory=lambda: [])
+
+    def number(self, item: T) -> int:
+        """
+        Returns the number of the given item.
+        If the item has no number yet, then the next free number is assigned to it.
+        """
+        n = self._numbers.get(item)
+        if n is None:
+            n = len(self._items)
+            self._numbers[item] = n
+            self._items.append(item)
+        return n
+
+    def bit(self, item: T) -> int:
+        """
+        Returns the bit vector of the singleton set containing the given item.
+        """
+        return 1 << self.number(item)
+
+    def bits(self, items: Iterable[T], offset: int = 0) -> int:
+        """
+        Returns the bit vector of the set containing the given items.
+        If an offset is given, then bit `i` stands for the item with
+        number `offset + i`.
+        """
+        out = 0
+        for item in items:
+            out |= 1 << (self.number(item) - offset)
+        return out
+
+    def items(self, bits: int, offset: int = 0) -> list[T]:
+        """
+        Returns the items of the set represented by the given bit vector
+        ordered by their number. If an offset is given, then bit `i` stands
+        for the item with number `offset + i`.
+        """
+        out: list[T] = []
+        while bits:
+            low = bits & -bits
+            out.append(self._items[offset + low.bit_length() - 1])
+            bits ^= low
+        return out
+
+    def all(self) -> int:
+        """
+        Returns the bit vector of the set containing all numbered items.
+        """
+        return (1 << len(self._items)) - 1
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._numbers
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+# Sets of facts kept for every block usually contain only a few facts, whose
+# numbers are however as high as the number of facts of the whole function.
+# They are therefore stored packed, i.e. as the bit vector without its
+# trailing zeros together with their number.
+type Packed = tuple[int, int]
+
+def pack(bits: int) -> Packed:
+    if not bits:
+        return 0, 0
+    offset = (bits & -bits).bit_length() - 1
+    return bits >> offset, offset
+
+def unpack(packed: Packed) -> int:
+    bits, offset = packed
+    return bits << offset
+
+@dataclass
+class Transfer:
+    """
+    The transfer function `f(x) = gen | (x & ~kill)` of a block or an instruction.
+
+    Bit `i` of `gen` and `kill` stands for the fact with number `offset + i`.
+    An instruction only mentions a few facts, so storing its transfer function
+    relative to the lowest of them keeps it small, whereas a bit vector
+    starting at fact 0 grows with the number of facts of the whole function.
+    """
+
+    gen: int = 0
+    kill: int = 0
+    offset: int = 0
+
+    @staticmethod
+    def relative(gen: int, kill: int) -> 'Transfer':
+        """
+        Returns the transfer function with the given bit vectors, stored
+        relative to the lowest fact they contain.
+        """
+        _, offset = pack(gen | kill)
+        return Transfer(gen >> offset, kill >> offset, offset)
+
+    def apply(self, x: int) -> int:
+        if self.offset:
+            return (self.gen << self.offset) | (x & ~(self.kill << self.offset))
+        return self.gen | (x & ~self.kill)
+
+    def then(self, other: 'Transfer') -> 'Transfer':
+        """
+        Returns the transfer function that first applies `self` and then `other`.
+        """
+        gen1, kill1 = self.gen << self.offset, self.kill << self.offset
+        gen2, kill2 = other.gen << other.offset, other.kill << other.offset
+        return Transfer.relative(gen2 | (gen1 & ~kill2), kill1 | kill2)
+
+def compose(transfers: Iterable[Transfer], direction: Direction) -> Transfer:
+    """
+    Composes the transfer functions of the instructions of a block
+    into the transfer function of the whole block.
+    """
+    ts = list(transfers)
+    if direction == "backward":
+        ts.reverse()
+    out = Transfer()
+    for t in ts:
+        out = out.then(t)
+    return out
+
+@dataclass
+class DataflowProblem[L]:
+    """
+    A gen/kill dataflow problem over the blocks of a control flow graph.
+    """
+
+    direction: Direction
+    meet: Meet
+
+    # the transfer function of each block
+    transfers: dict[L, Transfer]
+
+    # the facts flowing into the entry block (forward problems), or
+    # out of blocks without successors (backward problems)
+    boundary: int = 0
+
+    # the set of all facts, which is the initial value of intersection problems
+    top: int = 0
+
+@dataclass
+class DataflowSolution[L]:
+    """
+    The facts that hold at the begin and at the end of each block, packed.
+    """
+
+    block_in: dict[L, Packed]
+    block_out: dict[L, Packed]
+
+def solve_dataflow[L](cfg: DirectedGraph[L], entry: L, problem: DataflowProblem[L]) -> DataflowSolution[L]:
+    """
+    Computes the least (union) or greatest (intersection) fixpoint of the problem.
+    Blocks that are not part of the `cfg` are treated as blocks without edges,
+    and edges to nodes that are not blocks of the problem are ignored.
+    """
+    labels = list(problem.transfers.keys())
+    order = [l for l in cfg.iter_postorder([entry] + labels) if l in problem.transfers]
+    order += [l for l in labels if not cfg.has_node(l)]
+    if problem.direction == "forward":
+        order.reverse()
+        sources = cfg.neighbors_in
+    else:
+        sources = cfg.neighbors_out
+
+    init = 0 if problem.meet == "union" else problem.top
+    # `before` are the facts flowing into the transfer function of a
+    # block, `after` the facts flowing out of it. For forward problems
+    # this is `block_in` and `block_out`, for backward problems the
+    # other way around.
+    before: dict[L, Packed] = {l: pack(init) for l in labels}
+    after: dict[L, Packed] = {l: pack(problem.transfers[l].apply(init)) for l in labels}
+
+    forward = problem.direction == "forward"
+    union = problem.meet == "union"
+    changed = True
+    while changed:
+        changed = False
+        for l in order:
+            # the meet of the facts of the sources, or the boundary if there are none
+            x: Optional[int] = None
+            if not (forward and l == entry):
+                for l2 in sources(l):
+                    packed = after.get(l2)
+                    if packed is None:
+                        continue
+                    y = unpack(packed)
+                    if x is None:
+                        x = y
+                    elif union:
+                        x |= y
+                    else:
+                        x &= y
+            if x is None:
+                x = problem.boundary
+            before[l] = pack(x)
+            packed = pack(problem.transfers[l].apply(x))
+            if packed != after[l]:
+                after[l] = packed
+                changed = True
+
+    if problem.direction == "forward":
+        return DataflowSolution(before, after)
+    else:
+        return DataflowSolution(after, before)
+
+@dataclass
+class BlockFacts[T]:
+    """
+    The solution of a dataflow problem for a single block.
+    The facts between the instructions of the block are only computed
+    when they are requested the first time.
+    """
+
+    numbering: Numbering[T]
+    direction: Direction
+
+    # the transfer function of each instruction in the block
+    transfers: list[Transfer]
+
+    block_in_packed: Packed
+    block_out_packed: Packed
+
+    _instr_sets: Optional[list[set[T]]] = None
+
+    def iter_instr_bits(self) -> Iterator[tuple[int, int]]:
+        """
+        Walks the block in the direction of the problem and yields the index
+        of each instruction together with the facts holding before it (forward
+        problems) or after it (backward problems).
+        The facts are computed on the fly and not stored, as a bit vector per
+        instruction takes memory quadratic in the length of the block.
+        """
+        if self.direction == "forward":
+            x = unpack(self.block_in_packed)
+            for i, t in enumerate(self.transfers):
+                yield i, x
+                x = t.apply(x)
+        else:
+            x = unpack(self.block_out_packed)
+            for i in range(len(self.transfers) - 1, -1, -1):
+                yield i, x
+                x = self.transfers[i].apply(x)
+
+    def instr_sets(self) -> list[set[T]]:
+        """
+        For forward problems, returns the facts holding before each
+        instruction. For backward problems, returns the facts holding
+        after each instruction.
+        """
+        if self._instr_sets is None:
+            out: list[set[T]] = [set() for _ in self.transfers]
+            for i, x in self.iter_instr_bits():
+                out[i] = set(self.numbering.items(x))
+            self._instr_sets = out
+        return self._instr_sets
+
+    @property
+    def block_in_bits(self) -> int:
+        return unpack(self.block_in_packed)
+
+    @property
+    def block_out_bits(self) -> int:
+        return unpack(self.block_out_packed)
+
+    @property
+    def block_in(self) -> set[T]:
+        bits, offset = self.block_in_packed
+        return set(self.numbering.items(bits, offset))
+
+    @property
+    def block_out(self) -> set[T]:
+        bits, offset = self.block_out_packed
+        return set(self.numbering.items(bits, offset))
+
+    def block_in_contains(self, item: T) -> bool:
+        """
+        Returns True if the item holds at the begin of the block, without
+        unpacking the facts of the block.
+        """
+        bits, offset = self.block_in_packed
+        n = self.numbering.number(item) - offset
+        return n >= 0 and bool(bits >> n & 1)
@@ -1,15 +1,24 @@
 from collections import deque
+from collections.abc import KeysView
 from dataclasses import dataclass, field
-from typing import Iterator
+from typing import Any, Iterable, Iterator, Optional
 
 @dataclass
 class DirectedGraph[T]:
     """
     A graph structure to represent a directed graph.
+
+    Successors and predecessors of each node are stored in dictionaries
+    with `None` values, which serve as insertion-ordered sets. This
+    makes iteration over the graph deterministic and allows handing
+    out read-only views instead of copies.
     """
 
-    # maps nodes to its set of neighbors
-    _adj_matrix: dict[T, set[T]] = field(default_factory=lambda: {})
+    # maps nodes to its set of successors
+    _adj_matrix: dict[T, dict[T, None]] = field(default_factory=lambda: {})
+
+    # maps nodes to its set of predecessors
+    _adj_matrix_in: dict[T, dict[T, None]] = field(default_factory=lambda: {})
 
     def add_node(self, node: T) -> None:
         """
@@ -18,7 +27,8 @@ class DirectedGraph[T]:
         """
         if node in self._adj_matrix:
             return
-        self._adj_matrix[node] = set()
+        self._adj_matrix[node] = {}
+        self._adj_matrix_in[node] = {}
 
     def has_node(self, node: T) -> bool:
         """
@@ -35,7 +45,8 @@ class DirectedGraph[T]:
             self.add_node(source)
         if not self.has_node(target):
             self.add_node(target)
-        self._adj_matrix[source] |= set([target])
+        self._adj_matrix[source][target] = None
+        self._adj_matrix_in[target][source] = None
 
     def has_edge(self, source: T, target: T) -> bool:
         """
@@ -43,46 +54,32 @@ class DirectedGraph[T]:
         """
         return self.has_node(source) and target in self._adj_matrix[source]
 
-    def nodes(self) -> set[T]:
+    def nodes(self) -> KeysView[T]:
         """
-        Returns the set of nodes present in the graph.
+        Returns a read-only view of the nodes present in the graph in insertion order.
         """
-        return set(self._adj_matrix.keys())
+        return self._adj_matrix.keys()
 
-    def neighbors_in(self, node: T) -> set[T]:
+    def neighbors_in(self, node: T) -> KeysView[T]:
         """
-        Returns the set of neighbors of the given node.
-        If the node is not present in the graph, then the empty set is returned.
+        Returns a read-only view of the predecessors of the given node.
+        If the node is not present in the graph, then an empty view is returned.
         """
-        ns: set[T] = set()
-        for src, tgts in self._adj_matrix.items():
-            if node in tgts:
-                ns.add(src)
-        return ns
+        return self._adj_matrix_in.get(node, _EMPTY).keys()
 
-    def neighbors_out(self, node: T) -> set[T]:
+    def neighbors_out(self, node: T) -> KeysView[T]:
         """
-        Returns the set of neighbors of the given node.
-        If the node is not present in the graph, then the empty set is returned.
+        Returns a read-only view of the successors of the given node.
+        If the node is not present in the graph, then an empty view is returned.
         """
-        if not self.has_node(node):
-            return set()
-        return self._adj_matrix[node].copy()
+        return self._adj_matrix.get(node, _EMPTY).keys()
 
     def transpose(self) -> 'DirectedGraph[T]':
         """
         Transposes the graph inplace in place.
         Returns `self` for better ergonomics with method chaining.
         """
-        adj_matrix: dict[T, set[T]] = {}
-        for source, targets in self._adj_matrix.items():
-            if source not in adj_matrix:
-                adj_matrix[source] = set()
-            for target in targets:
-                if target not in adj_matrix:
-                    adj_matrix[target] = set()
-                adj_matrix[target] |= {source}
-        self._adj_matrix = adj_matrix
+        self._adj_matrix, self._adj_matrix_in = self._adj_matrix_in, self._adj_matrix
         return self
 
     def iter_topological(self) -> Iterator[T]:
@@ -90,10 +87,7 @@ class DirectedGraph[T]:
         Iterates the nodes of the graph in topological order.
         Assumes the graph to be acyclic.
         """
-        in_degrees = {node: 0 for node in self.nodes()}
-        for targets in self._adj_matrix.values():
-            for target in targets:
-                in_degrees[target] += 1
+        in_degrees = {node: len(sources) for node, sources in self._adj_matrix_in.items()}
 
         queue: deque[T] = deque()
 
@@ -110,8 +104,214 @@ class DirectedGraph[T]:
                 if in_degrees[neighbor] == 0:
                     queue.append(neighbor)
 
+    def iter_postorder(self, roots: Optional[Iterable[T]] = None) -> Iterator[T]:
+        """
+        Iterates the nodes reachable from the given roots in depth-first postorder.
+        The roots are explored one after another, so nodes reachable from
+        an earlier root are visited before the ones reachable only from
+        later roots. If no roots are given, then all nodes are used as
+        roots in insertion order.
+        """
+        visited: set[T] = set()
+        for root in self.nodes() if roots is None else roots:
+            if root in visited or not self.has_node(root):
+                continue
+            visited.add(root)
+            stack = [(root, iter(self._adj_matrix[root]))]
+            while stack:
+                node, targets = stack[-1]
+                for target in targets:
+                    if target not in visited:
+                        visited.add(target)
+                        stack.append((target, iter(self._adj_matrix[target])))
+                        break
+                else:
+                    stack.pop()
+                    yield node
+
+    def iter_reverse_postorder(self, roots: Optional[Iterable[T]] = None) -> Iterator[T]:
+        """
+        Iterates the nodes reachable from the given roots in reverse
+        depth-first postorder, i.e. each node is visited before its
+        successors, except for the targets of back edges.
+        """
+        return reversed(list(self.iter_postorder(roots)))
+
+    def immediate_dominators(self, entry: T) -> dict[T, T]:
+        """
+        Returns the immediate dominator of each node reachable from the entry.
+        The entry is mapped to itself.
+
+        Uses the iterative algorithm of Cooper, Harvey and Kennedy from
+        "A Simple, Fast Dominance Algorithm".
+        """
+        order = list(self.iter_reverse_postorder([entry]))
+        number = {node: i for i, node in enumerate(order)}
+        idom: dict[T, T] = {entry: entry}
+
+        def intersect(a: T, b: T) -> T:
+            while a != b:
+                while number[a] > number[b]:
+                    a = idom[a]
+                while number[b] > number[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for node in order[1:]:
+                new_idom: Optional[T] = None
+                for pred in self.neighbors_in(node):
+                    if pred in idom:
+                        new_idom = pred if new_idom is None else intersect(pred, new_idom)
+                assert new_idom is not None, "reachable nodes have a processed predecessor"
+                if idom.get(node) != new_idom:
+                    idom[node] = new_idom
+                    changed = True
+        return idom
+
+    def dominators(self, entry: T) -> 'Dominators[T]':
+        """
+        Returns the dominator tree of the nodes reachable from the entry,
+        which answers dominance queries in constant time.
+        """
+        idom = self.immediate_dominators(entry)
+        children: dict[T, list[T]] = {node: [] for node in idom}
+        for node, parent in idom.items():
+            if node != entry:
+                children[parent].append(node)
+
+        # Numbers the tree in preorder, such that the nodes dominated by a
+        # node are numbered from its own number up to its `last` number.
+        number: dict[T, int] = {}
+        last: dict[T, int] = {}
+        stack = [(entry, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                last[node] = len(number) - 1
+                continue
+            number[node] = len(number)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children[node]))
+        return Dominators(entry, idom, children, number, last)
+
+    def dominance_frontiers(self, dominators: 'Dominators[T]') -> dict[T, dict[T, None]]:
+        """
+        Returns the dominance frontier of each node reachable from the entry,
+        i.e. the nodes where the dominance of the node ends: a node is in
+        the frontier of `n`, if `n` dominates one of its predecessors, but
+        does not strictly dominate the node itself.
+
+        Uses the algorithm of Cooper, Harvey and Kennedy, which walks up the
+        dominator tree from the predecessors of each join node.
+        """
+        idom = dominators.idom
+        frontiers: dict[T, dict[T, None]] = {node: {} for node in idom}
+        for node in idom:
+            preds = [pred for pred in self.neighbors_in(node) if pred in idom]
+            if len(preds) < 2:
+                continue
+            for pred in preds:
+                runner = pred
+                while runner != idom[node]:
+                    frontiers[runner][node] = None
+                    runner = idom[runner]
+        return frontiers
+
+    def natural_loops(self, entry: T) -> dict[T, set[T]]:
+        """
+        Returns the natural loops of the nodes reachable from the entry,
+        mapping the header of each loop to the nodes of the loop.
+        Loops of back edges with the same header are merged.
+        """
+        dominators = self.dominators(entry)
+        idom = dominators.idom
+
+        loops: dict[T, set[T]] = {}
+        for node in idom:
+            for header in self.neighbors_out(node):
+                if header not in idom or not dominators.dominates(header, node):
+                    continue
+                body = loops.setdefault(header, {header})
+                stack = [node]
+                while stack:
+                    n = stack.pop()
+                    if n not in body:
+                        body.add(n)
+                        stack.extend(m for m in self.neighbors_in(n) if m in idom)
+        return loops
+
+    def strongly_connected_components(self) -> list[list[T]]:
+        """
+        Returns the strongly connected components of the graph, such that
+        every component comes after the components reachable from it,
+        i.e. the targets of the edges come first.
+
+        Uses Kosaraju's algorithm: the second search walks the edges
+        backwards in reverse postorder of the first one.
+        """
+        components: list[list[T]] = []
+        assigned: set[T] = set()
+        for root in reversed(list(self.iter_postorder())):
+            if root in assigned:
+                continue
+            assigned.add(root)
+            component: list[T] = []
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                component.append(node)
+                for source in self.neighbors_in(node):
+                    if source not in assigned:
+                        assigned.add(source)
+                        stack.append(source)
+            components.append(component)
+        components.reverse()
+        return components
+
     def __str__(self) -> str:
         out: list[str] = []
         for node, nodes in self._adj_matrix.items():
             out += [f"{node}: {{{",".join([f"{node}" for node in nodes])}}}"]
         return "\n".join(out)
+
+@dataclass
+class Dominators[T]:
+    """
+    The dominator tree of the nodes reachable from an entry node.
+
+    The nodes are numbered in preorder of the tree, such that the nodes
+    dominated by a node are numbered from its own number up to its `last`
+    number. This makes `dominates` constant-time instead of walking up the
+    tree, which is quadratic for deeply nested code.
+    """
+
+    entry: T
+
+    # maps each node to its immediate dominator, and the entry to itself
+    idom: dict[T, T]
+
+    # maps each node to the nodes it immediately dominates
+    children: dict[T, list[T]]
+
+    number: dict[T, int]
+    last: dict[T, int]
+
+    def dominates(self, a: T, b: T) -> bool:
+        """
+        Returns True if every path from the entry to `b` passes through `a`.
+        Every node dominates itself.
+        """
+        return self.number[a] <= self.number[b] <= self.last[a]
+
+    def preorder(self) -> list[T]:
+        """
+        Returns the nodes in preorder of the dominator tree, i.e. each
+        node comes before the nodes it dominates.
+        """
+        return sorted(self.number, key=self.number.__getitem__)
+
+# the neighbors of the nodes which are not in the graph, which is never modified
+_EMPTY: dict[Any, None] = {}
@@ -17,10 +17,21 @@
 # This is very useful when working with union types, as you can use
 # for example an `IList[int]` also at places where an
 # `IList[int | bool]` is expected.
+#
+# Concatenating immutable lists with `+` copies both lists, so building a
+# list of n elements with `xs += ilist(x)` in a loop takes O(n²) time.
+# Loops which build long lists, e.g. the instructions of a basic block,
+# should append to an `IListBuilder` instead, which is frozen into an
+# `IList` without copying:
+#
+#     out = IListBuilder[int]()
+#     for x in xs:
+#         out += ilist(x, x)
+#     return out.build()
 
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
 from functools import total_ordering
-from typing import TypeVar, overload, Optional
+from typing import Any, TypeVar, overload, Optional
 
 T = TypeVar("T", covariant=True)
 U = TypeVar("U", covariant=True)
@@ -28,7 +39,11 @@ U = TypeVar("U", covariant=True)
 
 @total_ordering
 class IList(Sequence[T]):
-    __slots__ = ("_frozen", "_items")
+    __slots__ = ("_items", "_hash")
+
+    _items: list[Any]
+    # the hash of the list, which is computed on the first call of `__hash__`
+    _hash: Optional[int]
 
     def __init__(self, items: Optional[Sequence[T]] = None):
         if items is not None:
@@ -36,6 +51,20 @@ class IList(Sequence[T]):
         else:
             items = []
         self._items = items
+        self._hash = None
+
+    @staticmethod
+    def _from_list(items: list[Any]) -> "IList[Any]":
+        # Takes ownership of `items` without copying it.
+        out: IList[Any] = IList.__new__(IList)
+        out._items = items
+        out._hash = None
+        return out
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The cached hash depends on the hash seed of the process,
+        # so only the items are pickled.
+        return (IList, (self._items,))
 
     @overload
     def __getitem__(self, i: int) -> T: ...
@@ -48,11 +77,14 @@ class IList(Sequence[T]):
             case int(i):
                 return self._items[i]
             case slice():
-                return IList(self._items[i])
+                return IList._from_list(self._items[i])
 
     def __len__(self) -> int:
         return self._items.__len__()
 
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
     def __eq__(self, other: object) -> bool:
         if type(other) is type(self):
             return self._items == other._items  # type: ignore
@@ -71,10 +103,45 @@ class IList(Sequence[T]):
         return s
 
     def __hash__(self) -> int:
-        return hash(tuple(self))
+        if self._hash is None:
+            self._hash = hash(tuple(self._items))
+        return self._hash
 
     def __add__(self, other: "IList[U]") -> "IList[T | U]":
-        return IList(self._items + other._items)  # type: ignore
+        return IList._from_list(self._items + other._items)
+
+
+class IListBuilder[V]:
+    """
+    A mutable list with constant time appends, which is frozen into an
+    `IList` by `build`. `out += xs` appends all elements of `xs` to `out`.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Iterable[V] = ()):
+        self._items: list[V] = list(items)
+
+    def append(self, x: V) -> None:
+        self._items.append(x)
+
+    def extend(self, xs: Iterable[V]) -> None:
+        self._items.extend(xs)
+
+    def __iadd__(self, xs: Iterable[V]) -> "IListBuilder[V]":
+        self._items.extend(xs)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def build(self) -> IList[V]:
+        """
+        Returns the elements as an `IList` in constant time, and empties the builder.
+        """
+        out: IList[V] = IList._from_list(self._items)
+        self._items = []
+        return out
 
 
 def ilist[T](*args: T) -> IList[T]:
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+
+from util.dataflow import Numbering
+
+@dataclass
+class InterferenceGraph[T]:
+    """
+    A compact representation of an undirected graph for register allocation.
+
+    The nodes are numbered by a `Numbering`, which can be shared with the
+    liveness analysis, such that sets of live variables can be added as
+    neighbors without converting them from bit vectors. The neighbors of
+    each node are stored as a bit vector relative to its neighbor with the
+    lowest number, which keeps the bit vectors short, as variables mostly
+    interfere with variables numbered shortly before or after them. The
+    degree of each node is counted when edges are added.
+
+    Offers the same methods as `UndirectedGraph`, except that `nodes` and
+    `neighbors` return lists.
+    """
+
+    numbering: Numbering[T] = field(default_factory=lambda: Numbering())
+
+    # the bit vector of the nodes present in the graph
+    _nodes: int = 0
+
+    # maps the number of each node to the bit vector of its neighbors,
+    # where bit `i` stands for the node with number `_bases[n] + i`
+    _rows: list[int] = field(default_factory=lambda: [])
+    _bases: list[int] = field(default_factory=lambda: [])
+
+    # maps the number of each node to its number of neighbors
+    _degrees: list[int] = field(default_factory=lambda: [])
+
+    def _number(self, node: T) -> int:
+        n = self.numbering.number(node)
+        missing = len(self.numbering) - len(self._rows)
+        if missing > 0:
+            self._rows += [0] * missing
+            self._bases += [0] * missing
+            self._degrees += [0] * missing
+        return n
+
+    def _insert(self, n: int, m: int) -> None:
+        # adds node `m` to the row of node `n`
+        base = self._bases[n]
+        if not self._rows[n]:
+            self._bases[n] = m
+            self._rows[n] = 1
+        elif m < base:
+            self._rows[n] = (self._rows[n] << (base - m)) | 1
+            self._bases[n] = m
+        else:
+            self._rows[n] |= 1 << (m - base)
+
+    def add_node(self, node: T) -> None:
+        """
+        Adds an node to the graph.
+        If the node is already present in the graph, then the function returns without any action.
+        """
+        self._nodes |= 1 << self._number(node)
+
+    def add_nodes(self, bits: int) -> None:
+        """
+        Adds the nodes of the bit vector to the graph.
+        """
+        self._nodes |= bits
+
+    def has_node(self, node: T) -> bool:
+        """
+        Returns True if the node is already present in the graph, False otherwise
+        """
+        return node in self.numbering and bool(self._nodes >> self.numbering.number(node) & 1)
+
+    def add_edge(self, node1: T, node2: T) -> None:
+        """
+        Adds an edge between two nodes.
+        If either of the nodes is not present in the graph, then it will be added.
+        """
+        self.add_edges(node1, 1 << self._number(node2))
+
+    def add_edges(self, node: T, bits: int) -> None:
+        """
+        Adds edges between the node and all nodes of the bit vector.
+        Nodes which are not present in the graph are added.
+        """
+        n = self._number(node)
+        self._nodes |= bits | (1 << n)
+        new = bits & ~(self._rows[n] << self._bases[n]) & ~(1 << n)
+        while new:
+            low = new & -new
+            m = low.bit_length() - 1
+            self._insert(n, m)
+            self._insert(m, n)
+            self._degrees[n] += 1
+            self._degrees[m] += 1
+            new ^= low
+
+    def has_edge(self, node1: T, node2: T) -> bool:
+        """
+        Returns True if the graph has an edge between the two nodes, False otherwise
+        """
+        if not self.has_node(node1) or not self.has_node(node2):
+            return False
+        n = self.numbering.number(node1)
+        m = self.numbering.number(node2) - self._bases[n]
+        return m >= 0 and bool(self._rows[n] >> m & 1)
+
+    def nodes(self) -> list[T]:
+        """
+        Returns the nodes present in the graph ordered by their number.
+        """
+        return self.numbering.items(self._nodes)
+
+    def neighbors(self, node: T) -> list[T]:
+        """
+        Returns the neighbors of the given node ordered by their number.
+        If the node is not present in the graph, then the empty list is returned.
+        """
+        if not self.has_node(node):
+            return []
+        n = self.numbering.number(node)
+        return self.numbering.items(self._rows[n], self._bases[n])
+
+    def degree(self, node: T) -> int:
+        """
+        Returns the number of neighbors of the given node.
+        """
+        if not self.has_node(node):
+            return 0
+        return self._degrees[self.numbering.number(node)]
+
+    def __str__(self) -> str:
+        out: list[str] = []
+        for node in self.nodes():
+            out += [f"{node}: {{{",".join([f"{node}" for node in self.neighbors(node)])}}}"]
+        return "\n".join(out)
@@ -0,0 +1,75 @@
+# Interned dataclasses.
+#
+# Leaves of the syntax trees like identifiers, labels, registers and
+# constants are created over and over again with the same values, and are
+# compared and hashed very often, e.g. in the sets of the liveness
+# analysis and the interference graph.
+#
+# Decorating a frozen dataclass with `@interned` makes the constructor
+# return the same instance for the same field values, like a flyweight.
+# Equality and hashing then are identity-based, and implemented in C,
+# which makes sets and dicts of interned values much faster. Note that
+# the iteration order of such sets depends on the memory layout, so the
+# compiler never relies on it (see `dataflow_analysis.node_key`).
+#
+#     @interned
+#     @dataclass(frozen=True, slots=True, weakref_slot=True)
+#     class Id:
+#         name: str
+#
+#     assert Id("x") is Id("x")
+#
+# The fields are passed positionally, and values of different types are
+# never identified, i.e. `EConst(1)` and `EConst(True)` stay different.
+# The table of a class refers to its instances weakly, so the instances of
+# a compilation are freed with its syntax trees, and the tables do not grow
+# with each compilation in a long running process like the compile server.
+# The instances thus need a `__weakref__` slot.
+
+from dataclasses import fields
+from operator import attrgetter
+from typing import Any
+from weakref import KeyedRef
+
+
+def interned[C: type](cls: C) -> C:
+    if not hasattr(cls, "__weakref__"):
+        raise TypeError(f"interned class {cls.__name__} needs a __weakref__ slot")
+    # the class with its methods typed as `Any`, so they can be replaced
+    patched: Any = cls
+    table: dict[tuple[Any, ...], KeyedRef[Any, tuple[Any, ...]]] = {}
+    init = patched.__init__
+    names = [f.name for f in fields(cls)]
+    # returns the value of a single field, and a tuple of values otherwise
+    values = attrgetter(*names)
+
+    def __new__(c: type, *args: Any) -> Any:
+        key = tuple((type(a), a) for a in args)
+        r = table.get(key)
+        x = None if r is None else r()
+        if x is None:
+            x = object.__new__(c)
+            init(x, *args)
+            table[key] = KeyedRef(x, remove, key)
+        return x
+
+    def remove(r: KeyedRef[Any, tuple[Any, ...]]) -> None:
+        # the key may already map to a new instance, if the old one was freed late
+        if table.get(r.key) is r:
+            del table[r.key]
+
+    def __init__(self: Any, *args: Any) -> None:
+        # the instance was already initialized by `__new__`
+        pass
+
+    def __reduce__(self: Any) -> tuple[Any, ...]:
+        # Unpickling calls the constructor, so unpickled values are interned as well.
+        return (cls, (values(self),) if len(names) == 1 else values(self))
+
+    patched.__new__ = __new__
+    patched.__init__ = __init__
+    patched.__eq__ = object.__eq__
+    patched.__ne__ = object.__ne__
+    patched.__hash__ = object.__hash__
+    patched.__reduce__ = __reduce__
+    return cls
@@ -1,54 +1,83 @@
 from dataclasses import dataclass, field
 
+@dataclass
+class HeapItem[T]:
+    """
+    An item in the max-heap of a `PriorityQueue`.
+    """
+
+    item: T
+    priority: int
+    # breaks ties between equal priorities: smaller is pushed earlier
+    seq: int
+
+    def key(self) -> tuple[int, int]:
+        return (self.priority, -self.seq)
+
 @dataclass
 class PriorityQueue[T]:
     """
-    A (simulated) heap structure that has the element with the maximum priority on top.
+    An indexed binary max-heap that has the element with the maximum priority on top.
+
+    Each item can be present at most once. The position of every item in the
+    heap is tracked, so that `increment` runs in O(log n) instead of having to
+    search the whole heap. Items with equal priority are popped in the order
+    in which they were pushed.
     """
 
-    @dataclass(order=True)
-    class Item:
-        """
-        An item in the max-heap.
-        """
+    # the array representation of the binary heap
+    # invariant: the key of each item is at least the key of its children
+    _heap: list[HeapItem[T]] = field(default_factory=lambda: [])
 
-        # ignored when heap property is checked
-        item: T = field(compare=False) # type: ignore
-        priority: int
+    # maps each item to its position in `_heap`
+    _index: dict[T, int] = field(default_factory=lambda: {})
 
-    # the list of items in the simulated heap
-    # invariant: always sorted
-    _heap: list[Item] = field(default_factory=lambda: [])
+    # number of items pushed so far
+    _pushed: int = 0
 
     def push(self, item: T, priority: int) -> None:
         """
         Pushes an new item to the heap.
+        If the item is already present, then an ValueError is raised.
         """
-        self._heap.append(self.Item(item, priority))
-        self._heap.sort()
+        if item in self._index:
+            raise ValueError(f"Item {item} is already present in the heap")
+        self._heap.append(HeapItem(item, priority, self._pushed))
+        self._pushed += 1
+        self._index[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
 
     def pop(self) -> T:
         """
         Pops an element with maximum priority.
         If the heap is empty, then an IndexError is raised.
         """
-        return self._heap.pop().item
+        top = self._heap[0]
+        last = self._heap.pop()
+        del self._index[top.item]
+        if self._heap:
+            self._heap[0] = last
+            self._index[last.item] = 0
+            self._sift_down(0)
+        return top.item
 
     def increment(self, item: T) -> None:
         """
         Increments the priority of the given item by one.
         If the given item is not present in the heap, then the function returns without any action.
-        If the given item is present multiple times, then the function picks the item with the smallest priority.
         """
-        try:
-            idx, priority = next(
-                (idx, i.priority) for idx, i in enumerate(self._heap) if i.item == item
-            )
-        except StopIteration:
+        idx = self._index.get(item)
+        if idx is None:
             return
+        self._heap[idx].priority += 1
+        self._sift_up(idx)
 
-        self._heap[idx] = self.Item(item, priority + 1)
-        self._heap.sort()
+    def priority(self, item: T) -> int:
+        """
+        Returns the current priority of the given item.
+        If the given item is not present in the heap, then an KeyError is raised.
+        """
+        return self._heap[self._index[item]].priority
 
     def is_empty(self) -> bool:
         """
@@ -58,3 +87,37 @@ class PriorityQueue[T]:
 
     def __bool__(self) -> bool:
         return not self.is_empty()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._index
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i].item] = i
+        self._index[heap[j].item] = j
+
+    def _sift_up(self, i: int) -> None:
+        heap = self._heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[parent].key() >= heap[i].key():
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int) -> None:
+        heap = self._heap
+        n = len(heap)
+        while True:
+            largest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and heap[child].key() > heap[largest].key():
+                    largest = child
+            if largest == i:
+                break
+            self._swap(i, largest)
+            i = largest
@@ -0,0 +1,56 @@
+# Recursion on an explicit stack.
+#
+# The traversals of the syntax trees are mutually recursive functions,
+# whose depth is the nesting depth of the program. Generated programs can
+# be nested far deeper than Python's recursion limit, e.g. a sum of a
+# hundred thousand terms.
+#
+# A traversal which should work on arbitrarily deep trees is written as a
+# generator, which yields the generator of each recursive call instead of
+# calling the function directly, and receives the result of the call as
+# the value of the `yield`:
+#
+#     def size(e: Expr) -> Rec[int]:
+#         match e:
+#             case EOp2(e1, _, e2):
+#                 return 1 + (yield size(e1)) + (yield size(e2))
+#             case _:
+#                 return 1
+#
+#     n = trampoline(size(e))
+#
+# `trampoline` runs the generators on a list instead of the call stack, so
+# the depth is only limited by the available memory. An exception raised
+# in a call is thrown into the caller at its `yield`, so it can be handled
+# like the exception of a regular call.
+
+from typing import Any, Generator
+
+# A recursive computation with result `T`, which yields its recursive calls.
+type Rec[T] = Generator[Rec[Any], Any, T]
+
+def trampoline[T](rec: Rec[T]) -> T:
+    stack: list[Rec[Any]] = [rec]
+    value: Any = None
+    error: BaseException | None = None
+    while True:
+        top = stack[-1]
+        try:
+            if error is None:
+                call = top.send(value)
+            else:
+                call = top.throw(error)
+                error = None
+        except StopIteration as stop:
+            stack.pop()
+            if not stack:
+                return stop.value
+            value = stop.value
+        except BaseException as e:
+            stack.pop()
+            if not stack:
+                raise
+            error = e
+        else:
+            stack.append(call)
+            value = None
@@ -1,13 +1,20 @@
+from collections.abc import KeysView
 from dataclasses import dataclass, field
+from typing import Any
 
 @dataclass
 class UndirectedGraph[T]:
     """
     A graph structure to represent an undirected graph.
+
+    Like in `DirectedGraph`, the neighbors of each node are stored in
+    dictionaries with `None` values, which serve as insertion-ordered
+    sets, such that iterating over the graph does not depend on the
+    hash seed.
     """
 
     # maps nodes to its set of neighbors
-    _adj_matrix: dict[T, set[T]] = field(default_factory=lambda: {})
+    _adj_matrix: dict[T, dict[T, None]] = field(default_factory=lambda: {})
 
     def add_node(self, node: T) -> None:
         """
@@ -16,7 +23,7 @@ class UndirectedGraph[T]:
         """
         if node in self._adj_matrix:
             return
-        self._adj_matrix[node] = set()
+        self._adj_matrix[node] = {}
 
     def has_node(self, node: T) -> bool:
         """
@@ -33,8 +40,8 @@ class UndirectedGraph[T]:
             self.add_node(node1)
         if not self.has_node(node2):
             self.add_node(node2)
-        self._adj_matrix[node1] |= set([node2])
-        self._adj_matrix[node2] |= set([node1])
+        self._adj_matrix[node1][node2] = None
+        self._adj_matrix[node2][node1] = None
 
     def has_edge(self, node1: T, node2: T) -> bool:
         """
@@ -42,23 +49,24 @@ class UndirectedGraph[T]:
         """
         return self.has_node(node1) and node2 in self._adj_matrix[node1]
 
-    def nodes(self) -> set[T]:
+    def nodes(self) -> KeysView[T]:
         """
-        Returns the set of nodes present in the graph.
+        Returns a read-only view of the nodes present in the graph in insertion order.
         """
-        return set(self._adj_matrix.keys())
+        return self._adj_matrix.keys()
 
-    def neighbors(self, node: T) -> set[T]:
+    def neighbors(self, node: T) -> KeysView[T]:
         """
-        Returns the set of neighbors of the given node.
-        If the node is not present in the graph, then the empty set is returned.
+        Returns a read-only view of the neighbors of the given node in insertion order.
+        If the node is not present in the graph, then an empty view is returned.
         """
-        if not self.has_node(node):
-            return set()
-        return self._adj_matrix[node]
+        return self._adj_matrix.get(node, _EMPTY).keys()
 
     def __str__(self) -> str:
         out: list[str] = []
         for node, nodes in self._adj_matrix.items():
             out += [f"{node}: {{{",".join([f"{node}" for node in nodes])}}}"]
         return "\n".join(out)
+
+# the neighbors of the nodes which are not in the graph, which is never modified
+_EMPTY: dict[Any, None] = {}
@@ -0,0 +1,19 @@
+from io import StringIO
+from typing import Callable, TextIO
+
+def write_to_str(write: Callable[[TextIO], object]) -> str:
+    """
+    Returns the text which `write` writes to a stream, without the newline
+    at its end. The syntax trees are printed line by line to a stream, and
+    this gives the printed tree as a string for the debug output.
+    """
+    out = StringIO()
+    write(out)
+    return out.getvalue().removesuffix("\n")
+
+def write_line(out: TextIO, indent: str, line: str) -> None:
+    """
+    Writes a line with the given indentation. Lines of a multi-line
+    `line`, e.g. of a `begin` expression, are all indented.
+    """
+    out.write(indent + line.replace("\n", "\n" + indent) + "\n")
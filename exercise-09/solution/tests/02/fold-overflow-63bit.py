@@ -0,0 +1,28 @@
+x = 4611686018427387903
+y = x + 1
+print(y)
+if y < x:
+    print(1)
+else:
+    print(0)
+z = -4611686018427387903 - 1
+w = z - 1
+print(w)
+print(1 if w > z else 0)
+n = -w
+print(n)
+print(1 if n == z + 1 else 0)
+big = x + x
+print(big)
+print(1 if big < 0 else 0)
+i = 0
+k = x
+while i < 2:
+    k = k + 1
+    i = i + 1
+print(k)
+print(1 if k <= x else 0)
+if not (x + 1 > x):
+    print(2)
+else:
+    print(3)
@@ -0,0 +1,10 @@
+n = input_int()
+a = 0
+b = 1
+while n > 0:
+    t = a
+    a = b
+    b = t + b
+    n = n - 1
+print(a)
+print(b)
@@ -0,0 +1,24 @@
+a = input_int()
+b = a + 10
+c = b + 10
+d = c + 10
+i = 0
+while i < 7:
+    t = a
+    a = b
+    b = c
+    c = d
+    d = t
+    if i < 3:
+        t = a
+        a = c
+        c = t
+    else:
+        t = b
+        b = d
+        d = t
+    i = i + 1
+print(a)
+print(b)
+print(c)
+print(d)
@@ -0,0 +1,10 @@
+a = input_int()
+b = input_int()
+i = 0
+while i < 5:
+    t = a
+    a = b
+    b = t
+    i = i + 1
+print(a)
+print(b)
@@ -0,0 +1,22 @@
+def step(x: int) -> int:
+    return x + 1
+
+a = input_int()
+b = input_int()
+c = a + b
+d = a - b
+e = a + 2
+f = b + 3
+g = c + d
+h = e + f
+k = g + h
+l = c + e
+m = d + f
+n = k + l
+i = 0
+s = 0
+while i < 50:
+    s = step(s) + a + b + c + d + e + f + g + h + k + l + m + n
+    i = i + 1
+print(s)
+print(a + b + c + d + e + f + g + h + k + l + m + n)
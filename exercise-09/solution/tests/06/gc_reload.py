@@ -0,0 +1,27 @@
+def churn(n: int) -> int:
+    i = 0
+    s = 0
+    while i < n:
+        u = (i, i + 1, (i, i))
+        s = s + u[1] + u[2][0]
+        i = i + 1
+    return s
+
+t = (input_int(), (input_int(), input_int()))
+x1 = t[0]
+y1 = t[1][0]
+s = churn(50)
+x2 = t[0]
+y2 = t[1][0]
+w = (x1, (y1, x2), (y2, s), (s, s))
+x3 = t[0]
+y3 = t[1][0]
+z3 = t[1][1]
+w2 = (w, w, (w, w))
+x4 = t[0]
+y4 = t[1][0]
+z4 = t[1][1]
+print(x1 + x2 + x3 + x4)
+print(y1 + y2 + y3 + y4)
+print(z3 + z4)
+print(w2[2][1][2][1] + w[1][0])
@@ -0,0 +1,49 @@
+def noisy(x: int) -> int:
+    print(x)
+    return x + 1
+
+def maybe(x: int) -> int:
+    if x < 3:
+        print(x)
+    return x
+
+def pick(b: bool, x: int, y: int) -> int:
+    if b:
+        return x
+    else:
+        return y
+
+def adder(k: int) -> Callable[[int], int]:
+    return lambda y: y + k
+
+def twice(f: Callable[[int], int], x: int) -> int:
+    return f(f(x))
+
+def count(x: int) -> int:
+    i = 0
+    while i < x:
+        i = i + noisy(i)
+    return i
+
+x = input_int()
+print(noisy(1) + noisy(2))
+print(input_int() + noisy(x))
+print(noisy(noisy(x)) + input_int())
+x = noisy(x)
+print(x)
+x = pick(x < 0, x, noisy(x + 100))
+print(x)
+maybe(x)
+maybe(1)
+y = maybe(2)
+print(pick(y < 5, noisy(100), noisy(200)))
+print(twice(adder(x), 3))
+print(twice(noisy, 7))
+print(count(5))
+t = (noisy(1), input_int(), noisy(2))
+print(t[0] + t[1] + t[2])
+print(noisy(3) if x > 0 else noisy(4))
+print(noisy(5) + (noisy(6) if x < 0 else noisy(7)) + noisy(8))
+while noisy(y) < 10:
+    y = noisy(y) + 2
+print(y)
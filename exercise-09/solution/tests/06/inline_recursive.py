@@ -0,0 +1,25 @@
+def sum_to(n: int) -> int:
+    return 0 if n == 0 else n + sum_to(n - 1)
+
+def even(n: int) -> bool:
+    return True if n == 0 else odd(n - 1)
+
+def odd(n: int) -> bool:
+    return False if n == 0 else even(n - 1)
+
+def down(n: int) -> int:
+    print(n)
+    return 0 if n == 0 else up(n - 1)
+
+def up(n: int) -> int:
+    return step(down(n))
+
+def step(n: int) -> int:
+    return n + 1
+
+n = input_int()
+print(sum_to(n))
+print(1 if even(n) else 0)
+print(1 if odd(n) else 0)
+print(down(n))
+print(step(sum_to(3)))
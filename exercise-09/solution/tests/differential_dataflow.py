@@ -0,0 +1,183 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any, Callable
+
+TEST_DIR = Path(__file__).parent
+BASE_DIR = TEST_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import ast_9_sel as sel
+from compiler import reset_fresh_counters
+from dataflow_analysis import (
+    Definition, Expression, Node, available_expressions, entry_label, expression_of,
+    liveness_analysis, read_set, read_set_src_arg, reaching_definitions, write_set,
+)
+from label import Label
+from pass_0_1_parser import parse
+from pass_1_2_shrink import shrink
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from pass_3_4_convert_assignments import conv_ass
+from pass_4_5_closure_conversion import closure_conv
+from pass_5_5_limit_functions import limit
+from pass_5_6_alloc import alloc
+from pass_6_7_monadic import monadic
+from pass_7_8_explicate import explicate
+from pass_8_9_select import select
+from register_allocation import control_flow_graph
+from type_checker import type_check
+
+arg_parser = ArgumentParser(
+    prog="differential_dataflow",
+    description="Checks that liveness, reaching definitions and available expressions "
+    "computed by the bit-vector dataflow framework agree with straightforward set-based "
+    "implementations on all functions of all test files.",
+)
+arg_parser.add_argument(
+    "-i",
+    "--src",
+    metavar="PATH",
+    help="file or directory of test files to check (default: all test directories)",
+)
+args = arg_parser.parse_args()
+
+if args.src is None:
+    src_paths = sorted(TEST_DIR.glob("*/*.py"))
+elif Path(args.src).is_dir():
+    src_paths = sorted(Path(args.src).glob("*.py"))
+else:
+    src_paths = [Path(args.src)]
+
+def select_program(src_str: str) -> sel.Program:
+    ast: Any = parse(src_str)
+    type_check(ast)
+    reset_fresh_counters()
+    for p in [shrink, uniquify, reveal, conv_ass, closure_conv, limit, alloc, monadic, explicate, select]:
+        ast = p(ast)
+    return ast
+
+# The facts of each block: at its begin and end, and between its instructions
+# (before each instruction for forward analyses, after it for backward ones).
+type Facts[T] = dict[Label, tuple[set[T], set[T], list[set[T]]]]
+
+def successors(p: sel.Blocks) -> dict[Label, list[Label]]:
+    cfg = control_flow_graph(p)
+    return {l: [l2 for l2 in cfg.neighbors_out(l) if l2 in p] for l in p}
+
+def predecessors(p: sel.Blocks) -> dict[Label, list[Label]]:
+    preds: dict[Label, list[Label]] = {l: [] for l in p}
+    for l, ls in successors(p).items():
+        for l2 in ls:
+            preds[l2].append(l)
+    return preds
+
+def solve_forward[T](
+    p: sel.Blocks,
+    step: Callable[[Label, int, sel.Instr, set[T]], set[T]],
+    meet: Callable[[list[set[T]]], set[T]],
+    init: set[T],
+) -> Facts[T]:
+    preds = predecessors(p)
+    entry = entry_label(p)
+    block_out = {l: set(init) for l in p}
+    facts: Facts[T] = {}
+    changed = True
+    while changed:
+        changed = False
+        for l, block in p.items():
+            x = set() if l == entry or not preds[l] else meet([block_out[l2] for l2 in preds[l]])
+            block_in = x
+            instr_in = []
+            for i, instr in enumerate(block):
+                instr_in.append(x)
+                x = step(l, i, instr, x)
+            facts[l] = (block_in, x, instr_in)
+            if x != block_out[l]:
+                block_out[l] = x
+                changed = True
+    return facts
+
+def liveness(p: sel.Blocks) -> Facts[Node]:
+    succs = successors(p)
+    block_in: dict[Label, set[Node]] = {l: set() for l in p}
+    facts: Facts[Node] = {}
+    changed = True
+    while changed:
+        changed = False
+        for l, block in p.items():
+            x: set[Node] = set().union(*[block_in[l2] for l2 in succs[l]])
+            block_out = x
+            instr_out: list[set[Node]] = []
+            for instr in reversed(block):
+                instr_out.append(x)
+                x = read_set(instr) | (x - write_set(instr))
+            instr_out.reverse()
+            facts[l] = (x, block_out, instr_out)
+            if x != block_in[l]:
+                block_in[l] = x
+                changed = True
+    return facts
+
+def reaching_defs(p: sel.Blocks) -> Facts[Definition]:
+    def step(l: Label, i: int, instr: sel.Instr, x: set[Definition]) -> set[Definition]:
+        w = write_set(instr)
+        return {d for d in x if d.node not in w} | {Definition(l, i, y) for y in w}
+    return solve_forward(p, step, lambda xs: set().union(*xs), set())
+
+def avail_exprs(p: sel.Blocks) -> Facts[Expression]:
+    def operands(e: Expression) -> set[Node]:
+        return read_set_src_arg(e.src1) | read_set_src_arg(e.src2)
+    def step(l: Label, i: int, instr: sel.Instr, x: set[Expression]) -> set[Expression]:
+        w = write_set(instr)
+        out = {e for e in x if not operands(e) & w}
+        e = expression_of(instr)
+        if e is not None and not operands(e) & w:
+            out.add(e)
+        return out
+    exprs = {e for block in p.values() for i in block if (e := expression_of(i)) is not None}
+    return solve_forward(p, step, lambda xs: set.intersection(*xs), exprs)
+
+def check(name: str, fun: Label, expected: Facts[Any], actual: Facts[Any]) -> bool:
+    for l, facts in expected.items():
+        if actual[l] != facts:
+            print(f"Mismatch of {name} in block '{l}' of function '{fun}':")
+            print(f"  expected: {facts}")
+            print(f"  actual:   {actual[l]}")
+            print()
+            return False
+    return True
+
+failed = []
+skipped = 0
+for src_path in src_paths:
+    try:
+        p = select_program(src_path.read_text())
+    except Exception:
+        # invalid programs are rejected before the back-end
+        skipped += 1
+        continue
+    ok = True
+    for f in p:
+        blocks = f.body
+        cfg = control_flow_graph(blocks)
+        live = liveness_analysis(blocks, cfg)
+        defs = reaching_definitions(blocks, cfg)
+        avail = available_expressions(blocks, cfg)
+        ok &= check("liveness", f.entry_label, liveness(blocks), {
+            l: (live[l].block_in, live[l].block_out, live[l].instr_out) for l in blocks
+        })
+        ok &= check("reaching definitions", f.entry_label, reaching_defs(blocks), {
+            l: (defs[l].block_in, defs[l].block_out, defs[l].instr_in) for l in blocks
+        })
+        ok &= check("available expressions", f.entry_label, avail_exprs(blocks), {
+            l: (avail[l].block_in, avail[l].block_out, avail[l].instr_in) for l in blocks
+        })
+    if not ok:
+        failed.append(src_path)
+        print(f"Mismatch for '{src_path}'.")
+        print()
+
+checked = len(src_paths) - skipped
+print(f"{checked - len(failed)} / {checked} programs agree, {skipped} invalid programs skipped.")
+sys.exit(1 if failed else 0)
@@ -0,0 +1,77 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+TEST_DIR = Path(__file__).parent
+BASE_DIR = TEST_DIR.parent
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import ast_3_revealed
+import identifier
+from compiler import reset_fresh_counters
+from pass_0_1_parser import parse
+from pass_1_2_shrink import shrink
+from pass_1_3_shrink_uniquify_reveal import shrink_uniquify_reveal
+from pass_2_2_uniquify import uniquify
+from pass_2_3_reveal_functions import reveal
+from type_checker import type_check
+
+arg_parser = ArgumentParser(
+    prog="differential_front_end",
+    description="Checks that the fused front-end produces the same program as "
+    "shrink, uniquify and reveal on all test files.",
+)
+arg_parser.add_argument(
+    "-i",
+    "--src",
+    metavar="PATH",
+    help="file or directory of test files to check (default: all test directories)",
+)
+args = arg_parser.parse_args()
+
+if args.src is None:
+    src_paths = sorted(TEST_DIR.glob("*/*.py"))
+elif Path(args.src).is_dir():
+    src_paths = sorted(Path(args.src).glob("*.py"))
+else:
+    src_paths = [Path(args.src)]
+
+def staged(src_str: str) -> tuple[ast_3_revealed.Program, int]:
+    ast = parse(src_str)
+    type_check(ast)
+    reset_fresh_counters()
+    out = reveal(uniquify(shrink(ast)))
+    return out, identifier.fresh_id_counter
+
+def fused(src_str: str) -> tuple[ast_3_revealed.Program, int]:
+    ast = parse(src_str)
+    type_check(ast)
+    reset_fresh_counters()
+    out = shrink_uniquify_reveal(ast)
+    return out, identifier.fresh_id_counter
+
+failed = []
+skipped = 0
+for src_path in src_paths:
+    src_str = src_path.read_text()
+    try:
+        expected = staged(src_str)
+    except Exception:
+        # invalid programs are rejected before the front-end
+        skipped += 1
+        continue
+    actual = fused(src_str)
+    if actual != expected:
+        failed.append(src_path)
+        print(f"Mismatch for '{src_path}':")
+        print()
+        print("Staged:")
+        print(ast_3_revealed.pretty(expected[0]))
+        print()
+        print("Fused:")
+        print(ast_3_revealed.pretty(actual[0]))
+        print()
+
+checked = len(src_paths) - skipped
+print(f"{checked - len(failed)} / {checked} programs equal, {skipped} invalid programs skipped.")
+sys.exit(1 if failed else 0)
@@ -1,16 +1,19 @@
 import os
-os.environ["PYTHONHASHSEED"] = "1"
-
+import json
+import random
+import shlex
 from shutil import rmtree
 from argparse import ArgumentParser
-from subprocess import run, PIPE, STDOUT
+from subprocess import run, Popen, PIPE, STDOUT
 from pathlib import Path
+from typing import Optional
 from textwrap import indent
 
 TEST_DIR = Path(__file__).parent
 BASE_DIR = TEST_DIR.parent
 INTERPRETER_PATH = BASE_DIR / "src" / "interpreter.py"
 COMPILER_PATH = BASE_DIR / "src" / "compiler.py"
+COMPILE_SERVER_PATH = BASE_DIR / "src" / "compile_server.py"
 RUNTIME_PATH = BASE_DIR / "runtime" / "runtime.c"
 
 arg_parser = ArgumentParser(
@@ -38,8 +41,43 @@ arg_parser.add_argument(
     metavar="PATH",
     help="name or path of the python3.12 binary (default: python3.12)",
 )
+arg_parser.add_argument(
+    "--no-server",
+    action="store_true",
+    help="start a new compiler process for each test instead of sending all tests to one compile server",
+)
+arg_parser.add_argument(
+    "--compiler-args",
+    metavar="ARGS",
+    action="append",
+    help="arguments passed on to the compiler, e.g. --compiler-args='--ssa --check-ssa'. "
+    "If given several times, every test is run with each of the argument lists "
+    "(default: no arguments, the optimizing passes with SSA checking, coalescing with "
+    "split live ranges, linear scan, and the incremental compiler with the fused front-end)",
+)
 args = arg_parser.parse_args()
 
+# The output of the compiler must not depend on the hash seed, so every run
+# uses a different one, which the interpreter and compiler processes inherit.
+# Setting PYTHONHASHSEED repeats a run with the seed it printed.
+hash_seed = os.environ.get("PYTHONHASHSEED") or str(random.randrange(1, 2**32))
+os.environ["PYTHONHASHSEED"] = hash_seed
+
+# the argument lists the compiler is run with on each test, if no --compiler-args are given
+DEFAULT_CONFIGURATIONS = [
+    [],
+    ["--inline", "--sccp", "--check-ssa", "--gvn", "--eliminate-dead-code"],
+    ["--coalesce", "--split-live-ranges"],
+    ["--linear-scan"],
+    ["--incremental", "--fused-front-end"],
+]
+
+# the argument lists the compiler is run with on each test
+configurations = (
+    DEFAULT_CONFIGURATIONS if args.compiler_args is None
+    else [shlex.split(a) for a in args.compiler_args]
+)
+
 if args.src is None:
     paths = [ p for p in Path(TEST_DIR).iterdir() if p.is_dir() ]
     paths.sort()
@@ -65,6 +103,8 @@ for p in paths:
 
 input_paths = [p.with_suffix(".in") for p in src_paths]
 
+print()
+print(f"Hash seed: {hash_seed}")
 print()
 
 def run_with_input(args: list[str | Path], input: bytes) -> tuple[int, str]:
@@ -77,19 +117,68 @@ def run_interpreter(src_path: Path, input: bytes, verbose: bool) -> tuple[int, s
         args.append("-V")
     return run_with_input(args, input_)
 
-def run_compiler(src_path: Path, tgt_path: Path, verbose: bool) -> tuple[int, str]:
+compile_server = None if args.no_server else Popen(
+    [python_bin, str(COMPILE_SERVER_PATH)], stdin=PIPE, stdout=PIPE, text=True, encoding="utf-8"
+)
+
+def dump_args(dump_dir: Optional[Path]) -> list[str]:
+    return [] if dump_dir is None else ["--dump-after=all", f"--dump-dir={dump_dir}"]
+
+def run_compiler(
+    src_path: Path, tgt_path: Path, compiler_args: list[str], dump_dir: Optional[Path] = None
+) -> tuple[int, str]:
+    if compile_server is not None:
+        return run_compile_server(src_path, tgt_path, compiler_args, dump_dir)
     args = [
         python_bin,
-        str(BASE_DIR / "src" / "compiler.py"),
+        str(COMPILER_PATH),
         "-i",
         str(src_path),
         "-o",
-        str(asm_path),
+        str(tgt_path),
+        *compiler_args,
+        *dump_args(dump_dir),
     ]
-    if verbose:
-        args.append("-V")
     return run_with_input(args, b"")
 
+def run_compile_server(
+    src_path: Path, tgt_path: Path, compiler_args: list[str], dump_dir: Optional[Path]
+) -> tuple[int, str]:
+    assert compile_server is not None and compile_server.stdin and compile_server.stdout
+    request = {"src": src_path.read_text(), "args": [*compiler_args, *dump_args(dump_dir)]}
+    compile_server.stdin.write(json.dumps(request) + "\n")
+    compile_server.stdin.flush()
+    line = compile_server.stdout.readline()
+    if not line:
+        return 1, "The compile server terminated unexpectedly."
+    response = json.loads(line)
+    if response["exit_code"] == 0:
+        tgt_path.write_text(response["asm"])
+    return response["exit_code"], response["output"]
+
+def dump_passes(src_path: Path, tgt_path: Path, compiler_args: list[str]) -> tuple[str, Path]:
+    """
+    Compiles a failed test again and writes the output of all passes to a
+    directory next to the assembly. Returns the output of the compiler and
+    the directory.
+    """
+    dump_dir = tgt_path.parent / f"{src_path.stem}.passes"
+    _, output = run_compiler(src_path, tgt_path, compiler_args, dump_dir)
+    return output, dump_dir
+
+def print_failure(message: str, compiler_args: list[str]) -> None:
+    print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
+    print(message)
+    if compiler_args:
+        print(f"Compiler arguments: {shlex.join(compiler_args)}")
+    print()
+
+def print_dump_dir(dump_dir: Path) -> None:
+    print("Output of all Passes:")
+    print()
+    print(indent(str(dump_dir), " " * 4))
+    print()
+
 def run_gcc(src_path: Path, runtime_path: Path, tgt_path: Path) -> tuple[int, str]:
     args = [gcc_bin, "-static", str(src_path), str(runtime_path), "-o", str(tgt_path)]
     return run_with_input(args, b"")
@@ -98,8 +187,8 @@ def run_qemu(prog_path: Path, input: bytes) -> tuple[int, str]:
     args = [qemu_bin, str(prog_path)]
     return run_with_input(args, input)
 
-passed: list[Path] = []
-failed: list[Path] = []
+passed: list[tuple[Path, list[str]]] = []
+failed: list[tuple[Path, list[str]]] = []
 
 tmp_dir = BASE_DIR / "tmp"
 try:
@@ -108,45 +197,24 @@ except Exception:
     pass
 tmp_dir.mkdir()
 
-ANSI_ERASE_LINE = "\33[2K"
-
-for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
-    print(f"{ANSI_ERASE_LINE}Running test {i+1} / {len(src_paths)}: {src_path}...\r", end="")
-    if input_path.exists():
-        input_ = input_path.read_bytes()
-    else:
-        input_ = b""
+# With several argument lists, the files of each one go to their own directory.
+config_dirs = [tmp_dir] if len(configurations) == 1 else [tmp_dir / str(k) for k in range(len(configurations))]
+for config_dir in config_dirs:
+    config_dir.mkdir(exist_ok=True)
 
-    (exit_code, interpreter_output) = run_interpreter(src_path, input_, verbose=False)
-    if exit_code != 0:
-        (exit_code, interpreter_output) = run_interpreter(src_path, input_, verbose=True)
-        failed += [src_path]
-        print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-        print(f"Running interpreter failed on source '{src_path.name}'.")
-        print()
-        print("Source:")
-        print()
-        print(indent(src_path.read_text().strip(), " " * 4))
-        print()
-        if input_path.exists():
-            print("Input:")
-            print()
-            print(indent(input_.decode("utf-8").strip(), " " * 4))
-            print()
-        print("Error:")
-        print()
-        print(indent(interpreter_output, " " * 4))
-        print()
-        continue
+ANSI_ERASE_LINE = "\33[2K"
 
-    asm_path = tmp_dir / Path(src_path.name).with_suffix(".S")
+def run_compiled(src_path: Path, input_: bytes, interpreter_output: str, compiler_args: list[str], config_dir: Path) -> bool:
+    """
+    Compiles and runs a test with the given compiler arguments, compares the
+    output with the interpreter's, and prints the failure if any.
+    """
+    asm_path = config_dir / Path(src_path.name).with_suffix(".S")
 
-    (exit_code, compiler_output) = run_compiler(src_path, asm_path, verbose=True)
+    (exit_code, compiler_output) = run_compiler(src_path, asm_path, compiler_args)
     if exit_code != 0:
-        failed += [src_path]
-        print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-        print(f"Running compiler failed on source '{src_path.name}'.")
-        print()
+        (compiler_output, dump_dir) = dump_passes(src_path, asm_path, compiler_args)
+        print_failure(f"Running compiler failed on source '{src_path.name}'.", compiler_args)
         print("Source:")
         print()
         print(indent(src_path.read_text().strip(), " " * 4))
@@ -155,16 +223,15 @@ for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
         print()
         print(indent(compiler_output, " " * 4))
         print()
-        continue
+        print_dump_dir(dump_dir)
+        return False
 
-    prog_path = tmp_dir / asm_path.with_suffix("")
+    prog_path = asm_path.with_suffix("")
 
     (exit_code, gcc_output) = run_gcc(asm_path, RUNTIME_PATH, prog_path)
     if exit_code != 0:
-        failed += [src_path]
-        print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-        print(f"Running gcc failed on source '{src_path.name}'.")
-        print()
+        (_, dump_dir) = dump_passes(src_path, asm_path, compiler_args)
+        print_failure(f"Running gcc failed on source '{src_path.name}'.", compiler_args)
         print("Source:")
         print()
         print(indent(src_path.read_text().strip(), " " * 4))
@@ -173,14 +240,13 @@ for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
         print()
         print(indent(gcc_output, " " * 4))
         print()
-        continue
+        print_dump_dir(dump_dir)
+        return False
 
     (exit_code, qemu_output) = run_qemu(prog_path, input_)
     if exit_code != 0:
-        failed += [src_path]
-        print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-        print(f"Running qemu failed on source '{src_path.name}'.")
-        print()
+        (_, dump_dir) = dump_passes(src_path, asm_path, compiler_args)
+        print_failure(f"Running qemu failed on source '{src_path.name}'.", compiler_args)
         print("Source:")
         print()
         print(indent(src_path.read_text().strip(), " " * 4))
@@ -193,13 +259,15 @@ for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
         print()
         print(indent(qemu_output, " " * 4))
         print()
-        continue
+        print_dump_dir(dump_dir)
+        return False
 
     if interpreter_output != qemu_output:
-        failed += [src_path]
-        print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-        print(f"Interpreter and compiled program produce different outputs on source '{src_path.name}'.")
-        print()
+        (_, dump_dir) = dump_passes(src_path, asm_path, compiler_args)
+        print_failure(
+            f"Interpreter and compiled program produce different outputs on source '{src_path.name}'.",
+            compiler_args,
+        )
         print("Source:")
         print()
         print(indent(src_path.read_text().strip(), " " * 4))
@@ -212,15 +280,54 @@ for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
         print()
         print(indent(qemu_output, " " * 4))
         print()
+        print_dump_dir(dump_dir)
+        return False
+
+    return True
+
+for i, (src_path, input_path) in enumerate(zip(src_paths, input_paths)):
+    print(f"{ANSI_ERASE_LINE}Running test {i+1} / {len(src_paths)}: {src_path}...\r", end="")
+    if input_path.exists():
+        input_ = input_path.read_bytes()
+    else:
+        input_ = b""
+
+    (exit_code, interpreter_output) = run_interpreter(src_path, input_, verbose=False)
+    if exit_code != 0:
+        (exit_code, interpreter_output) = run_interpreter(src_path, input_, verbose=True)
+        failed += [(src_path, compiler_args) for compiler_args in configurations]
+        print_failure(f"Running interpreter failed on source '{src_path.name}'.", [])
+        print("Source:")
+        print()
+        print(indent(src_path.read_text().strip(), " " * 4))
+        print()
+        if input_path.exists():
+            print("Input:")
+            print()
+            print(indent(input_.decode("utf-8").strip(), " " * 4))
+            print()
+        print("Error:")
+        print()
+        print(indent(interpreter_output, " " * 4))
+        print()
         continue
 
-    passed += [src_path]
-    # print(res)
+    for compiler_args, config_dir in zip(configurations, config_dirs):
+        if run_compiled(src_path, input_, interpreter_output, compiler_args, config_dir):
+            passed += [(src_path, compiler_args)]
+        else:
+            failed += [(src_path, compiler_args)]
+
+if compile_server is not None:
+    compile_server.communicate()
 
 print("––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––")
-print(f"{len(passed)} / {len(src_paths)} tests passed.")
+print(f"{len(passed)} / {len(src_paths) * len(configurations)} tests passed.")
 if len(failed) > 0:
     print()
-    print("The following tests failed:")
-    for p in failed:
-        print(f"  {p.name}")
+    print(f"The following tests failed with PYTHONHASHSEED={hash_seed}:")
+    for p, compiler_args in failed:
+        if len(configurations) > 1:
+            print(f"  {p.name} ({shlex.join(compiler_args)})")
+        else:
+            print(f"  {p.name}")